@@ -19,6 +19,7 @@ import csv
 from dataclasses import dataclass, field
 import re
 from code._config import STATUS_KEYWORDS, logger
+from code._database import database_ajo_columns
 from code._language_consts import MAIN_LANGUAGES
 from code._languages import (
     FILE_ADDRESS_ISO_ALL,
@@ -967,23 +968,55 @@ class Ajo:
             )
 
 
-def ajo_writer(new_ajo: Ajo, config: ZiwenConfig) -> None:
+def ajo_writer(
+    new_ajo: Ajo,
+    config: ZiwenConfig,
+    claim_user: str | None = None,
+    claim_time: int | None = None,
+) -> None:
     """
-    Function takes an Ajo object and saves it to a local database.
+    Function takes an Ajo object and saves it to a local database. The Ajo's status and language code are also
+    written to their own indexed columns, as is the claim information while the post is in progress, so that they
+    can be queried without loading every Ajo.
 
     :param new_ajo: An Ajo object that should be saved to the database.
+    :param claim_user: The username of the person who claimed the post, if it was just claimed.
+    :param claim_time: The Unix time of that claim. If the post is in progress but neither this nor a stored claim
+                       time exists, the time the Ajo was first marked as in progress is used.
     :return: Nothing.
     """
 
     created_time = new_ajo.created_utc
     representation = repr(new_ajo)
-    ajo_to_store = (new_ajo.id, created_time, representation)
+    status, language_code = database_ajo_columns(new_ajo.__dict__)
+    if status == "inprogress":
+        fallback_claim_time = claim_time or new_ajo.time_delta.get("inprogress")
+    else:  # Claim information is only kept while a post is in progress.
+        claim_user = claim_time = fallback_claim_time = None
+
     config.cursor_ajo.execute(
         """
-        INSERT INTO local_database(id, created_time, ajo) VALUES (?, ?, ?)
-        ON CONFLICT(id) DO UPDATE SET ajo = excluded.ajo
+        INSERT INTO local_database(id, created_utc, ajo, status, language_code, claim_user, claim_time)
+        VALUES (:id, :created_utc, :ajo, :status, :language_code, :claim_user, :fallback_claim_time)
+        ON CONFLICT(id) DO UPDATE SET
+            ajo = excluded.ajo,
+            status = excluded.status,
+            language_code = excluded.language_code,
+            claim_user = CASE WHEN excluded.status = 'inprogress'
+                THEN COALESCE(:claim_user, local_database.claim_user) END,
+            claim_time = CASE WHEN excluded.status = 'inprogress'
+                THEN COALESCE(:claim_time, local_database.claim_time, excluded.claim_time) END
     """,
-        ajo_to_store,
+        {
+            "id": new_ajo.id,
+            "created_utc": created_time,
+            "ajo": representation,
+            "status": status,
+            "language_code": language_code,
+            "claim_user": claim_user,
+            "claim_time": claim_time,
+            "fallback_claim_time": fallback_claim_time,
+        },
     )
 
     config.conn_ajo.commit()
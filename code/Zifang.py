@@ -3,31 +3,47 @@
 Zifang is a new addition to help Ziwen with some ancillary tasks.
 """
 import re
+import sqlite3
 import sys
 import time
 import traceback
+from code._api_usage import AccountingRequestor, api_usage_flush
 from code._config import (
     BOT_DISCLAIMER,
+    FILE_ADDRESS_CACHE,
     FILE_ADDRESS_ERROR,
+    FILE_ADDRESS_MAIN,
+    RECORD_WRITER,
     SUBREDDIT,
     action_counter,
+    action_counter_flush,
     logger,
+    time_convert_to_string,
+)
+from code._database import (
+    CACHE_MIGRATIONS,
+    MAIN_MIGRATIONS,
+    ZifangPostWindow,
+    ZifangProcessedStore,
+    database_migrate,
 )
 from code._languages import VERSION_NUMBER_LANGUAGES, convert
 from code._login import PASSWORD, USERNAME, ZIFANG_APP_ID, ZIFANG_APP_SECRET
+from code._moderators import ModeratorCache
 from code._responses import (
     ZF_CLOSING_OUT_MESSAGE,
     ZF_CLOSING_OUT_SUBJECT,
     ZF_DUPLICATE_COMMENT,
 )
+from code._scheduler import DAEMON_ARGUMENT, Scheduler, scheduler_intervals
+from code._similarity import numerical_sequence, title_similarity_clusters
+from code._snapshot import RedditSnapshot
+from code._wikipedia import WikipediaResolver
 from collections import defaultdict
-from itertools import combinations
 from typing import Dict, List
 
 import praw
-import wikipedia
 import yaml
-from rapidfuzz import fuzz
 
 """
 UNIVERSAL VARIABLES
@@ -47,7 +63,18 @@ CLOSE_OUT_AGE = 7  # Age of posts (in days) that we inform people about.
 CLOSE_OUT_COMMENTS_MINIMUM = 5
 DUPLICATES_AGE = 4  # Age of posts (in hours) that we check for duplicates.
 DUPLICATE_CONFIDENCE = 85  # Similarity level of posts to mark as duplicates.
-NUMERICAL_SIMILARITY = 20  # How close we want the numbers to be together.
+# How many of the latest processed IDs are backed up to the wiki, and how long (in seconds) they are kept locally.
+WIKI_BACKUP_LIMIT = 1500
+PROCESSED_RETENTION = 60 * 86400
+# How long (in days) posts are kept in the local window of recent posts, covering the close-out checks.
+WINDOW_AGE = 14
+# How many of the newest posts are read to find the ones added since the last cycle.
+WINDOW_INCREMENT = 100
+# How often (in seconds) each stage runs in daemon mode. Can be overridden on the command line as `stage=seconds`.
+DAEMON_INTERVALS = {"zifang_posts": 600, "zifang_comments": 600, "cycle_records": 600}
+# The stages that read the shared listings of new posts and comments. In daemon mode the listings are kept for half
+# the shortest of their intervals, so each run of them sees what was posted since the last.
+SNAPSHOT_STAGES = ["zifang_posts", "zifang_comments"]
 
 ZF_DISCLAIMER = BOT_DISCLAIMER.replace("Ziwen", "Zifang")
 
@@ -59,8 +86,23 @@ reddit = praw.Reddit(
     password=PASSWORD,
     user_agent=USER_AGENT,
     username=USERNAME,
+    requestor_class=AccountingRequestor,  # Counts API calls by stage and function.
 )
 subreddit_helper = reddit.subreddit(SUBREDDIT)
+# Shares the newest posts and comments with Ziwen when it has fetched them recently.
+snapshot = RedditSnapshot(reddit, subreddit_helper)
+# Shares the moderators of the subreddit with Ziwen, fetching them again at most once an hour.
+moderators = ModeratorCache(subreddit_helper)
+# The main database shared with Ziwen, for the action counts and the posts and comments Zifang has acted on.
+conn_main = sqlite3.connect(FILE_ADDRESS_MAIN)
+database_migrate(conn_main, MAIN_MIGRATIONS)
+processed = ZifangProcessedStore(conn_main)
+# The recent posts, added to as new ones come in. See `window_update`.
+window = ZifangPostWindow(conn_main)
+# The cache database shared with Ziwen, for the terms looked up on Wikipedia.
+conn_cache = sqlite3.connect(FILE_ADDRESS_CACHE)
+database_migrate(conn_cache, CACHE_MIGRATIONS)
+resolver = WikipediaResolver(conn_cache)
 logger.info(
     f"Startup: Initializing {BOT_NAME} {VERSION_NUMBER} for r/{SUBREDDIT} with languages module {VERSION_NUMBER_LANGUAGES}."
 )
@@ -76,62 +118,58 @@ def record_error_log(error_save_entry: str) -> None:
     :return: Nothing.
     """
 
-    # File address for the error log, cumulative.
+    # File address for the error log, cumulative. Wait for any queued entries so they are checked too.
+    RECORD_WRITER.flush()
     with open(FILE_ADDRESS_ERROR, "a+", encoding="utf-8") as f:
+        f.seek(0)
         existing_log = f.read()  # Get the data that already exists
-        # If this error entry doesn't exist yet, let's save it.
-        if error_save_entry not in existing_log:
-            error_date = time.strftime("%Y-%m-%d [%I:%M:%S %p]")
-
-            try:
-                log_template_txt = f"\n-----------------------------------\n{error_date} ({BOT_NAME} {VERSION_NUMBER})\n{error_save_entry}"
-                f.write(log_template_txt)
-            except UnicodeEncodeError:
-                # Occasionally this may fail on Windows thanks to its crap Unicode support.
-                logger.error("Error_Log: Encountered a Unicode writing error.")
+    # If this error entry doesn't exist yet, let's save it.
+    if error_save_entry not in existing_log:
+        error_date = time.strftime("%Y-%m-%d [%I:%M:%S %p]")
+        log_template_txt = f"\n-----------------------------------\n{error_date} ({BOT_NAME} {VERSION_NUMBER})\n{error_save_entry}"
+        RECORD_WRITER.append(FILE_ADDRESS_ERROR, log_template_txt)
 
 
 def is_mod(username: str) -> bool:
     """Checks if the user is a moderator of the subreddit."""
-    mod_list = [x.name.lower() for x in subreddit_helper.moderator()]
 
-    return username in mod_list
+    return moderators.is_mod(username)
 
 
 # CLOSEOUT ROUTINE
 
 
-def wiki_access(post_ids: None | List[str], retrieve: bool = False) -> None | List[str]:
+def wiki_import() -> None:
     """
-    This function either adds an ID of a post or just gets what's stored
-    on the wikipage back.
+    Imports the processed IDs backed up on the wiki into the local database if it has none, e.g. on the first run
+    or on a new machine.
     """
+    if processed.count():
+        return
+
     wiki_page = reddit.subreddit("translatorBOT").wiki["zifang_config"]
-    processed_data = wiki_page.content_md
-    # Convert YAML text into a Python list.
-    previous_ids: List[str] = yaml.safe_load(processed_data)
-
-    # In rare cases where the configuration page has no data.
-    if previous_ids is None:
-        previous_ids = []
-
-    if retrieve:
-        return previous_ids
-
-    # Otherwise, merge the two lists.
-    merged = previous_ids + post_ids
-    diff_ids = list(set(previous_ids) - set(post_ids))
-    merged = list(set(merged))[:1500]
-    merged.sort()  # Sort with oldest IDs first.
-
-    # Edit the wikipage if there's changed data.
-    if merged != previous_ids:
-        wiki_page.edit(
-            content=str(merged), reason=f"Updating with new IDs ({diff_ids[0:2]}...)."
-        )
-        logger.info("[ZF]: Updated Zifang configuration page with new IDs.")
-    else:
+    # Convert YAML text into a Python list. It is None in rare cases where the configuration page has no data.
+    previous_ids: List[str] = yaml.safe_load(wiki_page.content_md) or []
+    processed.add(previous_ids, synced=True)
+    logger.info(f"[ZF]: Imported {len(previous_ids)} processed IDs from the wiki.")
+
+
+def wiki_sync() -> None:
+    """
+    Backs up the latest processed IDs to the wiki, if any were added since the last backup. Run once per cycle.
+    """
+    processed.prune(PROCESSED_RETENTION)
+    if not processed.changed():
         logger.debug("[ZF]: No new IDs.")
+        return
+
+    wiki_page = reddit.subreddit("translatorBOT").wiki["zifang_config"]
+    wiki_page.edit(
+        content=str(processed.recent(WIKI_BACKUP_LIMIT)),
+        reason="Updating with new IDs.",
+    )
+    processed.mark_synced()
+    logger.info("[ZF]: Updated Zifang configuration page with new IDs.")
 
 
 def closeout(list_posts: List[praw.reddit.models.Submission]) -> None:
@@ -147,7 +185,6 @@ def closeout(list_posts: List[praw.reddit.models.Submission]) -> None:
     """
     current_time = int(time.time())
     actionable_posts = []
-    previous_posts = wiki_access(None, retrieve=True)
 
     # Compile a list of posts that we can take action on.
     for post in list_posts:
@@ -171,7 +208,7 @@ def closeout(list_posts: List[praw.reddit.models.Submission]) -> None:
             continue
 
         # Skip if we've already seen this post before.
-        if post.id in previous_posts:
+        if processed.is_processed(post.id):
             continue
 
         if int(post.num_comments) >= CLOSE_OUT_COMMENTS_MINIMUM:
@@ -207,11 +244,10 @@ def closeout(list_posts: List[praw.reddit.models.Submission]) -> None:
                 f"[ZF]: >> Messaged u/{post.author} about closing out their post at {post.permalink}."
             )
 
-    # Save to the wikipage.
-    actionable_posts_ids = [x.id for x in actionable_posts]
+    # Save them as processed. They are backed up to the wikipage at the end of the cycle.
     if actionable_posts:
-        wiki_access(actionable_posts_ids)
-        logger.debug("[ZF]: > Saved post IDs to the wikipage.")
+        processed.add([x.id for x in actionable_posts])
+        logger.debug("[ZF]: > Saved post IDs as processed.")
 
 
 # DUPLICATE DETECTOR
@@ -246,54 +282,6 @@ def search_removal_reasons(reasons_dict: Dict[int, tuple] | None, prompt: str) -
             return entry_id
 
 
-def calculate_similarity(strings: List[str]) -> float:
-    """Assesses several strings and returns a probability (out of 100)
-    on how similar they are."""
-    # Iterate over each pair of strings
-    similarity_scores = [
-        fuzz.token_sort_ratio(strings[i], strings[j])
-        for i, j in combinations(range(len(strings)), 2)
-    ]
-
-    # Average out.
-    return sum(similarity_scores) / len(similarity_scores)
-
-
-def numerical_sequence(strings: List[str]) -> bool:
-    """
-    Assesses titles to see if they are likely related but differ purely
-    based on numbers.
-    :param strings: Titles to look at.
-    :return:
-    """
-    numbers = []
-    pattern = r"\s(\d+)"  # Regular expression pattern to match one or more digits preceded by a space
-
-    for string in strings:
-        matches = re.findall(pattern, string)
-        matches = [int(x) for x in matches]
-        if matches:
-            numbers.append(matches)
-
-    # Exit early if no numbers were detected.
-    if not numbers:
-        logger.info(">>> [ZF]: No numbers found in these titles. Skipping...")
-        return False
-
-    # Go through the differences.
-    logger.info(f">>> [ZF]: Numbers found in the titles were: {numbers}")
-    total_sums = [sum(x) for x in numbers]
-    differences = [b - a for a, b in zip(total_sums, total_sums[1:])]
-    average_difference = sum(differences) / len(differences)
-
-    logger.info(f">>> [ZF]: The numerical sequence difference is {average_difference}.")
-
-    # If the average difference in numbers between the titles is lower
-    # than our threshold, return `False`, telling the other function
-    # NOT to remove it.
-    return average_difference == 0 or average_difference >= NUMERICAL_SIMILARITY
-
-
 def duplicate_detector(
     list_posts: List[praw.reddit.models.Submission],
 ) -> List[str] | None:
@@ -347,30 +335,29 @@ def duplicate_detector(
     # The dictionary is indexed by username, with a list of posts.
     for author in final_dict.keys():
         author_data = titles[author]
-        author_titles = [t[0] for t in author_data]
+        clusters = title_similarity_clusters(
+            [t[0] for t in author_data], DUPLICATE_CONFIDENCE
+        )
+        logger.info(f"> The posts by u/{author} form {len(clusters)} similar clusters.")
 
-        # Pass it to the numerical sequence similarity calculator first.
-        # False means don't remove it, True means the normal processing
-        # rules can apply.
-        numerical_similiarity = numerical_sequence(author_titles)
-        if not numerical_similiarity:
-            logger.info(
-                f">> Posts  by u/{author} pass the "
-                "numerical similarity calculator. Skipped."
-            )
-            continue
+        for cluster in clusters:
+            cluster_data = [author_data[index] for index in cluster]
+
+            # Pass it to the numerical sequence similarity calculator first.
+            # False means don't remove it, True means the normal processing
+            # rules can apply.
+            if not numerical_sequence([t[0] for t in cluster_data]):
+                logger.info(
+                    f">> Posts `{[t[1] for t in cluster_data]}` by u/{author} pass the "
+                    "numerical similarity calculator. Skipped."
+                )
+                continue
 
-        # Calculate how similar these posts are.
-        similarity_index = round(calculate_similarity(author_titles), 2)
-        logger.info(
-            f"> The posts by u/{author} have a similarity index of {similarity_index}."
-        )
-        if similarity_index >= DUPLICATE_CONFIDENCE:
             # Oldest post will be first.
-            author_post_ids = sorted([t[1] for t in author_data])
+            cluster_post_ids = sorted([t[1] for t in cluster_data])
 
-            actionable_posts += author_post_ids[1:]
-            logger.info(f">> Added posts `{author_post_ids[1:]} for removal.")
+            actionable_posts += cluster_post_ids[1:]
+            logger.info(f">> Added posts `{cluster_post_ids[1:]}` for removal.")
 
     if actionable_posts:
         return actionable_posts
@@ -385,57 +372,40 @@ def extract_text_within_curly_braces(text: str) -> List[str]:
     return re.findall(pattern, text)
 
 
-def wikipedia_lookup(terms: List[str], language: str = "English") -> str | None:
+def wikipedia_terms(terms: List[str]) -> List[str]:
+    """
+    Prepares the terms of a comment for lookup.
+    :param terms: A list of strings from between curly braces.
+    :return: The first five terms, without punctuation.
+    """
+    return [re.sub(r"[^\w\s]", "", term) for term in terms[:5]]
+
+
+def wikipedia_lookup(
+    terms: List[str],
+    language: str = "English",
+    results: Dict[str, tuple | None] | None = None,
+) -> str | None:
     """
     Basic function to look up terms on Wikipedia.
     :param terms: A list of strings to look up.
     :param language: Which Wikipedia language to look up in.
+    :param results: Terms already resolved by `resolver`, such as those
+                    of all the comments of a run. Any others are resolved.
     :return: A properly formatted paragraph of entries if there are
              results, otherwise `None`.
     """
     entries = []
-
-    # Code for searching non-English Wikipedia, currently not needed.
-    if language != "English":
-        wikipedia.set_lang(convert(language).language_code)
-
-    # Look up the terms and format them appropriately.
-    for term in terms[:5]:  # Limit to five terms.
-        term_entry = None
-        term = re.sub(r"[^\w\s]", "", term)  # Strip punctuation.
-        logger.info(f"[ZF]: > Now searching for '{term}'...")
-
-        # By default, turn off auto suggest.
-        try:
-            term_summary = wikipedia.summary(
-                term, auto_suggest=False, redirect=True, sentences=3
-            )
-        except (
-            wikipedia.exceptions.DisambiguationError,
-            wikipedia.exceptions.PageError,
-        ):
-            # No direct matches, try auto suggest.
-            try:
-                term_summary = wikipedia.summary(term.strip(), sentences=3)
-                term_entry = wikipedia.page(term).url
-            except (
-                wikipedia.exceptions.DisambiguationError,
-                wikipedia.exceptions.PageError,
-            ):
-                # Still no dice.
-                logger.info(
-                    f"[ZF]: >> Unable to resolve '{term}' on Wikipedia. Skipping."
-                )
-                continue  # Exit.
-
-        # Clean up the text for the entry.
-        term_format = term.replace(" ", "_")
-        if "\n" in term_summary:
-            term_summary = term_summary.split("\n")[0].strip()
-        if "==" in term_summary:
-            term_summary = term_summary.split("==")[0].strip()
-        if not term_entry:
-            term_entry = f"https://en.wikipedia.org/wiki/{term_format}"
+    terms = wikipedia_terms(terms)
+    results = results or {}
+    if any(term not in results for term in terms):
+        results = resolver.resolve(terms, convert(language).language_code)
+
+    # Format the terms that were resolved.
+    for term in dict.fromkeys(terms):
+        if results[term] is None:
+            continue
+        term_summary, term_entry = results[term]
         term_entry = term_entry.replace(")", r"\)")
 
         # Form the entry text.
@@ -449,6 +419,54 @@ def wikipedia_lookup(terms: List[str], language: str = "English") -> str | None:
         return body_text
 
 
+# POST WINDOW
+
+
+def window_update() -> List[praw.reddit.models.Submission]:
+    """
+    Adds the posts made since the last cycle to the window of recent posts. Usually these are all among the newest
+    posts that Ziwen already fetched. Only if none of those are in the window yet (e.g. on the first run, or after a
+    long break) is the whole listing of new posts read, which goes back about a week.
+
+    :return: The posts that were added, oldest first.
+    """
+
+    posts = snapshot.new_posts(WINDOW_INCREMENT)
+    known_ids = window.known([post.id for post in posts])
+    if not known_ids:
+        posts = snapshot.new_posts(None)
+        known_ids = window.known([post.id for post in posts])
+    new_posts = [post for post in reversed(posts) if post.id not in known_ids]
+
+    window_rows = []
+    for post in new_posts:
+        try:
+            post_author = post.author.name.lower()
+        except AttributeError:  # The author is deleted.
+            post_author = None
+        window_rows.append((post.id, post_author, post.title, int(post.created_utc)))
+    window.add(window_rows)
+    logger.info(f"[ZF]: Added {len(new_posts)} new posts to the window.")
+
+    return new_posts
+
+
+def window_fetch(post_ids: List[str]) -> List[praw.reddit.models.Submission]:
+    """
+    Fetches the current state of posts in the window, such as their flair and whether they were approved, in
+    batches of 100.
+
+    :param post_ids: A list of Reddit post IDs.
+    :return: A list of PRAW submissions, oldest first.
+    """
+
+    if not post_ids:
+        return []
+    posts = list(reddit.info(fullnames=[f"t3_{post_id}" for post_id in post_ids]))
+
+    return sorted(posts, key=lambda post: post.created_utc)
+
+
 # MAIN RUNTIME
 
 
@@ -460,17 +478,30 @@ def zifang_posts(removal_reasons: Dict[int, tuple] | None) -> None:
     * Check for posts that match the age at which point we want
       to notify people to close out their posts.
 
+    Both work from the window of recent posts, which only needs the new posts of each cycle. Duplicates are only
+    checked for authors who made a new post.
+
     :return: Nothing.
     """
 
-    # Get the last posts that we can get. With the API limit of 1000,
-    # that should be approximately more than a week's worth of posts.
-
-    posts = list(subreddit_helper.new(limit=None))
-    posts.reverse()  # Reverse it so that we start processing the older ones first. Newest ones last.
+    current_time = int(time.time())
+    new_posts = window_update()
 
-    # Check for duplicates.
-    duplicate_data = duplicate_detector(posts)
+    # Check for duplicates among the recent posts of authors with new posts. Authors with just one recent post
+    # cannot have duplicates, so only the posts of the others are fetched.
+    new_authors = list(
+        {post.author.name.lower() for post in new_posts if post.author is not None}
+    )
+    author_posts = window.author_posts(
+        new_authors, current_time - DUPLICATES_AGE * 3600
+    )
+    duplicate_candidates = [
+        post_id
+        for post_ids in author_posts.values()
+        if len(post_ids) > 1
+        for post_id in post_ids
+    ]
+    duplicate_data = duplicate_detector(window_fetch(duplicate_candidates))
     # If we do have duplicates, remove them and reply.
     if duplicate_data:
         for dupe_id in duplicate_data:
@@ -487,10 +518,15 @@ def zifang_posts(removal_reasons: Dict[int, tuple] | None) -> None:
             )
             bot_reply.mod.distinguish()  # Distinguish the bot's comment.
         action_counter(len(duplicate_data), "Removed duplicate")
-        wiki_access(duplicate_data)  # Add them to the wiki.
+        processed.add(duplicate_data)  # Record them as processed.
+        window.remove(duplicate_data)
 
-    # Check for close-out.
-    closeout(posts)
+    # Check for close-out, with the current state of the posts that just became old enough for it. Each post is
+    # checked once.
+    closeout_ids = window.unprocessed_before(current_time - CLOSE_OUT_AGE * 86400)
+    closeout(window_fetch(closeout_ids))
+    window.mark_checked(closeout_ids)
+    window.prune(current_time - WINDOW_AGE * 86400)
 
 
 def zifang_comments(comment_limit: int = 200) -> None:
@@ -501,9 +537,10 @@ def zifang_comments(comment_limit: int = 200) -> None:
     :return: Nothing
     """
     acted_comments = []
-    previous_ids = wiki_access(None, retrieve=True)
+    # Comments with search terms, along with those terms.
+    comment_matches = []
 
-    comments = list(subreddit_helper.comments(limit=comment_limit))
+    comments = snapshot.comments(comment_limit)
     comments.reverse()  # Reverse it so that we start processing the older ones first. Newest ones last.
 
     # Look for search terms.
@@ -517,17 +554,26 @@ def zifang_comments(comment_limit: int = 200) -> None:
         if comment_author == USERNAME:
             continue
 
-        if comment.id in previous_ids:
+        if processed.is_processed(comment.id):
             logger.debug(f"[ZF]: > Comment `{comment.id}` has already been processed.")
             continue
 
         # Continue if there are no matches.
         matches = extract_text_within_curly_braces(comment.body)
-        if not matches:
-            continue
+        if matches:
+            comment_matches.append((comment, matches))
+
+    # Look up the terms of all the comments at once, so that each term is
+    # only looked up once.
+    results = resolver.resolve(
+        term
+        for _comment, matches in comment_matches
+        for term in wikipedia_terms(matches)
+    )
 
+    for comment, matches in comment_matches:
         # Retrieve Wikipedia lookup information.
-        wp_info = wikipedia_lookup(matches)
+        wp_info = wikipedia_lookup(matches, results=results)
         if wp_info:
             try:
                 op = comment.submission.author.name
@@ -546,15 +592,57 @@ def zifang_comments(comment_limit: int = 200) -> None:
             )
             acted_comments.append(comment.id)
 
-    # Save the relevant comment IDs to the wikipage.
-    wiki_access(acted_comments)
+    # Save the relevant comment IDs as processed.
+    processed.add(acted_comments)
 
 
-# */10 * * * *
+def zifang_daemon() -> None:
+    """
+    Runs Zifang as a single long-lived process, with each stage on its own interval, instead of one pass per cron
+    run. Stops cleanly on SIGINT or SIGTERM.
+
+    :return: Nothing.
+    """
+
+    intervals = scheduler_intervals(DAEMON_INTERVALS, sys.argv[1:])
+    snapshot.memory_age = min(intervals[name] for name in SNAPSHOT_STAGES) / 2
+    wiki_import()
+
+    def cycle_records() -> None:
+        # Write this cycle's action counts and API usage, and fetch new posts and comments next cycle.
+        action_counter_flush(conn_main)
+        api_usage_flush(time_convert_to_string(time.time()))
+        snapshot.new_cycle()
+        wiki_sync()
+
+    scheduler = Scheduler(error_handler=record_error_log)
+    scheduler.add_stage(
+        "zifang_posts",
+        lambda: zifang_posts(fetch_removal_reasons(SUBREDDIT)),
+        intervals["zifang_posts"],
+    )
+    scheduler.add_stage(
+        "zifang_comments", zifang_comments, intervals["zifang_comments"]
+    )
+    scheduler.add_stage("cycle_records", cycle_records, intervals["cycle_records"])
+    scheduler.add_shutdown(lambda: action_counter_flush(conn_main))
+    scheduler.add_shutdown(conn_main.close)
+    scheduler.add_shutdown(conn_cache.close)
+    scheduler.run()
+
+
+# */10 * * * *, or started once with `--daemon`.
 if __name__ == "__main__":
+    # Keep running in this process instead of doing a single pass.
+    if DAEMON_ARGUMENT in sys.argv[1:]:
+        zifang_daemon()
+        sys.exit()
+
     try:
+        wiki_import()
         zifang_posts(fetch_removal_reasons(SUBREDDIT))
         zifang_comments()
+        wiki_sync()  # Back up the processed IDs if they changed.
     except Exception as e:  # The bot encountered an error/exception.
         logger.error(f"Main: Encounted error {e}.")
         # Format the error text.
@@ -564,3 +652,8 @@ if __name__ == "__main__":
     except KeyboardInterrupt:  # Manual termination of the script with Ctrl-C.
         logger.info("Manual user shutdown.")
         sys.exit()
+    finally:
+        # Write this run's action counts to the main database shared with Ziwen.
+        action_counter_flush(conn_main)
+        conn_main.close()
+        api_usage_flush(time_convert_to_string(time.time()))
@@ -12,17 +12,26 @@ import sys
 import time
 import traceback
 from urllib.parse import quote  # For documenting errors that are encountered.
+from code._api_usage import AccountingRequestor, api_usage_flush
 from code._config import (
     BOT_DISCLAIMER,
     FILE_ADDRESS_ERROR,
     FILE_ADDRESS_FILTER,
     KEYWORDS,
+    RECORD_WRITER,
     STATUS_KEYWORDS,
     THANKS_KEYWORDS,
     action_counter,
+    action_counter_export,
+    action_counter_flush,
     logger,
     time_convert_to_string,
 )
+from code._database import (
+    database_compress_text,
+    database_content_hash,
+    database_decompress_text,
+)
 from code._language_consts import MAIN_LANGUAGES
 from code._languages import (
     VERSION_NUMBER_LANGUAGES,
@@ -42,11 +51,18 @@ from code._responses import (
     COMMENT_VERIFICATION_RESPONSE,
     MSG_SHORT_THANKS_TRANSLATED,
 )
+from code._scheduler import DAEMON_ARGUMENT, Scheduler, scheduler_intervals
 from code.Ajo import Ajo, ajo_loader, ajo_writer
-from code.notifier import record_activity_csv, ziwen_messages, ZiwenNotifier
+from code.notifier import (
+    notifier_outbox_drain,
+    record_activity_csv,
+    ziwen_messages,
+    ZiwenNotifier,
+)
 from code.zh_processing import ZhProcessor
 from code.Ziwen_command_processor import ZiwenCommandProcessor
 from code.Ziwen_helper import (
+    ATTACHED_DATABASES,
     CLAIM_PERIOD,
     CORRECTED_SUBREDDIT,
     MAXPOSTS,
@@ -54,14 +70,12 @@ from code.Ziwen_helper import (
     TESTING_MODE,
     ZiwenConfig,
     css_check,
-    komento_analyzer,
-    komento_submission_from_comment,
     lookup_matcher,
     lookup_zhja_tokenizer,
     record_to_wiki,
 )
 from datetime import datetime
-from typing import Dict, List
+from typing import List
 
 import praw  # Simple interface to the Reddit API that also handles rate limiting of requests.
 import prawcore  # The base module praw for error logging.
@@ -97,6 +111,24 @@ VERIFYING_KEYWORDS = [
     "marking",
     "good work",
 ]
+# How long (in seconds) comments are kept in the edit cache. Edits to older comments are not tracked.
+EDIT_WINDOW = 86400
+# How often (in seconds) each stage runs in daemon mode. Can be overridden on the command line as `stage=seconds`.
+DAEMON_INTERVALS = {
+    "ziwen_maintenance": 21600,
+    "ziwen_posts": 600,
+    "edit_finder": 600,
+    "ziwen_bot": 600,
+    "ziwen_messages": 600,
+    "progress_checker": 600,
+    "notifier_outbox": 60,
+    "verification_parser": 600,
+    "cc_ref": 600,
+    "cycle_records": 600,
+}
+# The stages that read the shared listings of new posts and comments. In daemon mode the listings are kept for half
+# the shortest of their intervals, so each run of them sees what was posted since the last.
+SNAPSHOT_STAGES = ["ziwen_maintenance", "ziwen_posts", "edit_finder", "ziwen_bot"]
 
 logger.info("Startup: Accessing SQL databases...")
 
@@ -108,6 +140,7 @@ reddit = praw.Reddit(
     password=PASSWORD,
     user_agent=USER_AGENT,
     username=USERNAME,
+    requestor_class=AccountingRequestor,  # Counts API calls by stage and function.
 )
 subreddit_helper = reddit.subreddit(CORRECTED_SUBREDDIT)
 logger.info(
@@ -115,7 +148,7 @@ logger.info(
 )
 
 # Holds all the stateful variables used outside this module
-config = ZiwenConfig(reddit, subreddit_helper)
+config = ZiwenConfig(reddit, subreddit_helper, attached=ATTACHED_DATABASES)
 
 
 def points_tabulator(
@@ -353,7 +386,7 @@ def points_tabulator(
         logger.debug(f"Points tabulator: Saved: {entry}")
         # Need code to NOT write it if the points are 0
         if entry[1] != 0:
-            addition_tuple = (month_string, pid, entry[0], str(entry[1]), oid)
+            addition_tuple = (month_string, pid, entry[0], int(entry[1]), oid)
             config.cursor_main.execute(
                 "INSERT INTO total_points VALUES (?, ?, ?, ?, ?)", addition_tuple
             )
@@ -380,13 +413,12 @@ def record_filter_log(filtered_title: str, ocreated: float, filter_type: str) ->
     :return: Nothing.
     """
 
-    # Access the file.
-    # File address for the filter log, cumulative.
-    with open(FILE_ADDRESS_FILTER, "a+", encoding="utf-8") as f:
-        # Format the new line.
-        timestamp_utc = str(datetime.fromtimestamp(ocreated).strftime("%Y-%m-%d"))
-        # Write the new line.
-        f.write(f"\n{timestamp_utc} | {filtered_title} | {filter_type}")
+    # Format the new line.
+    timestamp_utc = str(datetime.fromtimestamp(ocreated).strftime("%Y-%m-%d"))
+    # Queue the new line for the filter log, cumulative.
+    RECORD_WRITER.append(
+        FILE_ADDRESS_FILTER, f"\n{timestamp_utc} | {filtered_title} | {filter_type}"
+    )
 
 
 def record_last_post_comment() -> str:
@@ -432,23 +464,22 @@ def record_error_log(error_save_entry: str) -> None:
     :return: Nothing.
     """
 
-    # File address for the error log, cumulative.
+    # File address for the error log, cumulative. Wait for any queued entries so they are checked too.
+    RECORD_WRITER.flush()
     with open(FILE_ADDRESS_ERROR, "a+", encoding="utf-8") as f:
+        f.seek(0)
         existing_log = f.read()  # Get the data that already exists
 
-        # If this error entry doesn't exist yet, let's save it.
-        if error_save_entry not in existing_log:
-            error_date = time.strftime("%Y-%m-%d [%I:%M:%S %p]")
-            # Get the last post and comment as a string
-            last_post_text = record_last_post_comment()
+    # If this error entry doesn't exist yet, let's save it.
+    if error_save_entry not in existing_log:
+        error_date = time.strftime("%Y-%m-%d [%I:%M:%S %p]")
+        # Get the last post and comment as a string
+        last_post_text = record_last_post_comment()
 
-            try:
-                f.write(
-                    f"\n-----------------------------------\n{error_date} ({BOT_NAME} {VERSION_NUMBER})\n{last_post_text}\n{error_save_entry}"
-                )
-            except UnicodeEncodeError:
-                # Occasionally this may fail on Windows thanks to its crap Unicode support.
-                logger.error("Error_Log: Encountered a Unicode writing error.")
+        RECORD_WRITER.append(
+            FILE_ADDRESS_ERROR,
+            f"\n-----------------------------------\n{error_date} ({BOT_NAME} {VERSION_NUMBER})\n{last_post_text}\n{error_save_entry}",
+        )
 
 
 """
@@ -463,9 +494,9 @@ These non-notifier functions are all prefixed with `messaging` in their name.
 
 def messaging_user_statistics_writer(body_text: str, username: str) -> None:
     """
-    Function that records which commands are written by whom, cumulatively, and stores it into an SQLite file.
-    Takes the body text of their comment as an input.
-    The database used is the main one but with a different table.
+    Function that records which commands are written by whom, cumulatively.
+    Takes the body text of their comment as an input. The counts are buffered on the config and written to the
+    database once per cycle by `messaging_user_statistics_flush`.
 
     :param body_text: The content of a comment, likely containing r/translator commands.
     :param username: The username of a Reddit user.
@@ -476,20 +507,8 @@ def messaging_user_statistics_writer(body_text: str, username: str) -> None:
     if KEYWORDS.id in body_text:
         body_text = body_text.replace(KEYWORDS.id, KEYWORDS.identify)
 
-    # Let's try and load any saved record of this
-    sql_us = "SELECT commands FROM total_commands WHERE username = ?"
-    config.cursor_main.execute(sql_us, (username,))
-    username_commands_data = config.cursor_main.fetchall()
-
-    if len(username_commands_data) == 0:  # Not saved, create a new one
-        commands_dictionary: Dict[str, int] = {}
-        already_saved = False
-    else:  # There's data already for this username.
-        already_saved = True
-        # We only want the stored dict here.
-        commands_dictionary = eval(username_commands_data[0]["commands"])
-
     # Process through the text and record the commands used.
+    commands_found = False
     for keyword in [
         key for key in KEYWORDS if key not in [KEYWORDS.translate, KEYWORDS.translator]
     ]:
@@ -500,30 +519,38 @@ def messaging_user_statistics_writer(body_text: str, username: str) -> None:
             else:  # Regular command
                 keyword_count = body_text.count(keyword)
 
-            if keyword in commands_dictionary:
-                commands_dictionary[keyword] += keyword_count
-            else:
-                commands_dictionary[keyword] = keyword_count
+            config.pending_user_commands[(username, str(keyword))] += keyword_count
+            commands_found = True
 
-    # Save to the database if there's stuff.
-    if len(commands_dictionary) != 0:
-        if not already_saved:
-            # This is a new username.
-            to_store = (username, str(commands_dictionary))
-            config.cursor_main.execute(
-                "INSERT INTO total_commands VALUES (?, ?)", to_store
-            )
-        else:
-            # This username exists. Update instead.
-            config.cursor_main.execute(
-                "UPDATE total_commands SET commands = ? WHERE username = ?",
-                (str(commands_dictionary), username),
-            )
-        config.conn_main.commit()
-    else:
+    if not commands_found:
         logger.debug("messaging_user_statistics_writer: No commands to write.")
 
 
+def messaging_user_statistics_flush() -> None:
+    """
+    Writes the command counts buffered by `messaging_user_statistics_writer` to the database in one batch.
+
+    :return: Nothing.
+    """
+
+    if not config.pending_user_commands:
+        return
+
+    config.cursor_main.executemany(
+        "INSERT INTO total_command_counts (username, command, count) VALUES (?, ?, ?) "
+        "ON CONFLICT(username, command) DO UPDATE SET count = count + excluded.count",
+        [
+            (username, command, count)
+            for (username, command), count in config.pending_user_commands.items()
+        ],
+    )
+    config.conn_main.commit()
+    logger.debug(
+        f"messaging_user_statistics_flush: Wrote {len(config.pending_user_commands)} command counts."
+    )
+    config.pending_user_commands.clear()
+
+
 # General Lookup Functions
 def lookup_cjk_matcher(content_text: str) -> List[str]:
     """
@@ -560,6 +587,8 @@ EDIT FINDER
 
 This is a single function that helps detect changes in r/translator comments, especially checking for the addition of 
 commands are changes in the content that's looked up. 
+The cache compares comments by a hash of their content, keeping a compressed copy of the text only for working out
+what changed. Comments older than `EDIT_WINDOW` are pruned from it and never looked up.
 """
 
 
@@ -575,14 +604,15 @@ def edit_comment_processor(comment: praw.reddit.models.Comment) -> bool:
     time_diff = current_time_com - ccreated
     if time_diff > 3600 and not cedited:  # The edit is older than an hour.
         return cleanup_database
+    if time_diff > EDIT_WINDOW:  # Too old to be in the cache at all.
+        return cleanup_database
 
-    # Let's retrieve any matching comment text in the cache.
-    get_old_sql = "SELECT content FROM comment_cache WHERE id = ?"  # Look for previous data for comment ID
+    # Let's retrieve any matching comment hash in the cache.
+    get_old_sql = "SELECT content_hash, content FROM comment_cache WHERE id = ?"
     config.cursor_cache.execute(get_old_sql, (cid,))
-    # Returns a list that contains a tuple (comment ID, comment text).
-    old_matching_data = config.cursor_cache.fetchall()
+    old_matching_data = config.cursor_cache.fetchone()
     # Has this comment has previously been stored? Let's check it.
-    if len(old_matching_data) != 0:
+    if old_matching_data is not None:
         logger.debug(
             f"Edit Finder: Comment '{cid}' was previously stored in the cache."
         )
@@ -590,13 +620,12 @@ def edit_comment_processor(comment: praw.reddit.models.Comment) -> bool:
         # Define a way to override and force a change even if there is no difference in detected commands.
         force_change = False
 
-        # Retrieve the previously stored text for this comment.
-        old_cbody = old_matching_data[0]["content"]
-
         # Test the new retrieved text with the old one.
-        if cbody == old_cbody:  # The cached comment is the same as the current one.
+        if database_content_hash(cbody) == old_matching_data["content_hash"]:
+            # The cached comment is the same as the current one.
             return cleanup_database  # Do nothing.
-        # There is a change of some sort.
+        # There is a change of some sort. Retrieve the previously stored text for this comment.
+        old_cbody = database_decompress_text(old_matching_data["content"])
         logger.debug(
             f"Edit Finder: An edit for comment '{cid}' was detected. Processing..."
         )
@@ -610,9 +639,7 @@ def edit_comment_processor(comment: praw.reddit.models.Comment) -> bool:
             total_matches = lookup_matcher(old_cbody, None)
 
             # Then we get data from Komento, specifically looking for its version of results.
-            new_vars = komento_analyzer(
-                reddit, komento_submission_from_comment(reddit, cid)
-            )
+            new_vars = config.komento_analysis(comment.submission)
             new_overall_lookup_data = new_vars.get("bot_lookup_correspond", {})
             if cid in new_overall_lookup_data:
                 # This comment is in our data
@@ -628,13 +655,7 @@ def edit_comment_processor(comment: praw.reddit.models.Comment) -> bool:
                 force_change = True
 
             # Code to swap out the stored comment text with the new text. This does NOT force a reprocess.
-            config.cursor_cache.execute(
-                "DELETE FROM comment_cache WHERE id = ?", (cid,)
-            )
-            config.cursor_cache.execute(
-                "INSERT INTO comment_cache VALUES (?, ?)", (cid, cbody)
-            )
-            config.conn_cache.commit()
+            edit_cache_writer(cid, cbody, ccreated)
 
             # Here we edit the cache file too IF there's a edited-in command that's new, omitting the crosspost ones
             # Iterate through the command keywords to see what's new.
@@ -648,10 +669,7 @@ def edit_comment_processor(comment: praw.reddit.models.Comment) -> bool:
 
             if force_change:
                 # Delete the comment from the processed database to force it to update and reprocess.
-                config.cursor_main.execute(
-                    "DELETE FROM oldcomments WHERE id = ?", (cid,)
-                )
-                config.conn_main.commit()
+                config.processed.forget("comment", cid)
                 logger.debug(
                     f"Edit Finder: Removed edited comment `{cid}` from processed database."
                 )
@@ -662,10 +680,7 @@ def edit_comment_processor(comment: praw.reddit.models.Comment) -> bool:
 
         try:
             # Insert the comment into our cache.
-            config.cursor_cache.execute(
-                "INSERT INTO comment_cache VALUES (?, ?)", (cid, cbody)
-            )
-            config.conn_cache.commit()
+            edit_cache_writer(cid, cbody, ccreated)
         except ValueError:  # Some sort of invalid character, don't write it.
             logger.debug(
                 f"Edit Finder: ValueError when inserting comment `{cid}` into cache."
@@ -673,10 +688,34 @@ def edit_comment_processor(comment: praw.reddit.models.Comment) -> bool:
     return cleanup_database
 
 
+def edit_cache_writer(cid: str, cbody: str, ccreated: float) -> None:
+    """
+    Stores or replaces a comment in the edit cache.
+
+    :param cid: The Reddit ID of the comment.
+    :param cbody: The text of the comment.
+    :param ccreated: The Unix time the comment was created.
+    :return: Nothing.
+    """
+
+    config.cursor_cache.execute(
+        "INSERT INTO comment_cache (id, content_hash, created_utc, content) VALUES (?, ?, ?, ?) "
+        "ON CONFLICT(id) DO UPDATE SET content_hash = excluded.content_hash, content = excluded.content",
+        (
+            cid,
+            database_content_hash(cbody),
+            int(ccreated),
+            database_compress_text(cbody),
+        ),
+    )
+    config.conn_cache.commit()
+
+
 def edit_finder() -> None:
     """
     A top-level function to detect edits and changes of note in r/translator comments, including commands and
-    lookup items. `comment_limit` defines how many of the latest comments it will store in the cache.
+    lookup items. `comment_limit` defines how many of the latest comments it will check; cached comments are kept for
+    `EDIT_WINDOW` seconds.
 
     :param: Nothing.
     :return: Nothing.
@@ -687,7 +726,7 @@ def edit_finder() -> None:
     # Fetch the comments from Reddit.
     try:
         # Only get the last `comment_limit` comments.
-        comments = list(subreddit_helper.comments(limit=comment_limit))
+        comments = config.snapshot.comments(comment_limit)
     except prawcore.exceptions.ServerError:  # Server issues.
         return
     cleanup_database = False
@@ -697,12 +736,11 @@ def edit_finder() -> None:
         cleanup_database |= edit_comment_processor(comment)
 
     if cleanup_database:  # There's a need to clean it up.
+        # Delete the comments that are older than the edit window.
         config.cursor_cache.execute(
-            "DELETE FROM comment_cache WHERE id NOT IN (SELECT id FROM comment_cache ORDER BY id DESC LIMIT ?)",
-            (comment_limit,),
+            "DELETE FROM comment_cache WHERE created_utc < ?",
+            (int(time.time() - EDIT_WINDOW),),
         )
-
-        # Delete all but the last comment_limit comments.
         config.conn_cache.commit()
         logger.debug("Edit Finder: Cleaned up the edited comments cache.")
 
@@ -750,7 +788,7 @@ def ziwen_posts() -> None:
 
     # We get the last 80 new posts. Changed from the deprecated `submissions` method.
     # This should allow us to retrieve stuff from up to a day in case of power outages or moving.
-    posts = list(subreddit_helper.new(limit=80))
+    posts = config.snapshot.new_posts(80)
     posts.reverse()  # Reverse it so that we start processing the older ones first. Newest ones last.
 
     for post in posts:
@@ -775,15 +813,16 @@ def ziwen_posts() -> None:
             continue
 
         # Check the local database to see if this is in there.
-        config.cursor_main.execute("SELECT * FROM oldposts WHERE ID=?", [oid])
-        if config.cursor_main.fetchone():
+        if config.processed.is_processed("post", oid):
             # Post is already in the database
             logger.debug(
                 f"Posts: This post {oid} already exists in the processed database."
             )
             continue
-        config.cursor_main.execute("INSERT INTO oldposts VALUES(?)", [oid])
-        config.conn_main.commit()
+        config.processed.mark_processed("post", oid)
+        if oauthor != USERNAME:
+            # A new post has no comments from the bot yet, so the index of the bot's comments covers it from here on.
+            config.komento_index_submission(oid, [])
 
         if not css_check(oflair_css) and oflair_css is not None:
             # If it's a Meta or Community post (that's what css_check does), just alert those signed up for it.
@@ -809,7 +848,7 @@ def ziwen_posts() -> None:
 
         # We're going to mark the original post author as someone different if it's a crosspost.
         if oauthor == "translator-BOT" and oflair_css != "community":
-            komento_data = komento_analyzer(reddit, post)
+            komento_data = config.komento_analysis(post)
             if "bot_xp_comment" in komento_data:
                 op_match = komento_data["bot_xp_op"]
                 oauthor = op_match
@@ -908,7 +947,7 @@ def ziwen_posts() -> None:
                         oid=oid,
                         oflair_text=suggested_css_text,
                         s_or_i=True,
-                        reddit=reddit,
+                        wiki_buffer=config.wiki_buffer,
                         oflair_new="",
                     )
             else:  # This is fully generic.
@@ -932,7 +971,7 @@ def ziwen_posts() -> None:
                 if final_css_text is not None and post.author.name != USERNAME:
                     # Let's leave None flair text alone
                     final_css_text += " (Long)"
-                    post.reply(COMMENT_LONG + BOT_DISCLAIMER)
+                    config.komento_record(post.reply(COMMENT_LONG + BOT_DISCLAIMER))
 
             # True if the user has posted too much.
             user_posted_too_much = config.most_recent_op.count(oauthor) > 4
@@ -958,7 +997,9 @@ def ziwen_posts() -> None:
                         )
                     if final_css_class == "multiple":
                         # We wanna leave an advisory comment if it's a defined multiple
-                        post.reply(COMMENT_DEFINED_MULTIPLE + BOT_DISCLAIMER)
+                        config.komento_record(
+                            post.reply(COMMENT_DEFINED_MULTIPLE + BOT_DISCLAIMER)
+                        )
                 elif multiple_notifications is None:
                     # if it is a specific sublanguage, then
                     # there is a specific subcategory for us to look at (ar-LB, unknown-cyrl) etc
@@ -976,7 +1017,7 @@ def ziwen_posts() -> None:
 
             # If it's an unknown post, add an informative comment.
             if final_css_class == "unknown" and post.author.name != "translator-BOT":
-                post.reply(COMMENT_UNKNOWN + BOT_DISCLAIMER)
+                config.komento_record(post.reply(COMMENT_UNKNOWN + BOT_DISCLAIMER))
                 logger.info("Posts: Added the default 'Unknown' information comment.")
 
             # Actually update the flair. Legacy version first.
@@ -1023,7 +1064,7 @@ def ziwen_bot() -> None:
     logger.debug(f"Fetching new r/{CORRECTED_SUBREDDIT} comments...")
     comments = []
     try:
-        comments += list(subreddit_helper.comments(limit=MAXPOSTS))
+        comments += config.snapshot.comments(MAXPOSTS)
     except prawcore.exceptions.ServerError:  # Server issues.
         return
 
@@ -1039,8 +1080,7 @@ def ziwen_bot() -> None:
         if pauthor == USERNAME:  # Will not reply to my own comments
             continue
 
-        config.cursor_main.execute("SELECT * FROM oldcomments WHERE ID=?", [pid])
-        if config.cursor_main.fetchone():
+        if config.processed.is_processed("comment", pid):
             # Post is already in the database
             continue
 
@@ -1067,8 +1107,7 @@ def ziwen_bot() -> None:
 
         if oid != config.verified_post_id:
             # Enter it into the processed comments database
-            config.cursor_main.execute("INSERT INTO oldcomments VALUES(?)", [pid])
-            config.conn_main.commit()
+            config.processed.mark_processed("comment", pid)
 
         pbody = comment.body
         pbody_original = str(pbody)  # Create a copy with capitalization
@@ -1092,9 +1131,7 @@ def ziwen_bot() -> None:
                 oajo = Ajo().init_from_submission(osubmission, config.post_templates)
 
             if oajo.is_bot_crosspost:
-                komento_data = komento_analyzer(
-                    reddit, komento_submission_from_comment(reddit, pid)
-                )
+                komento_data = config.komento_analysis(osubmission)
                 if "bot_xp_comment" in komento_data:
                     op_match = komento_data["bot_xp_op"]
                     oauthor = op_match  # We're going to mark the original post author as another if it's a crosspost.
@@ -1171,6 +1208,8 @@ def ziwen_bot() -> None:
                     command_name = "`lookup`"
                 logger.info(f"Bot: COMMAND: {command_name}, from u/{pauthor}.")
                 func()
+                # Commands usually reply to or delete comments on the post, so analyze it again next time.
+                config.komento_invalidate(oid)
 
         if (
             any(keyword in pbody for keyword in THANKS_KEYWORDS)
@@ -1212,11 +1251,19 @@ def ziwen_bot() -> None:
             # There's nothing to change for these
             oajo.update_reddit(reddit)  # Push all changes to the server
             # Write the Ajo to the local database
-            ajo_writer(oajo, config)
+            ajo_writer(
+                oajo,
+                config,
+                claim_user=processor.claim_user,
+                claim_time=processor.claim_time,
+            )
             logger.info(f"Bot: Ajo for {oid} updated and saved to the local database.")
             # Record data on user commands.
             messaging_user_statistics_writer(pbody, pauthor)
-            logger.debug("Bot: Recorded user commands in database.")
+            logger.debug("Bot: Recorded user commands.")
+
+    # Write the commands recorded this cycle to the database.
+    messaging_user_statistics_flush()
 
 
 def verification_parser() -> None:
@@ -1245,12 +1292,10 @@ def verification_parser() -> None:
         except AttributeError:
             # Author is deleted. We don't care about this post.
             continue
-        config.cursor_main.execute("SELECT * FROM oldcomments WHERE ID=?", [cid])
-        if config.cursor_main.fetchone():
+        if config.processed.is_processed("comment", cid):
             # Post is already in the database
             continue
-        config.cursor_main.execute("INSERT INTO oldcomments VALUES(?)", [cid])
-        config.conn_main.commit()
+        config.processed.mark_processed("comment", cid)
 
         comment.save()  # Saves the comment on Reddit so we know not to use it. (bot will not process saved comments)
 
@@ -1289,13 +1334,12 @@ def verification_parser() -> None:
 
         # Form the entry for the verification log.
         entry = f"| {c_author_string} | {language_name} | [1]({url_1}), [2]({url_2}), [3]({url_3}) | {notes} |"
-        page_content = reddit.subreddit(CORRECTED_SUBREDDIT).wiki["verification_log"]
-        page_content_new = str(page_content.content_md) + "\n" + entry
 
-        # Update the verification log.
-        page_content.edit(
-            content=page_content_new,
-            reason=f"Updating the verification log with a new request from u/{c_author}",
+        # Update the verification log at the end of the cycle.
+        config.wiki_buffer.append(
+            "verification_log",
+            entry,
+            f"Updating the verification log with a new request from u/{c_author}",
         )
 
         # Reply to the commenter, report so that moderators can take a look.
@@ -1305,7 +1349,7 @@ def verification_parser() -> None:
         )
         comment.report(f"Ziwen: Please check verification request from u/{c_author}.")
         logger.info(
-            f"Updated the verification log with a new request from u/{c_author}"
+            f"Queued an update to the verification log with a new request from u/{c_author}"
         )
 
 
@@ -1315,55 +1359,80 @@ def progress_checker() -> None:
     It checks to see if they have expired (that is, the claim period is past a defined time).
     If they are expired, this function resets them to the 'Untranslated' state.
 
+    Claims are looked up in the indexed columns of the local Ajo database, so Reddit is only contacted for posts
+    whose claim is actually due to be reset (or whose claim time was never recorded).
+
     :return: Nothing.
     """
 
-    # Conduct a search on Reddit.
-    # Get the posts that are still marked as in progress
-    search_results = subreddit_helper.search(
-        'flair:"in progress"', time_filter="month", sort="new"
+    current_time = int(time.time())
+    config.cursor_ajo.execute(
+        "SELECT id, claim_time FROM local_database WHERE status = 'inprogress' "
+        "AND (claim_time IS NULL OR claim_time <= ?)",
+        (current_time - CLAIM_PERIOD,),
     )
+    candidates = config.cursor_ajo.fetchall()
+    logger.debug(f"progress_checker: {len(candidates)} claims to check.")
 
-    for post in search_results:
-        # Now we process the ones that are stil marked as in progress to reset them.
-        # Variable Creation
-        oid = post.id
+    for candidate in candidates:
+        oid = candidate["id"]
+        post = reddit.submission(id=oid)
         oflair_css = post.link_flair_css_class
         opermalink = post.permalink
 
+        # Load its Ajo.
+        oajo = ajo_loader(oid, config)
+
         if oflair_css is None or oflair_css != "inprogress":
-            # If it's not actually an in progress one, let's skip it.
+            # The flair was changed outside the bot. Update the stored status to match, keeping the rest of the Ajo.
+            if oajo is None:
+                oajo = Ajo().init_from_submission(post, config.post_templates)
+            else:
+                status_flairs = [keyword.name for keyword in STATUS_KEYWORDS.values()]
+                new_status = (
+                    oflair_css if oflair_css in status_flairs else "untranslated"
+                )
+                oajo.set_status(new_status)
+                oajo.set_time(new_status, current_time)
+            ajo_writer(oajo, config)
             continue
 
-        # Load its Ajo.
-        # First check the local database for the Ajo.
-        oajo = ajo_loader(oid, config)
         if oajo is None:
             # We couldn't find a stored dict, so we will generate it from the submission.
-            logger.debug(
-                "progress_checker: Couldn't find an Ajo in the local database. Loading from Reddit."
-            )
             oajo = Ajo().init_from_submission(post, config.post_templates)
 
         # Process the post and get some data out of it.
-        komento_data = komento_analyzer(reddit, post)
-        if "claim_time_diff" in komento_data:
-            # Get the time difference between its claimed time and now.
-            time_difference = komento_data["claim_time_diff"]
-            if time_difference > CLAIM_PERIOD:
-                # This means the post is older than the claim time period.
-                # Delete my advisory notice.
-                claim_notice = reddit.comment(id=komento_data["bot_claim_comment"])
-                claim_notice.delete()  # Delete the notice comment.
-                logger.info(
-                    f"progress_checker: Post exceeded the claim time period. Reset. {opermalink}"
-                )
+        komento_data = config.komento_analysis(post)
+        time_difference = komento_data.get("claim_time_diff")
+        if time_difference is None:
+            # There is no claim comment from the bot, e.g. the post was flaired by a moderator. Leave it as is, and
+            # record the time it was checked so that it isn't checked again until a claim period has passed.
+            ajo_writer(oajo, config, claim_time=current_time)
+            continue
+        if time_difference <= CLAIM_PERIOD:
+            # Still within the claim period. Record the claim time so it isn't checked again until it expires.
+            ajo_writer(
+                oajo,
+                config,
+                claim_user=komento_data["claim_user"],
+                claim_time=current_time - time_difference,
+            )
+            continue
 
-                # Update the Ajo.
-                oajo.set_status("untranslated")
-                oajo.update_reddit(reddit)  # Push all changes to the server
-                # Write the Ajo to the local database
-                ajo_writer(oajo, config)
+        # This means the post is older than the claim time period.
+        if "bot_claim_comment" in komento_data:
+            # Delete my advisory notice.
+            config.komento_delete(komento_data["bot_claim_comment"])
+            config.komento_invalidate(oid)
+        logger.info(
+            f"progress_checker: Post exceeded the claim time period. Reset. {opermalink}"
+        )
+
+        # Update the Ajo.
+        oajo.set_status("untranslated")
+        oajo.update_reddit(reddit)  # Push all changes to the server
+        # Write the Ajo to the local database
+        ajo_writer(oajo, config)
 
 
 """LESSER RUNTIMES"""
@@ -1384,8 +1453,7 @@ def cc_ref() -> None:
     for post in posts:
         pid = post.id
 
-        config.cursor_main.execute("SELECT * FROM oldcomments WHERE ID=?", [pid])
-        if config.cursor_main.fetchone():
+        if config.processed.is_processed("comment", pid):
             # Post is already in the database
             continue
 
@@ -1396,8 +1464,7 @@ def cc_ref() -> None:
             # Does not contain our keyword
             continue
 
-        config.cursor_main.execute("INSERT INTO oldcomments VALUES(?)", [pid])
-        config.conn_main.commit()
+        config.processed.mark_processed("comment", pid)
 
         if KEYWORDS.back_quote in pbody:
             post_content = []
@@ -1438,12 +1505,73 @@ def cc_ref() -> None:
                 )
 
 
+def cycle_records() -> None:
+    """
+    Saves the state that the bot otherwise keeps in memory during a cycle: the processed items filter, the lines
+    waiting to be added to the wiki, and the pending action counts. Run at the end of every cycle in daemon mode and
+    on shutdown. The next cycle fetches new posts and comments and analyzes submissions again.
+
+    :return: Nothing.
+    """
+
+    config.snapshot.new_cycle()
+    config.komento_cycle_report()
+    config.wiki_buffer.flush()
+    api_usage_flush(time_convert_to_string(time.time()))
+    config.processed.save()
+    action_counter_flush(config.conn_main)
+    action_counter_export(config.conn_main)
+
+    mem_num = psutil.Process(os.getpid()).memory_info().rss
+    logger.info(
+        f"Cycle records saved. Calls used: {reddit.auth.limits.get('used')}. "
+        f"Memory usage: {mem_num / (1024 * 1024):.2f} MB."
+    )
+
+
+def ziwen_daemon() -> None:
+    """
+    Runs the bot as a single long-lived process, with each stage on its own interval and the maintenance data
+    refreshed on a slower timer, instead of one full pass per cron run. Stops cleanly on SIGINT or SIGTERM.
+
+    :return: Nothing.
+    """
+
+    intervals = scheduler_intervals(DAEMON_INTERVALS, sys.argv[1:])
+    config.snapshot.memory_age = min(intervals[name] for name in SNAPSHOT_STAGES) / 2
+    stages = {
+        "ziwen_maintenance": config.ziwen_maintenance,
+        "ziwen_posts": ziwen_posts,
+        "edit_finder": edit_finder,
+        "ziwen_bot": ziwen_bot,
+        "ziwen_messages": lambda: ziwen_messages(config),
+        "progress_checker": progress_checker,
+        "notifier_outbox": lambda: notifier_outbox_drain(config),
+        "verification_parser": verification_parser,
+        "cc_ref": cc_ref,
+        "cycle_records": cycle_records,
+    }
+    if TESTING_MODE:  # Do not search other subreddits if just testing on r/trntest.
+        del stages["verification_parser"], stages["cc_ref"]
+
+    scheduler = Scheduler(error_handler=record_error_log)
+    for name, function in stages.items():
+        scheduler.add_stage(name, function, intervals[name])
+    scheduler.add_shutdown(cycle_records)
+    scheduler.run()
+
+
 """RUNNING THE BOT"""
 
 # This is the actual loop that runs the top-level functions of the bot.
-# */10 * * * *
+# */10 * * * *, or started once with `--daemon`.
 
 if __name__ == "__main__":
+    # Keep running in this process instead of doing a single pass.
+    if DAEMON_ARGUMENT in sys.argv[1:]:
+        ziwen_daemon()
+        sys.exit()
+
     # We start the bot with a couple of routines to populate the data from our wiki.
     config.ziwen_maintenance()
     logger.info("Bot routine starting up...")
@@ -1463,6 +1591,8 @@ if __name__ == "__main__":
             ziwen_messages(config)
             # Finally checks for posts that are still claimed and 'in progress.'
             progress_checker()
+            # Then it sends the notifications and pages queued by the functions above.
+            notifier_outbox_drain(config)
 
             # Record API usage limit.
             probe = reddit.redditor(USERNAME).created_utc
@@ -1479,6 +1609,9 @@ if __name__ == "__main__":
                 verification_parser()  # The bot checks if there are any new requests for verification.
                 cc_ref()  # Finally the bot runs lookup searches on Chinese subreddits.
 
+            # Save the processed items filter so the next run can skip the database for new items.
+            config.processed.save()
+
         except Exception as e:  # The bot encountered an error/exception.
             logger.error(
                 f"Main: Encounted error {e}. {traceback.print_tb(e.__traceback__)}"
@@ -1500,6 +1633,13 @@ if __name__ == "__main__":
             )
             record_activity_csv(run_information)
             logger.info(f"Main: Run complete. {elapsed_time:.2f} minutes.\n")
+
+        # Write this cycle's wiki lines and action counts, including those of a run that ended in an error.
+        config.wiki_buffer.flush()
+        action_counter_flush(config.conn_main)
+        action_counter_export(config.conn_main)
+        config.komento_cycle_report()
+        api_usage_flush(time_convert_to_string(set_start_time))
     except KeyboardInterrupt:  # Manual termination of the script with Ctrl-C.
         logger.info("Manual user shutdown.")
         sys.exit()
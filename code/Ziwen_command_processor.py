@@ -34,8 +34,6 @@ from code.Ziwen_helper import (
     MESSAGES_OKAY,
     ZiwenConfig,
     css_check,
-    komento_analyzer,
-    komento_submission_from_comment,
     lookup_matcher,
     record_to_wiki,
 )
@@ -81,6 +79,9 @@ class ZiwenCommandProcessor:
         self.pid = pid
         self.pbody_original = pbody_original
         self.requester = requester
+        # Set by `process_claim` so the claim can be indexed when the Ajo is saved.
+        self.claim_user: str | None = None
+        self.claim_time: int | None = None
         # from config
         self.config = config
         self.zw_useragent = config.zw_useragent
@@ -534,7 +535,9 @@ class ZiwenCommandProcessor:
                     # The converter didn't give us any results.
                     no_match_text = COMMENT_INVALID_CODE.format(match, self.opermalink)
                     try:
-                        self.comment.reply(no_match_text + BOT_DISCLAIMER)
+                        self.config.komento_record(
+                            self.comment.reply(no_match_text + BOT_DISCLAIMER)
+                        )
                     except praw.exceptions.APIException:
                         # Comment has been deleted.
                         pass
@@ -566,14 +569,14 @@ class ZiwenCommandProcessor:
                 # Definitively a language. Let's archive this to the wiki.
                 # We've also made sure that it's not just a change of state, and write to the `identified` page.
                 record_to_wiki(
-                    odate=int(self.oid),
+                    odate=int(self.ocreated),
                     otitle=self.otitle,
                     oid=self.oid,
                     oflair_text=o_language_name,
                     s_or_i=False,
                     oflair_new=self.oajo.ajo_language_info.language_name,
                     user=self.pauthor,
-                    reddit=self.reddit,
+                    wiki_buffer=self.config.wiki_buffer,
                 )
         else:  # This is an !identify command for multiple defined languages (e.g. !identify:ru+es+ja
             self.oajo.set_defined_multiple(match)
@@ -604,26 +607,18 @@ class ZiwenCommandProcessor:
             language_code not in ["unknown", "multiple", "zxx", "art", "app"]
             and not match_script
         ):
-            komento_data = komento_analyzer(
-                self.reddit, komento_submission_from_comment(self.reddit, self.oid)
-            )
+            komento_data = self.config.komento_analysis(self.osubmission)
 
             if "bot_unknown" in komento_data:
                 # Previous Unknown template comment
-                unknown_default = komento_data["bot_unknown"]
-                unknown_default = self.reddit.comment(id=unknown_default)
-                unknown_default.delete()  # Changed from remove
+                self.config.komento_delete(komento_data["bot_unknown"])
                 logger.debug(">> Deleted my default Unknown comment...")
             if "bot_invalid_code" in komento_data:
-                invalid_comment = komento_data["bot_invalid_code"]
-                invalid_comment = self.reddit.comment(id=invalid_comment)
-                invalid_comment.delete()
+                self.config.komento_delete(komento_data["bot_invalid_code"])
                 logger.debug(">> Deleted my invalid code comment...")
             if "bot_reference" in komento_data:
                 # Previous reference template comment
-                previous_reference = komento_data["bot_reference"]
-                previous_reference = self.reddit.comment(id=previous_reference)
-                previous_reference.delete()
+                self.config.komento_delete(komento_data["bot_reference"])
                 logger.debug(">> Deleted my previous language reference comment...")
 
     def chinese_matches(self, match, post_content, _key):
@@ -676,24 +671,21 @@ class ZiwenCommandProcessor:
             return
 
         # This section allows for the deletion of previous responses if the content changes.
-        komento_data = komento_analyzer(
-            self.reddit, komento_submission_from_comment(self.reddit, self.oid)
-        )
+        komento_data = self.config.komento_analysis(self.osubmission)
         if "bot_lookup_correspond" in komento_data:
             # This may have had a comment before.
             relevant_comments = komento_data["bot_lookup_correspond"]
 
             # This returns a dictionary with the called comment as key.
             for key in relevant_comments:
-                if key == self.oid and "bot_lookup_replies" in komento_data:
+                if key == self.pid and "bot_lookup_replies" in komento_data:
                     # This is the key for our current comment.
                     # We try to find any corresponding bot replies
                     relevant_replies = komento_data["bot_lookup_replies"]
                     # Previous replies will be a list
-                    previous_responses = relevant_replies[self.oid]
+                    previous_responses = relevant_replies[self.pid]
                     for response in previous_responses:
-                        earlier_comment = self.reddit.comment(id=response)
-                        earlier_comment.delete()
+                        self.config.komento_delete(response)
                         logger.debug("Bot: >>> Previous response deleted")
                         # We delete the earlier versions.
 
@@ -735,7 +727,12 @@ class ZiwenCommandProcessor:
                     f"*u/{self.oauthor} (OP), the following lookup results "
                     "may be of interest to your request.*\n\n"
                 )
-                self.comment.reply(author_tag + post_content + BOT_DISCLAIMER)
+                lookup_reply = self.comment.reply(
+                    author_tag + post_content + BOT_DISCLAIMER
+                )
+                self.config.komento_record(
+                    lookup_reply, parent_body=self.pbody_original
+                )
                 logger.info(f"Bot: >> Looked up the term(s) in {search_language}.")
             else:
                 logger.info("Bot: >> No results found. Skipping...")
@@ -757,7 +754,7 @@ class ZiwenCommandProcessor:
         if post_content is None:
             # There was no good data. We return the invalid comment.
             post_content = COMMENT_INVALID_REFERENCE
-        self.comment.reply(post_content)
+        self.config.komento_record(self.comment.reply(post_content))
         logger.info(f"Bot: Posted the reference results for '{language_match}'.")
 
     # The !search function looks for strings in other posts on r/translator
@@ -833,9 +830,10 @@ class ZiwenCommandProcessor:
 
         reply_body = "\n\n".join(reply_body[:6])
         # Limit it to 6 responses. To avoid excessive length.
-        self.comment.reply(
+        search_reply = self.comment.reply(
             f'## Search results on r/translator for "{search_term}":\n\n{reply_body}'
         )
+        self.config.komento_record(search_reply)
         logger.info("Bot: > Posted my findings for the search term.")
 
     # asking for reviews of one's work.
@@ -884,11 +882,9 @@ class ZiwenCommandProcessor:
             logger.info("Bot: > Marked post as 'Needs Review.'")
 
         # Delete any claimed comment.
-        komento_data = komento_analyzer(self.reddit, self.osubmission)
+        komento_data = self.config.komento_analysis(self.osubmission)
         if "bot_claim_comment" in komento_data:
-            claim_comment = komento_data["bot_claim_comment"]
-            claim_comment = self.reddit.comment(claim_comment)
-            claim_comment.delete()
+            self.config.komento_delete(komento_data["bot_claim_comment"])
 
     # Picks up a !missing command and messages the OP about it.
     def process_missing(self):
@@ -936,7 +932,7 @@ class ZiwenCommandProcessor:
         )
         claimed_already = False  # Boolean to see if it has been claimed as of now.
 
-        komento_data = komento_analyzer(self.reddit, self.osubmission)
+        komento_data = self.config.komento_analysis(self.osubmission)
 
         if "bot_claim_comment" in komento_data:  # Found an already claimed comment
             # claim_comment = komento_data['bot_claim_comment']
@@ -967,6 +963,8 @@ class ZiwenCommandProcessor:
             # This has not yet been claimed. We can claim it for the user.
             self.oajo.set_status("inprogress")
             self.oajo.set_time("inprogress", current_time)
+            self.claim_user = self.pauthor
+            self.claim_time = current_time
             claim_note = self.osubmission.reply(
                 COMMENT_CLAIM.format(
                     claimer=self.pauthor,
@@ -976,6 +974,7 @@ class ZiwenCommandProcessor:
                 + BOT_DISCLAIMER
             )
             claim_note.mod.distinguish(sticky=True)  # Distinguish the bot's comment
+            self.config.komento_record(claim_note)
             logger.info(
                 f"Bot: > Marked a post by u/{self.oauthor} as claimed and in progress."
             )
@@ -1022,7 +1021,8 @@ class ZiwenCommandProcessor:
             self.oajo.set_time("translated", current_time)
             logger.info("Bot: > Marked post as translated.")
 
-        komento_data = komento_analyzer(self.reddit, self.osubmission)
+        # Whether the OP has thanked anyone comes from their comments, so this needs the whole thread.
+        komento_data = self.config.komento_analysis(self.osubmission, user_signals=True)
 
         if self.oajo.is_bot_crosspost and "bot_xp_original_comment" in komento_data:
             logger.debug("Bot: >> Fetching original crosspost comment...")
@@ -1045,14 +1045,10 @@ class ZiwenCommandProcessor:
                 )
 
         if "bot_long" in komento_data:  # Found a bot (Long) comment, delete it.
-            long_comment = komento_data["bot_long"]
-            long_comment = self.reddit.comment(long_comment)
-            long_comment.delete()
+            self.config.komento_delete(komento_data["bot_long"])
         if "bot_claim_comment" in komento_data:
             # Found an older claim comment, delete it.
-            claim_comment = komento_data["bot_claim_comment"]
-            claim_comment = self.reddit.comment(claim_comment)
-            claim_comment.delete()
+            self.config.komento_delete(komento_data["bot_claim_comment"])
 
         if "op_thanks" not in komento_data and self.oflair_css not in [
             "multiple",
@@ -1096,12 +1092,9 @@ class ZiwenCommandProcessor:
         new_status = not current_status
 
         # Delete any long informational comment.
-        komento_data = komento_analyzer(
-            self.reddit, komento_submission_from_comment(self.reddit, self.oid)
-        )
+        komento_data = self.config.komento_analysis(self.osubmission)
         if "bot_long" in komento_data:
-            long_comment = self.reddit.comment(id=komento_data["bot_long"])
-            long_comment.delete()
+            self.config.komento_delete(komento_data["bot_long"])
             logger.debug("Bot: Deleted my default long comment...")
 
         # Set the status
@@ -1118,13 +1111,13 @@ class ZiwenCommandProcessor:
         language_name = convert(match).language_name
         # Write to the saved page
         record_to_wiki(
-            odate=int(self.oid),
+            odate=int(self.ocreated),
             otitle=self.otitle,
             oid=self.oid,
             oflair_text=language_name,
             s_or_i=True,
             oflair_new="",
-            reddit=self.reddit,
+            wiki_buffer=self.config.wiki_buffer,
         )
 
     def process_set(self):
@@ -1156,14 +1149,10 @@ class ZiwenCommandProcessor:
         if "+" not in set_data[0]:  # This is a standard !set
             # Set the language to the Ajo
             self.oajo.set_language(language_code)
-            komento_data = komento_analyzer(
-                self.reddit, komento_submission_from_comment(self.reddit, self.oid)
-            )
+            komento_data = self.config.komento_analysis(self.osubmission)
             if "bot_unknown" in komento_data:
                 # Delete previous Unknown template comment
-                unknown_default = komento_data["bot_unknown"]
-                unknown_default = self.reddit.comment(id=unknown_default)
-                unknown_default.delete()  # Changed from remove
+                self.config.komento_delete(komento_data["bot_unknown"])
                 logger.debug("Bot: >> Deleted my default Unknown comment...")
             logger.info(f"Bot: > Updated the linkflair tag to '{language_code}'.")
         else:  # This is a defined multiple !set
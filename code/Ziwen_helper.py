@@ -1,24 +1,36 @@
 import calendar
+import json
 import re
 import sqlite3
 import sys
 from time import time
 from code._config import (
     FILE_ADDRESS_AJO_DB,
+    FILE_ADDRESS_ALL_STATISTICS,
     FILE_ADDRESS_CACHE,
     FILE_ADDRESS_MAIN,
     FILE_ADDRESS_MECAB,
+    FILE_ADDRESS_PROCESSED_FILTER,
     KEYWORDS,
     SUBREDDIT,
     THANKS_KEYWORDS,
     get_random_useragent,
     logger,
 )
+from code._database import (
+    LanguageStatisticsStore,
+    ProcessedStore,
+    database_attach,
+    database_setup,
+)
 from code._language_consts import CJK_LANGUAGES
 from code._languages import comment_info_parser, convert, language_mention_search
 from code._login import USERNAME
-from code._responses import MSG_WIKIPAGE_FULL
-from datetime import datetime
+from code._moderators import ModeratorCache
+from code._snapshot import RedditSnapshot
+from code._wiki import WikiAppendBuffer
+from collections import Counter
+from datetime import datetime, timedelta
 from typing import Any, Dict, List
 
 import jieba  # Segmenter for Mandarin Chinese.
@@ -36,7 +48,18 @@ MESSAGES_OKAY = True
 MAXPOSTS = 100
 # How long do we allow people to `!claim` a post? This is defined in seconds.
 CLAIM_PERIOD = 28800
-
+# Whether to open the three databases as one connection. See `ZiwenConfig`.
+ATTACHED_DATABASES = False
+# How long processed posts and comments are remembered, in seconds. Must be longer than anything Reddit's `new`
+# listings can return, or items could be processed twice.
+PROCESSED_RETENTION = 30 * 86400
+# How many requests a language needs in the previous month for its local statistics to set its points worth.
+# Languages with fewer are left to the wiki.
+POINTS_PRECOMPUTE_MINIMUM = 10
+
+if "attached" in (argument.lower() for argument in sys.argv[1:]):
+    ATTACHED_DATABASES = True
+    logger.info("Startup: Opening the databases as one attached connection.")
 if len(sys.argv) > 1:  # This is a new startup with additional parameters for modes.
     if sys.argv[1].lower() == "test":
         TESTING_MODE = True
@@ -53,23 +76,51 @@ class ZiwenConfig:
         self,
         reddit: praw.Reddit,
         subreddit_helper: praw.reddit.models.SubredditHelper,
+        attached: bool = False,
     ):
-        # This connects to the local cache used for detecting edits and the multiplier cache for points.
-        self.conn_cache = sqlite3.connect(FILE_ADDRESS_CACHE)
-        self.conn_cache.row_factory = sqlite3.Row
-        self.cursor_cache = self.conn_cache.cursor()
-
-        # This connects to the main database, including notifications, points, and past processed data.
-        self.conn_main = sqlite3.connect(FILE_ADDRESS_MAIN)
-        self.conn_main.row_factory = sqlite3.Row
-        self.cursor_main = self.conn_main.cursor()
-
-        # This connects to the database for Ajos, objects that the bot generates for posts.
-        self.conn_ajo = sqlite3.connect(FILE_ADDRESS_AJO_DB)
-        self.conn_ajo.row_factory = sqlite3.Row
-        self.cursor_ajo = self.conn_ajo.cursor()
+        # If `attached` is True, the cache and Ajo databases are attached to the main database's connection instead
+        # of getting their own. All three `conn_` attributes are then the same connection (one commit covers all the
+        # files, and statements are cached in one place), and queries can join across them.
+        # Their tables have different names, so the existing unqualified queries work either way.
+        self.attached = attached
+        if attached:
+            self.conn_main = sqlite3.connect(FILE_ADDRESS_MAIN, cached_statements=256)
+            self.conn_main.row_factory = sqlite3.Row
+            database_attach(self.conn_main, "cache", FILE_ADDRESS_CACHE)
+            database_attach(self.conn_main, "ajo", FILE_ADDRESS_AJO_DB)
+            self.conn_cache = self.conn_ajo = self.conn_main
+            self.cursor_main = self.conn_main.cursor()
+            self.cursor_cache = self.conn_main.cursor()
+            self.cursor_ajo = self.conn_main.cursor()
+        else:
+            # This connects to the local cache used for detecting edits and the multiplier cache for points.
+            self.conn_cache = sqlite3.connect(FILE_ADDRESS_CACHE)
+            self.conn_cache.row_factory = sqlite3.Row
+            self.cursor_cache = self.conn_cache.cursor()
+
+            # This connects to the main database, including notifications, points, and past processed data.
+            self.conn_main = sqlite3.connect(FILE_ADDRESS_MAIN)
+            self.conn_main.row_factory = sqlite3.Row
+            self.cursor_main = self.conn_main.cursor()
+
+            # This connects to the database for Ajos, objects that the bot generates for posts.
+            self.conn_ajo = sqlite3.connect(FILE_ADDRESS_AJO_DB)
+            self.conn_ajo.row_factory = sqlite3.Row
+            self.cursor_ajo = self.conn_ajo.cursor()
+        # The posts and comments that have already been processed, stored in the main database.
+        self.processed = ProcessedStore(self.conn_main, FILE_ADDRESS_PROCESSED_FILTER)
+        # Language statistics, read one language at a time from an indexed copy in the cache database.
+        self.language_statistics = LanguageStatisticsStore(
+            self.conn_cache, FILE_ADDRESS_ALL_STATISTICS
+        )
         self.reddit = reddit
         self.subreddit_helper = subreddit_helper
+        # The newest posts and comments, fetched once per cycle and shared by every stage that reads them.
+        self.snapshot = RedditSnapshot(reddit, subreddit_helper)
+        # The subreddit's moderators, fetched again at most once an hour and shared with Zifang.
+        self.moderators = ModeratorCache(subreddit_helper)
+        # Lines for the wiki's log pages, written with one edit per page at the end of each cycle.
+        self.wiki_buffer = WikiAppendBuffer(reddit, subreddit_helper)
         self.post_templates = {}
         self.verified_post_id = None
         self.zw_useragent = {}
@@ -78,6 +129,12 @@ class ZiwenConfig:
         # A cache for language multipliers, generated each instance of running.
         # Allows us to access the wiki less and speed up the process.
         self.cached_multipliers: Dict[str, int] = {}
+        # Command usage per (username, command), written to the database once per cycle.
+        self.pending_user_commands: Counter = Counter()
+        # Komento analyses of this cycle by submission ID, each with the API calls it took and when it was made.
+        # See `komento_analysis`.
+        self.komento_memo: Dict[str, tuple] = {}
+        self.komento_calls_saved = 0
 
     def is_mod(self, user: str) -> bool:
         """
@@ -86,11 +143,7 @@ class ZiwenConfig:
         :param user: The Reddit username of an individual.
         :return: True if the user is a moderator, False otherwise.
         """
-        # Get list of subreddit mods from r/translator.
-        moderators = [
-            moderator.name.lower() for moderator in self.subreddit_helper.moderator()
-        ]
-        return user.lower() in moderators
+        return self.moderators.is_mod(user)
 
     """
     MAINTENANCE FUNCTIONS
@@ -134,7 +187,7 @@ class ZiwenConfig:
         current_time_day_ago = int(time()) - 86400
 
         # 100 should be sufficient for the last day, assuming a monthly total of 3000 posts.
-        posts = list(self.subreddit_helper.new(limit=100))
+        posts = self.snapshot.new_posts(100)
 
         # Process through them - we really only care about the username and the time.
         for post in posts:
@@ -204,15 +257,54 @@ class ZiwenConfig:
 
     def maintenance_database_processed_cleaner(self) -> None:
         """
-        Function that cleans up the database of processed comments, but not posts (yet).
+        Function that cleans up the database of processed posts and comments, removing the ones processed longer
+        ago than `PROCESSED_RETENTION`.
+
+        :return: Nothing.
+        """
+
+        deleted = self.processed.prune(PROCESSED_RETENTION)
+        logger.debug(f"# Pruned {deleted} processed items.")
+
+    def maintenance_notify_limits_cleaner(self) -> None:
+        """
+        Function that clears out the notification counts of previous months, so that users' monthly limits start
+        fresh each month.
 
         :return: Nothing.
         """
 
-        pruning_command = "DELETE FROM oldcomments WHERE id NOT IN (SELECT id FROM oldcomments ORDER BY id DESC LIMIT ?)"
-        self.cursor_main.execute(pruning_command, [MAXPOSTS * 10])
+        month_string = datetime.fromtimestamp(time()).strftime("%Y-%m")
+        self.cursor_main.execute(
+            "DELETE FROM notify_monthly_counts WHERE month < ?", (month_string,)
+        )
         self.conn_main.commit()
 
+    def maintenance_database_setup(self) -> None:
+        """
+        Function that brings the local databases up to the current schema, applying any migrations that haven't
+        been applied yet. Each file has its own `schema_migrations` table, so when the databases are attached this
+        uses separate connections to them.
+
+        :return: Nothing.
+        """
+
+        if self.attached:
+            self.conn_main.commit()
+            connections = [
+                sqlite3.connect(path)
+                for path in (FILE_ADDRESS_MAIN, FILE_ADDRESS_CACHE, FILE_ADDRESS_AJO_DB)
+            ]
+            try:
+                applied = database_setup(*connections)
+            finally:
+                for connection in connections:
+                    connection.close()
+        else:
+            applied = database_setup(self.conn_main, self.conn_cache, self.conn_ajo)
+        if applied:
+            logger.info(f"# Database migrations applied: {', '.join(applied)}")
+
     """
     POINTS TABULATING SYSTEM
 
@@ -270,13 +362,7 @@ class ZiwenConfig:
             total_percent = 1.0
 
         # Calculate the point multiplier.
-        # The precise formula here is: (1/percentage)*35
-        try:
-            raw_point_value = 35 * (1 / total_percent)
-            final_point_value = int(round(raw_point_value))
-        except ZeroDivisionError:  # In case the total_percent is 0 for whatever reason.
-            final_point_value = 20
-        final_point_value = min(final_point_value, 20)
+        final_point_value = points_multiplier(total_percent)
         logger.debug(
             f"Points determiner: Multiplier for {language_name} is {final_point_value}"
         )
@@ -295,34 +381,58 @@ class ZiwenConfig:
 
         return final_point_value
 
+    def points_worth_precomputer(self) -> Dict[str, int]:
+        """
+        Works out the points worth of every language with local statistics in one pass, from its share of the
+        requests in the previous month. This is the same month that the last line of the wiki pages read by
+        `points_worth_determiner` lists, so only languages without enough requests in it need the wiki.
+        The results replace the contents of the multiplier cache.
+
+        :return: A dictionary of language names (with underscores, as in the wiki's URLs) and their multipliers.
+        """
+
+        current_month = datetime.fromtimestamp(time()).replace(day=1)
+        month_string = current_month.strftime("%Y-%m")
+        last_month_string = (current_month - timedelta(days=1)).strftime("%Y-%m")
+
+        multipliers = {}
+        # If several codes share a name, the one with the most months of data wins.
+        for language_data in sorted(
+            self.language_statistics.all().values(),
+            key=lambda data: data.get("num_months") or 0,
+        ):
+            month_data = language_data.get(last_month_string)
+            if not month_data or not language_data.get("name"):
+                continue
+            if month_data.get("num_total", 0) < POINTS_PRECOMPUTE_MINIMUM:
+                continue
+            language_name = re.sub(r"[ -]", "_", language_data["name"])
+            # The statistics store shares as fractions, the wiki as percentages.
+            total_percent = month_data.get("percentage_total", 0) * 100
+            multipliers[language_name] = points_multiplier(total_percent)
+
+        self.cursor_cache.execute("DELETE FROM multiplier_cache")
+        self.cursor_cache.executemany(
+            "INSERT INTO multiplier_cache VALUES (?, ?, ?)",
+            [(month_string, name, value) for name, value in multipliers.items()],
+        )
+        self.conn_cache.commit()
+        self.cached_multipliers.update(multipliers)
+        logger.info(
+            f"Points: Precomputed multipliers for {len(multipliers)} languages."
+        )
+
+        return multipliers
+
     def points_worth_cacher(self) -> None:
         """
-        Simple routine that caches the most frequently used languages' points worth in a local database.
+        Simple routine that loads this month's points worth of languages from the local database, precomputing them
+        for every language at the start of a new month.
 
         :param: Nothing.
         :return: Nothing.
         """
 
-        # These are the most common languages on the subreddit. Also in our sidebar.
-        check_languages = [
-            "Arabic",
-            "Chinese",
-            "French",
-            "German",
-            "Hebrew",
-            "Hindi",
-            "Italian",
-            "Japanese",
-            "Korean",
-            "Latin",
-            "Polish",
-            "Portuguese",
-            "Russian",
-            "Spanish",
-            "Thai",
-            "Vietnamese",
-        ]
-
         # Code to check the database file to see if the values are current.
         # It will transform the database info into a dictionary.
 
@@ -334,7 +444,7 @@ class ZiwenConfig:
         multiplier_command = "SELECT * from multiplier_cache WHERE month_year = ?"
         self.cursor_cache.execute(multiplier_command, (month_string,))
         multiplier_entries = self.cursor_cache.fetchall()
-        # If not current, fetch new data and save it.
+        # If not current, calculate new data and save it.
 
         if len(multiplier_entries) != 0:  # We actually have cached data for this month.
             # Populate the dictionary format from our data
@@ -342,19 +452,307 @@ class ZiwenConfig:
                 multiplier_name = entry[1]
                 multiplier_worth = int(entry[2])
                 self.cached_multipliers[multiplier_name] = multiplier_worth
-        else:  # We don't have cached data so we will retrieve it from the wiki.
-            # Delete everything from the cache (clearing out previous months' data as well)
-            command = "DELETE FROM multiplier_cache"
-            self.cursor_cache.execute(command)
-            self.conn_cache.commit()
+        else:  # We don't have cached data so we will calculate it from the local statistics.
+            # This also clears out previous months' data.
+            self.points_worth_precomputer()
+
+    def points_user_report(self, username: str) -> List[sqlite3.Row]:
+        """
+        Fetches a user's points, summed per month, along with a final totals row. This is a single grouped query, so
+        it does not need to go back to the database for each recorded month.
+
+        :param username: The username of a Reddit user.
+        :return: A list of rows with `month_year`, `points`, and `posts` (the number of distinct posts participated
+                 in), sorted by month. The last row is the total for all months and has a `month_year` of None.
+                 Empty if the user has no points recorded.
+        """
+
+        self.cursor_main.execute(
+            "SELECT * FROM (SELECT month_year, SUM(points) AS points, COUNT(DISTINCT oid) AS posts "
+            "FROM total_points WHERE username = ? GROUP BY month_year ORDER BY month_year) "
+            "UNION ALL SELECT NULL, SUM(points), COUNT(DISTINCT oid) FROM total_points WHERE username = ?",
+            (username, username),
+        )
+        report = self.cursor_main.fetchall()
+
+        if not report or report[-1]["points"] is None:  # No points at all.
+            return []
+
+        return report
+
+    def points_monthly_leaderboards(
+        self, top_number: int = 10, month_year: str | None = None
+    ) -> Dict[str, List[sqlite3.Row]]:
+        """
+        Ranks the users who earned the most points each month.
 
-            # Get the data for the common languages
-            for language in check_languages:
-                # Fetch the number of points it's worth.
-                self.points_worth_determiner(language)
+        :param top_number: How many users to include for each month.
+        :param month_year: A specific month to rank, as `YYYY-MM`. All recorded months are ranked if None.
+        :return: A dictionary keyed by month, each containing a list of rows with `username`, `points`, and `posts`,
+                 highest points first.
+        """
+
+        month_filter = "" if month_year is None else "WHERE month_year = :month_year"
+        self.cursor_main.execute(
+            "SELECT month_year, username, points, posts FROM ("
+            "SELECT month_year, username, SUM(points) AS points, COUNT(DISTINCT oid) AS posts, "
+            "RANK() OVER (PARTITION BY month_year ORDER BY SUM(points) DESC) AS rank "
+            f"FROM total_points {month_filter} GROUP BY month_year, username) "
+            "WHERE rank <= :top_number ORDER BY month_year, points DESC, username",
+            {"top_number": top_number, "month_year": month_year},
+        )
+
+        leaderboards: Dict[str, List[sqlite3.Row]] = {}
+        for row in self.cursor_main.fetchall():
+            leaderboards.setdefault(row["month_year"], []).append(row)
+
+        return leaderboards
+
+    def points_language_report(self, month_year: str) -> List[sqlite3.Row]:
+        """
+        Sums a month's points by the language of the posts they were earned on, joining the points in the main
+        database with the Ajo database. The Ajo database is attached to the main connection if it isn't already.
+
+        :param month_year: The month to report on, as `YYYY-MM`.
+        :return: A list of rows with `language_code`, `points`, `users`, and `posts`, most points first.
+                 Points on posts without a stored Ajo are grouped under a `language_code` of None.
+        """
+
+        database_attach(self.conn_main, "ajo", FILE_ADDRESS_AJO_DB)
+        self.cursor_main.execute(
+            "SELECT ajo_data.language_code, SUM(points.points) AS points, "
+            "COUNT(DISTINCT points.username) AS users, COUNT(DISTINCT points.oid) AS posts "
+            "FROM total_points AS points LEFT JOIN ajo.local_database AS ajo_data ON ajo_data.id = points.oid "
+            "WHERE points.month_year = ? GROUP BY ajo_data.language_code ORDER BY points DESC",
+            (month_year,),
+        )
+        return self.cursor_main.fetchall()
+
+    def notify_coverage_report(self, status: str = "untranslated") -> List[sqlite3.Row]:
+        """
+        Counts the posts in a status for each language alongside how many users are subscribed to notifications
+        for that language, joining the Ajo database with the main database. The Ajo database is attached to the
+        main connection if it isn't already.
+
+        :param status: The status of the posts to count, `untranslated` by default.
+        :return: A list of rows with `language_code`, `posts`, and `subscribers`, most posts first.
+        """
+
+        database_attach(self.conn_main, "ajo", FILE_ADDRESS_AJO_DB)
+        self.cursor_main.execute(
+            "SELECT ajo_data.language_code, COUNT(*) AS posts, "
+            "(SELECT COUNT(*) FROM notify_users WHERE notify_users.language_code = ajo_data.language_code) "
+            "AS subscribers FROM ajo.local_database AS ajo_data WHERE ajo_data.status = ? "
+            "GROUP BY ajo_data.language_code ORDER BY posts DESC",
+            (status,),
+        )
+        return self.cursor_main.fetchall()
+
+    """
+    KOMENTO MEMO AND INDEX
+
+    `komento_analyzer` loads a submission's entire comment tree, and the same submission is often analyzed by several
+    stages and commands in one cycle. These functions keep each analysis for the rest of the cycle, until the bot posts
+    or deletes a comment on that submission itself.
+
+    Most of what Komento looks for are the bot's own comments, so those are also recorded in the `bot_comments` table
+    as the bot posts them. Once a submission's bot comments are all in the table (it is new, or its tree has been
+    walked once), Komento answers from there and only walks the tree when the users' comments are needed.
+    """
 
-                # Write the data to the cache.
-                self.conn_cache.commit()
+    def komento_analysis(
+        self,
+        reddit_submission: praw.reddit.models.Submission,
+        user_signals: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Returns the Komento analysis of a submission, from this cycle's memo if it has already been analyzed, or from
+        the bot's comment index if that is enough.
+
+        :param reddit_submission: The PRAW Submission to analyze.
+        :param user_signals: Whether the keys that come from users' comments (`op_thanks`, `translators`) are needed.
+                             These always require the comment tree.
+        :return: A copy of the dictionary from `komento_analyzer`.
+        """
+
+        submission_id = reddit_submission.id
+        if submission_id in self.komento_memo:
+            komento_data, calls, analyzed_utc = self.komento_memo[submission_id]
+            # Kept as long as the listings it was found through, see `RedditSnapshot.memory_age`.
+            if not self.snapshot.expired(analyzed_utc):
+                self.komento_calls_saved += calls
+                return dict(komento_data)
+
+        if not user_signals:
+            bot_comments = self.komento_indexed_comments(submission_id)
+            # The original comment of a crosspost is only found by walking the thread, so walk it if it's missing.
+            if bot_comments is not None and all(
+                kind != "xp" or payload.get("original_comment")
+                for _cid, kind, _parent_id, payload in bot_comments
+            ):
+                return komento_results(bot_comments)
+
+        calls_before = self.reddit.auth.limits.get("used")
+        bot_comments = []
+        komento_data = komento_analyzer(self.reddit, reddit_submission, bot_comments)
+        calls_after = self.reddit.auth.limits.get("used")
+        # Count the calls the analysis took. Reddit's counter resets every ten minutes, so assume one if it went down.
+        calls = 1
+        if isinstance(calls_before, int) and isinstance(calls_after, int):
+            calls = max(calls_after - calls_before, 1)
+        self.komento_memo[submission_id] = (komento_data, calls, time())
+        self.komento_index_submission(submission_id, bot_comments)
+
+        return dict(komento_data)
+
+    def komento_indexed_comments(self, submission_id: str) -> List[tuple] | None:
+        """
+        Returns the bot's comments on a submission from the index, oldest first.
+
+        :param submission_id: The Reddit ID of the submission.
+        :return: A list of (comment ID, kind, parent ID, payload) tuples, or None if the submission's bot comments
+                 are not all in the index.
+        """
+
+        self.cursor_main.execute(
+            "SELECT 1 FROM bot_comment_submissions WHERE submission_id = ?",
+            (submission_id,),
+        )
+        if self.cursor_main.fetchone() is None:
+            return None
+
+        self.cursor_main.execute(
+            "SELECT comment_id, kind, parent_id, payload FROM bot_comments "
+            "WHERE submission_id = ? ORDER BY rowid",
+            (submission_id,),
+        )
+        return [
+            (row[0], row[1], row[2], json.loads(row[3]))
+            for row in self.cursor_main.fetchall()
+        ]
+
+    def komento_index_submission(
+        self, submission_id: str, bot_comments: List[tuple]
+    ) -> None:
+        """
+        Replaces the indexed bot comments of a submission with those found by walking its tree, and marks the
+        submission as fully indexed. A new submission is marked with an empty list, as the bot has not replied yet.
+
+        :param submission_id: The Reddit ID of the submission.
+        :param bot_comments: A list of (comment ID, kind, parent ID, payload) tuples, oldest first.
+        :return: Nothing.
+        """
+
+        current_time = int(time())
+        with self.conn_main:
+            self.cursor_main.execute(
+                "DELETE FROM bot_comments WHERE submission_id = ?", (submission_id,)
+            )
+            self.cursor_main.executemany(
+                "INSERT OR REPLACE INTO bot_comments VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        cid,
+                        submission_id,
+                        kind,
+                        parent_id,
+                        json.dumps(payload),
+                        current_time,
+                    )
+                    for cid, kind, parent_id, payload in bot_comments
+                ],
+            )
+            self.cursor_main.execute(
+                "INSERT OR REPLACE INTO bot_comment_submissions VALUES (?, ?)",
+                (submission_id, current_time),
+            )
+
+    def komento_record(
+        self,
+        reply: praw.reddit.models.Comment | None,
+        parent_body: str | None = None,
+    ) -> None:
+        """
+        Records a comment the bot has just posted in the index, if it is one Komento looks for.
+
+        :param reply: The Comment returned by `reply()`.
+        :param parent_body: The text of the comment it replied to. Needed for lookup replies.
+        :return: Nothing.
+        """
+
+        if reply is None:
+            return
+        submission_id = reply.link_id[3:]
+        self.komento_invalidate(submission_id)
+
+        bot_comment = komento_bot_comment(reply.body)
+        if bot_comment is None:
+            return
+        kind, payload = bot_comment
+        if kind == "lookup":
+            payload["terms"] = (
+                lookup_matcher(parent_body, None) if parent_body else None
+            )
+
+        with self.conn_main:
+            self.cursor_main.execute(
+                "INSERT OR REPLACE INTO bot_comments VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    reply.id,
+                    submission_id,
+                    kind,
+                    reply.parent_id[3:],
+                    json.dumps(payload),
+                    int(time()),
+                ),
+            )
+
+    def komento_delete(self, comment_id: str) -> None:
+        """
+        Deletes one of the bot's comments from Reddit and from the index.
+
+        :param comment_id: The Reddit ID of the comment.
+        :return: Nothing.
+        """
+
+        self.reddit.comment(id=comment_id).delete()
+        self.cursor_main.execute(
+            "SELECT submission_id FROM bot_comments WHERE comment_id = ?", (comment_id,)
+        )
+        row = self.cursor_main.fetchone()
+        if row is None:
+            return
+        with self.conn_main:
+            self.cursor_main.execute(
+                "DELETE FROM bot_comments WHERE comment_id = ?", (comment_id,)
+            )
+        self.komento_invalidate(row[0])
+
+    def komento_invalidate(self, submission_id: str) -> None:
+        """
+        Forgets the analysis of a submission. Called after the bot posts or deletes a comment on it.
+
+        :param submission_id: The Reddit ID of the submission.
+        :return: Nothing.
+        """
+
+        self.komento_memo.pop(submission_id, None)
+
+    def komento_cycle_report(self) -> int:
+        """
+        Logs how many API calls the memo saved this cycle and clears it for the next one.
+
+        :return: The number of API calls saved.
+        """
+
+        calls_saved = self.komento_calls_saved
+        logger.info(
+            f"Komento: Reused analyses saved about {calls_saved} API calls this cycle."
+        )
+        self.komento_memo.clear()
+        self.komento_calls_saved = 0
+
+        return calls_saved
 
     def ziwen_maintenance(self) -> None:
         """
@@ -364,6 +762,8 @@ class ZiwenConfig:
         :return: Nothing.
         """
 
+        self.maintenance_database_setup()
+
         self.post_templates = self.maintenance_template_retriever()
         logger.debug(
             f"# Current post templates retrieved: {len(self.post_templates.keys())} templates"
@@ -392,7 +792,8 @@ class ZiwenConfig:
         self.points_worth_cacher()  # Update the points cache
         logger.debug("# Points cache updated.")
 
-        self.maintenance_database_processed_cleaner()  # Clean the comments that have been processed.
+        self.maintenance_database_processed_cleaner()  # Clean the posts and comments that have been processed.
+        self.maintenance_notify_limits_cleaner()  # Clear out last month's notification counts.
 
 
 def css_check(css_class: str) -> bool:
@@ -406,6 +807,23 @@ def css_check(css_class: str) -> bool:
     return css_class not in ["meta", "community"]
 
 
+def points_multiplier(total_percent: float) -> int:
+    """
+    Calculates the points multiplier of a language from its share of the requests in a month. (the cap is 20)
+    The precise formula here is: (1/percentage)*35
+
+    :param total_percent: The language's percentage of all requests, e.g. 1.5 for 1.5%.
+    :return: The multiplier as an integer.
+    """
+
+    try:
+        raw_point_value = 35 * (1 / total_percent)
+    except ZeroDivisionError:  # In case the total_percent is 0 for whatever reason.
+        return 20
+
+    return min(int(round(raw_point_value)), 20)
+
+
 def record_to_wiki(
     odate: int,
     otitle: str,
@@ -413,13 +831,14 @@ def record_to_wiki(
     oflair_text: str,
     s_or_i: bool,
     oflair_new: str,
-    reddit: praw.Reddit,
+    wiki_buffer: WikiAppendBuffer,
     user: str | None = None,
 ) -> None:
     """
     A function that saves information to one of two wiki pages on the r/translator subreddit.
     "Saved" is for languages that do not have an associated CSS class.
     "Identified" is for languages that were changed with an !identify command.
+    The entry is added to the page when the wiki buffer is flushed at the end of the cycle.
 
     :param odate: Date of the post.
     :param otitle: Title of the post.
@@ -427,6 +846,7 @@ def record_to_wiki(
     :param oflair_text: the flair text.
     :param s_or_i: True for writing to the `saved` page, False for writing to the `identified` page.
     :param oflair_new: The new language category.
+    :param wiki_buffer: The buffer of lines to add to the wiki.
     :param user: The user who called this identification.
     :return: Does not return anything.
     """
@@ -434,37 +854,23 @@ def record_to_wiki(
     oformat_date = datetime.fromtimestamp(int(odate)).strftime("%Y-%m-%d")
 
     if s_or_i:  # Means we should write to the 'saved' page:
-        page_content = reddit.subreddit(CORRECTED_SUBREDDIT).wiki["saved"]
         new_content = (
             f"| {oformat_date} | [{otitle}](https://redd.it/{oid}) | {oflair_text} |"
         )
-        page_content_new = str(page_content.content_md) + "\n" + new_content
         # Adds this language entry to the 'saved page'
-        page_content.edit(
-            content=page_content_new,
-            reason='Ziwen: updating the "Saved" page with a new link',
+        wiki_buffer.append(
+            "saved", new_content, 'Ziwen: updating the "Saved" page with a new link'
         )
-        logger.info("Save_Wiki: Updated the 'saved' wiki page.")
+        logger.info("Save_Wiki: Queued an update to the 'saved' wiki page.")
     else:  # Means we should write to the 'identified' page:
-        page_content = reddit.subreddit(CORRECTED_SUBREDDIT).wiki["identified"]
         new_content = f"{oformat_date} | [{otitle}](https://redd.it/{oid}) | {oflair_text} | {oflair_new} | u/{user}"
-        # Log in the wiki for later reference
-        page_content_new = str(page_content.content_md) + "\n" + new_content
-        # Adds this month's entry to the data from the wikipage
-        try:
-            page_content.edit(
-                content=page_content_new,
-                reason='Ziwen: updating the "Identified" page with a new link',
-            )
-        except prawcore.exceptions.TooLarge:  # The wikipage is too large.
-            page_name = "identified"
-            message_subject = f"[Notification] '{page_name}' Wiki Page Full"
-            message_template = MSG_WIKIPAGE_FULL.format(page_name)
-            logger.warning(f"Save_Wiki: The '{page_name}' wiki page is full.")
-            reddit.subreddit("translatorBOT").message(
-                subject=message_subject, message=message_template
-            )
-        logger.info("Save_Wiki: Updated the 'identified' wiki page.")
+        # Log in the wiki for later reference. A full page is continued on a new one.
+        wiki_buffer.append(
+            "identified",
+            new_content,
+            'Ziwen: updating the "Identified" page with a new link',
+        )
+        logger.info("Save_Wiki: Queued an update to the 'identified' wiki page.")
 
 
 def komento_submission_from_comment(
@@ -493,14 +899,129 @@ Komento-related functions are all prefixed with `komento` in their name.
 """
 
 
+def komento_bot_comment(comment_body: str) -> tuple[str, Dict[str, Any]] | None:
+    """
+    Works out which kind of notice one of the bot's own comments is from its text, along with the details the bot
+    needs from it later. Lookup replies get their searched terms from their parent comment, which the caller adds.
+
+    :param comment_body: The text of a comment by the bot.
+    :return: A tuple of the kind and a payload dictionary, or None if it is not a comment the bot looks for.
+    """
+
+    cbody = comment_body.lower()  # Lower case everything.
+    lookup_keywords = [
+        "wiktionary",
+        "` doesn't look like anything",
+        "no results",
+        "couldn't find anything",
+    ]
+
+    if "this is a crossposted translation request" in cbody:
+        # We want to get a few more values.
+        op_match = comment_body.split(" at")[0]
+        op_match = op_match.split("/")[1].strip()  # Get just the username
+        requester_match = comment_body.split("**Requester:**")[1]
+        requester = requester_match.split("\n", 1)[0].strip()[2:]
+        original_post = comment_body.split("**Requester:**")[0]  # Split in half
+        # Get just the post ID
+        original_post_id = original_post.split("comments/")[1].strip()[0:6]
+        return "xp", {
+            "op": op_match,
+            "requester": requester,
+            "original_submission": original_post_id,
+        }
+    elif any(keyword in cbody for keyword in lookup_keywords):
+        return "lookup", {}
+    elif "ethnologue" in cbody or "multitree" in cbody:
+        return "reference", {}
+    elif "translation request tagged as 'unknown.'" in cbody:
+        return "unknown", {}
+    elif "your translation request appears to be very long" in cbody:
+        return "long", {}
+    elif "please+check+this+out" in cbody:
+        # This is the response to an invalid !identify command
+        return "invalid_code", {}
+    elif "multiple defined languages" in cbody:
+        return "defined_multiple", {}
+    elif "## search results on r/translator" in cbody:
+        return "search", {}
+    elif "they are working on a translation for this" in cbody:
+        # Claim comment. Get the username of the claimer and the time of the claim.
+        claimer = re.search(r"(?<=u/)[\w-]+", cbody)
+        claimer = str(claimer.group(0)).strip()
+
+        claimed_time = cbody.split(" at ")[1]
+        claimed_date, claimed_time = claimed_time.split(" ")[:2]
+        comment_datetime = datetime.strptime(
+            f"{claimed_date} {claimed_time}", "%Y-%m-%d %H:%M:%S"
+        )
+        # The time is written in UTC.
+        return "claim", {
+            "claim_user": claimer,
+            "claim_utc": calendar.timegm(comment_datetime.utctimetuple()),
+        }
+
+    return None
+
+
+def komento_results(bot_comments: List[tuple]) -> Dict[str, Any]:
+    """
+    Builds the Komento dictionary keys for the bot's own comments on a submission.
+
+    :param bot_comments: A list of (comment ID, kind, parent ID, payload) tuples, oldest first, as produced by
+                         `komento_bot_comment` and stored in the `bot_comments` table.
+    :return: A dictionary with keyed values according to the bot's comments.
+    """
+
+    results = {}
+    lookup_comments = {}
+    corresponding_comments = {}
+    lookup_replies = {}
+
+    for cid, kind, parent_id, payload in bot_comments:
+        if kind == "xp":
+            results["bot_xp_comment"] = cid
+            results["bot_xp_op"] = payload["op"]
+            results["bot_xp_requester"] = payload["requester"]
+            results["bot_xp_original_submission"] = payload["original_submission"]
+            if payload.get("original_comment"):
+                results["bot_xp_original_comment"] = payload["original_comment"]
+        elif kind == "lookup":
+            if payload.get("terms") is None:  # The comment it replied to was deleted.
+                continue
+            # Link the specific searches with their data, and the comment with the bot's replies to it.
+            lookup_comments[cid] = payload["terms"]
+            corresponding_comments[parent_id] = payload["terms"]
+            lookup_replies.setdefault(parent_id, []).append(cid)
+        elif kind == "claim":
+            results["bot_claim_comment"] = cid
+            results["claim_user"] = payload["claim_user"]
+            # How long the thing has been claimed for.
+            results["claim_time_diff"] = int(time() - payload["claim_utc"])
+        else:
+            results[f"bot_{kind}"] = cid
+
+    if len(lookup_comments) != 0:  # We have lookup data
+        results["bot_lookup"] = lookup_comments
+        results["bot_lookup_correspond"] = corresponding_comments
+        results["bot_lookup_replies"] = lookup_replies
+
+    return results
+
+
 def komento_analyzer(
-    reddit: praw.Reddit, reddit_submission: praw.reddit.models.Submission
+    reddit: praw.Reddit,
+    reddit_submission: praw.reddit.models.Submission,
+    bot_comments: List[tuple] | None = None,
 ) -> dict[str, Any]:
     """
     A function that returns a dictionary containing various things that Ziwen checks against. It indexes comments with
-    specific keys in the dictionary so that Ziwen can access them directly and easily.
+    specific keys in the dictionary so that Ziwen can access them directly and easily. This walks the entire comment
+    tree of the submission; `ZiwenConfig.komento_analysis` answers from the bot's comment index where it can.
 
     :param reddit_submission:
+    :param bot_comments: If a list is passed, the bot's own comments that were found are added to it as
+                         (comment ID, kind, parent ID, payload) tuples.
     :return: A dictionary with keyed values according to the bot's and user comments.
     """
 
@@ -515,9 +1036,7 @@ def komento_analyzer(
     comments = reddit_submission.comments.list()
 
     results = {}  # The main dictionary file we will return
-    corresponding_comments = {}
-    lookup_comments = {}
-    lookup_replies = {}
+    found_bot_comments = []
     list_of_translators = []
 
     # Iterate through to the comments.
@@ -529,13 +1048,6 @@ def komento_analyzer(
             continue
 
         cbody = comment.body.lower()  # Lower case everything.
-        cid = comment.id
-        lookup_keywords = [
-            "wiktionary",
-            "` doesn't look like anything",
-            "no results",
-            "couldn't find anything",
-        ]
 
         # Check for OP Short thanks.
         if cauthor == oauthor and any(keyword in cbody for keyword in THANKS_KEYWORDS):
@@ -544,22 +1056,15 @@ def komento_analyzer(
 
         # Check for bot's own comments
         if cauthor == USERNAME:  # Comment is by the bot.
-            if "this is a crossposted translation request" in cbody:
-                results["bot_xp_comment"] = cid
-                # We want to get a few more values.
-                op_match = comment.body.split(" at")[0]
-                op_match = op_match.split("/")[1].strip()  # Get just the username
-                results["bot_xp_op"] = op_match
-                requester_match = comment.body.split("**Requester:**")[1]
-                requester = requester_match.split("\n", 1)[0].strip()[2:]
-                results["bot_xp_requester"] = requester
-                original_post = comment.body.split("**Requester:**")[0]  # Split in half
-                # Get just the post ID
-                original_post_id = original_post.split("comments/")[1].strip()[0:6]
-                results["bot_xp_original_submission"] = original_post_id
+            bot_comment = komento_bot_comment(comment.body)
+            if bot_comment is None:
+                continue
+            kind, payload = bot_comment
+
+            if kind == "xp":
                 # Linked comment in other subreddit.
                 # Original post is the original cross-posted thing
-                original_post = reddit.submission(original_post_id)
+                original_post = reddit.submission(payload["original_submission"])
                 original_post.comments.replace_more(limit=3)
                 original_comments = original_post.comments.list()
                 for ori_comment in original_comments:
@@ -572,85 +1077,28 @@ def komento_analyzer(
                         ori_comment_author == "translator-BOT"
                         and "I've [crossposted]" in ori_comment.body
                     ):
-                        results["bot_xp_original_comment"] = ori_comment.id
-            elif any(keyword in cbody for keyword in lookup_keywords):
-                bot_replied_comments = []
-
-                # We do need to modify this to accept more than one.
+                        payload["original_comment"] = ori_comment.id
+            elif kind == "lookup":
                 # This is the comment with the actual lookup words.
-                parent_lookup_comment = comment.parent()
-
-                parent_body = parent_lookup_comment.body
-                parent_x_id = parent_lookup_comment.id
-
+                parent_body = comment.parent().body
+                payload["terms"] = None
                 if len(parent_body) != 0 and "[deleted]" not in parent_body:
                     # Now we want to create a list/dict linking the specific searches with their data.
-                    lookup_results = lookup_matcher(parent_body, None)
-                    # We add what specific things were searched
-                    lookup_comments[cid] = lookup_results
-                    corresponding_comments[parent_lookup_comment.id] = lookup_results
-                    parent_replies = parent_lookup_comment.replies
-
-                    for reply in parent_replies:
-                        # We need to double-check why there are so many replies.
-                        if "Ziwen" in reply.body and reply.parent_id[3:] == parent_x_id:
-                            bot_replied_comments.append(reply.id)
-                    lookup_replies[parent_x_id] = bot_replied_comments
-
-            elif "ethnologue" in cbody or "multitree" in cbody:
-                results["bot_reference"] = cid
-            elif "translation request tagged as 'unknown.'" in cbody:
-                results["bot_unknown"] = cid
-            elif "your translation request appears to be very long" in cbody:
-                results["bot_long"] = cid
-            elif "please+check+this+out" in cbody:
-                # This is the response to an invalid !identify command
-                results["bot_invalid_code"] = cid
-            elif "multiple defined languages" in cbody:
-                results["bot_defined_multiple"] = cid
-            elif "## Search results on r/translator" in cbody:
-                results["bot_search"] = cid
-            elif "they are working on a translation for this" in cbody:
-                # Claim comment. we want to get a couple more values.
-                results["bot_claim_comment"] = cid
-                # Get the username of the claimer
-                claimer = re.search(r"(?<=u/)[\w-]+", cbody)
-                claimer = str(claimer.group(0)).strip()
-                results["claim_user"] = claimer
-
-                current_c_time = time()
-                claimed_time = cbody.split(" at ")[1]
-                claimed_time = claimed_time.split(" UTC")[0]
-                claimed_date = claimed_time.split(" ")[0]
-                claimed_time = claimed_time.split(" ")[1]
-
-                num_year = int(claimed_date.split("-")[0])
-                num_month = int(claimed_date.split("-")[1])
-                num_day = int(claimed_date.split("-")[2])
-
-                num_hour = int(claimed_time.split(":")[0])
-                num_min = int(claimed_time.split(":")[1])
-                num_sec = int(claimed_time.split(":")[2])
-
-                comment_datetime = datetime(
-                    num_year, num_month, num_day, num_hour, num_min, num_sec
-                )
-                # Returns the time in UTC.
-                utc_timestamp = calendar.timegm(comment_datetime())
-                time_difference = int(current_c_time - utc_timestamp)
-                # How long the thing has been claimed for.
-                results["claim_time_diff"] = time_difference
+                    payload["terms"] = lookup_matcher(parent_body, None)
+
+            found_bot_comments.append(
+                (comment.id, kind, comment.parent_id[3:], payload)
+            )
         elif KEYWORDS.translated in cbody or KEYWORDS.doublecheck in cbody:
             # Processing comments by non-bot
             # Get a list of people who have contributed to helping. Unused at present.
             list_of_translators.append(cauthor)
 
-    if len(lookup_comments) != 0:  # We have lookup data
-        results["bot_lookup"] = lookup_comments
-        results["bot_lookup_correspond"] = corresponding_comments
-        results["bot_lookup_replies"] = lookup_replies
+    results.update(komento_results(found_bot_comments))
     if len(list_of_translators) != 0:
         results["translators"] = list_of_translators
+    if bot_comments is not None:
+        bot_comments.extend(found_bot_comments)
 
     return results  # This will be a dictionary with values.
 
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+
+"""
+API USAGE FUNCTIONS
+
+Reddit limits how many API calls the bots can make, but the only figure recorded used to be the total for a run.
+`AccountingRequestor` is passed to PRAW as its requestor so that every HTTP request is counted and timed under the
+stage and the function of the bot that made it, e.g. `ziwen_bot` and `komento_analyzer`.
+
+The stage is the one the scheduler is running in daemon mode, or otherwise the outermost function of the bot that
+led to the request. The function is the innermost one. The counts for each cycle are written to the activity CSV,
+and running this module directly prints a ranking of the biggest consumers over the last runs:
+
+    python -m code._api_usage [number of runs]  # Prints the ranking to standard output.
+
+API usage functions are all prefixed with `api_usage` in their name.
+"""
+
+import csv
+import os
+import sys
+import time
+from code._config import FILE_ADDRESS_ACTIVITY, RECORD_WRITER, logger
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Tuple
+
+import prawcore
+
+CODE_DIRECTORY = os.path.dirname(os.path.realpath(__file__))
+# The activity type of the API usage rows in the activity CSV.
+API_USAGE_ACTIVITY = "API calls"
+
+# The stage set by the scheduler, if any.
+current_stage: ContextVar[str | None] = ContextVar("current_stage", default=None)
+# Requests made this cycle, keyed by (stage, function), as [number of requests, total seconds].
+API_USAGE: Dict[Tuple[str, str], List[float]] = {}
+
+
+@contextmanager
+def api_usage_stage(stage_name: str) -> Iterator[None]:
+    """
+    Attributes the requests made inside the `with` block to a stage.
+
+    :param stage_name: The name of the stage.
+    """
+
+    token = current_stage.set(stage_name)
+    try:
+        yield
+    finally:
+        current_stage.reset(token)
+
+
+@lru_cache(maxsize=None)
+def _is_bot_file(filename: str) -> bool:
+    return os.path.dirname(
+        os.path.realpath(filename)
+    ) == CODE_DIRECTORY and os.path.realpath(filename) != os.path.realpath(__file__)
+
+
+def api_usage_caller() -> Tuple[str, str]:
+    """
+    Works out which stage and function of the bot the current request comes from by walking up the call stack.
+
+    :return: A tuple of the stage name and the function name. `other` for either if it cannot be told.
+    """
+
+    stage = function = None
+    frame = sys._getframe(1)
+    while frame is not None:
+        name = frame.f_code.co_name
+        # Skip module level code, lambdas, and comprehensions.
+        if not name.startswith("<") and _is_bot_file(frame.f_code.co_filename):
+            if function is None:
+                function = name
+            stage = name  # The last one found is the outermost.
+        frame = frame.f_back
+
+    return current_stage.get() or stage or "other", function or "other"
+
+
+class AccountingRequestor(prawcore.Requestor):
+    """A PRAW requestor that counts and times each request by the stage and function that made it."""
+
+    def request(self, *args: Any, **kwargs: Any) -> Any:
+        key = api_usage_caller()
+        started = time.perf_counter()
+        try:
+            return super().request(*args, **kwargs)
+        finally:
+            usage = API_USAGE.setdefault(key, [0, 0.0])
+            usage[0] += 1
+            usage[1] += time.perf_counter() - started
+
+
+def api_usage_flush(run_time: str) -> int:
+    """
+    Writes this cycle's request counts and total latencies to the activity CSV, one row per stage and function, and
+    starts counting again.
+
+    :param run_time: The time of the run, as written in the activity CSV's date column.
+    :return: The total number of requests written.
+    """
+
+    total = 0
+    for (stage, function), (count, seconds) in sorted(API_USAGE.items()):
+        RECORD_WRITER.append_row(
+            FILE_ADDRESS_ACTIVITY,
+            (
+                run_time,
+                API_USAGE_ACTIVITY,
+                count,
+                "",
+                round(seconds, 2),
+                f"{stage} > {function}",
+            ),
+        )
+        total += count
+    API_USAGE.clear()
+    logger.debug(f"api_usage_flush: Recorded {total} API requests.")
+
+    return total
+
+
+def api_usage_summary(
+    runs: int = 10, file_address: str = FILE_ADDRESS_ACTIVITY
+) -> List[Tuple[str, int, float]]:
+    """
+    Ranks the stages and functions that made the most requests over the last runs in the activity CSV.
+
+    :param runs: How many of the latest runs to include.
+    :param file_address: The activity CSV to read.
+    :return: A list of (stage > function, requests, average seconds per request), most requests first.
+    """
+
+    usage_rows = []
+    with open(file_address, newline="", encoding="utf-8") as f:
+        for row in csv.reader(f):
+            if len(row) >= 6 and row[1] == API_USAGE_ACTIVITY:
+                usage_rows.append(row)
+
+    # Runs are told apart by their date column. Keep those of the last few.
+    run_times = list(dict.fromkeys(row[0] for row in usage_rows))[-runs:]
+    totals: Dict[str, List[float]] = {}
+    for _date, _activity, count, _memory, seconds, caller in (
+        row[:6] for row in usage_rows if row[0] in run_times
+    ):
+        caller_totals = totals.setdefault(caller, [0, 0.0])
+        caller_totals[0] += int(count)
+        caller_totals[1] += float(seconds)
+
+    ranking = [
+        (caller, int(count), seconds / count if count else 0.0)
+        for caller, (count, seconds) in totals.items()
+    ]
+    return sorted(ranking, key=lambda entry: entry[1], reverse=True)
+
+
+if __name__ == "__main__":
+    number_of_runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    print(f"API requests over the last {number_of_runs} runs:")
+    for caller_name, requests, average in api_usage_summary(number_of_runs):
+        print(f"{requests:>8}  {average:6.2f}s  {caller_name}")
@@ -2,14 +2,22 @@
 
 """Universal functions and variables for r/translator bots to use."""
 
+import atexit
+import csv
 import datetime
+import gzip
 import json
 import logging
 import os
+import queue
 import random
+import sqlite3
+import threading
+from collections import Counter, defaultdict
 from enum import StrEnum
+from logging.handlers import QueueHandler, QueueListener
 from time import strftime
-from typing import Dict, NamedTuple
+from typing import Any, Dict, List, NamedTuple, Sequence, Tuple
 
 # Set up the directories based on the current location of the bots.
 # Fetch the absolute directory the script is in.
@@ -21,6 +29,8 @@ SCRIPT_DIRECTORY += "/Data/"  # Where the main files are kept.
 
 # A number that defines the soft number of notifications an individual will get in a month *per language*.
 NOTIFICATIONS_LIMIT = 100
+# How long (in seconds) notifications are held for users who get them as digests, to be sent together in one message.
+NOTIFICATIONS_DIGEST_WINDOW = 3600
 SUBREDDIT = "translator"
 
 # Ziwen main database files (either static files or files that will be written to).
@@ -31,6 +41,16 @@ FILE_ADDRESS_MAIN = os.path.join(SCRIPT_DIRECTORY, "_database_main.db")
 
 # Ziwen SQLite3 cache file (cache file data is generated as the bot runs and is volatile).
 FILE_ADDRESS_CACHE = os.path.join(SCRIPT_DIRECTORY, "_cache_main.db")
+# Bloom filter in front of the processed posts and comments table. Rebuilt from the table if missing.
+FILE_ADDRESS_PROCESSED_FILTER = os.path.join(SCRIPT_DIRECTORY, "_cache_processed.bloom")
+# The latest posts and comments fetched by one of the bots, for the others to reuse while it is recent.
+FILE_ADDRESS_SNAPSHOT = os.path.join(SCRIPT_DIRECTORY, "_cache_snapshot.json.gz")
+# The moderators of the subreddit as last fetched by one of the bots, for the others to reuse while it is recent.
+FILE_ADDRESS_MODERATORS = os.path.join(SCRIPT_DIRECTORY, "_cache_moderators.json")
+# The wiki pages that full log pages have been continued on, so the bots can write to them directly.
+FILE_ADDRESS_WIKI_PAGES = os.path.join(SCRIPT_DIRECTORY, "_cache_wiki_pages.json")
+# The lines that could not be added to the wiki yet, for the next run of the bot to add.
+FILE_ADDRESS_WIKI_PENDING = os.path.join(SCRIPT_DIRECTORY, "_cache_wiki_pending.json")
 
 # Ziwen language database files (reference files for language-related functions).
 FILE_ADDRESS_OLD_CHINESE = os.path.join(SCRIPT_DIRECTORY, "_database_old_chinese.csv")
@@ -148,10 +168,126 @@ handler = logging.FileHandler(FILE_ADDRESS_EVENTS)
 handler.setLevel(logging.INFO)
 handler_format = logging.Formatter(logformatter, datefmt="%Y-%m-%d [%I:%M:%S %p]")
 handler.setFormatter(handler_format)
-logger.addHandler(handler)
+
+# The bots only put records on a queue; a background listener does the writing to the events file.
+# The listener is stopped at exit, which writes out anything still on the queue.
+log_queue: queue.SimpleQueue = queue.SimpleQueue()
+logger.addHandler(QueueHandler(log_queue))
+log_listener = QueueListener(log_queue, handler, respect_handler_level=True)
+log_listener.start()
+atexit.register(log_listener.stop)
+
+
+class RecordWriter:
+    """
+    Appends text and CSV rows to the bots' record files from a background thread, so that the bots do not wait on
+    the disk. Whatever is waiting when the writer wakes up is written in one go, with each file opened once.
+    Everything queued is written when the writer is closed, which happens automatically at exit.
+    """
+
+    def __init__(self) -> None:
+        self._queue: queue.Queue = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run, name="record-writer", daemon=True
+        )
+        self._thread.start()
+
+    def append(self, file_address: str, text: str) -> None:
+        """
+        Queues text to be appended to a file.
+
+        :param file_address: The file to append to.
+        :param text: The text to append, as is.
+        :return: Nothing.
+        """
+
+        self._put(file_address, text, False)
+
+    def append_row(self, file_address: str, row: Sequence) -> None:
+        """
+        Queues a row to be appended to a CSV file.
+
+        :param file_address: The CSV file to append to.
+        :param row: The values of the row.
+        :return: Nothing.
+        """
+
+        self._put(file_address, tuple(row), True)
+
+    def flush(self) -> None:
+        """
+        Waits until everything queued so far has been written.
+
+        :return: Nothing.
+        """
+
+        self._queue.join()
+
+    def close(self) -> None:
+        """
+        Writes everything still queued and stops the background thread. Further records are written directly.
+
+        :return: Nothing.
+        """
+
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+
+    def _put(self, file_address: str, payload: str | Tuple, is_row: bool) -> None:
+        if self._closed:  # Past shutdown there is no thread left, so write it here.
+            self._write([(file_address, payload, is_row)])
+        else:
+            self._queue.put((file_address, payload, is_row))
+
+    def _run(self) -> None:
+        running = True
+        while running:
+            batch = [self._queue.get()]
+            while True:  # Take everything else that is already waiting.
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                running = False
+            try:
+                self._write([item for item in batch if item is not None])
+            except (OSError, UnicodeError) as e:
+                logger.error(f"RecordWriter: Could not write records: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    @staticmethod
+    def _write(items: List[Tuple[str, str | Tuple, bool]]) -> None:
+        by_file = defaultdict(list)
+        for file_address, payload, is_row in items:
+            by_file[(file_address, is_row)].append(payload)
+
+        for (file_address, is_row), payloads in by_file.items():
+            if is_row:
+                with open(file_address, "a", newline="", encoding="utf-8") as f:
+                    csv.writer(
+                        f, delimiter=",", quotechar='"', quoting=csv.QUOTE_MINIMAL
+                    ).writerows(payloads)
+            else:
+                with open(file_address, "a", encoding="utf-8") as f:
+                    f.write("".join(payloads))
+
+
+# The shared writer for the record files. Registered after the log listener so it is closed first at exit.
+RECORD_WRITER = RecordWriter()
+atexit.register(RECORD_WRITER.close)
 
 """ UNIVERSAL FUNCTIONS SHARED BY COMPONENTS """
 
+# Action counts recorded during this cycle, keyed by (day, action). Written out by `action_counter_flush`.
+PENDING_ACTIONS: Counter = Counter()
+
 
 def get_random_useragent() -> Dict[str, str]:
     """
@@ -174,7 +310,8 @@ def get_random_useragent() -> Dict[str, str]:
 
 def action_counter(messages_number: int, action_type: str) -> None:
     """
-    Function takes in a number and an action type and writes it to a file.
+    Function takes in a number and an action type and adds it to the counts pending for today. The pending counts
+    are written to the `action_counts` table of the main database by `action_counter_flush` once per cycle.
 
     :param messages_number: The number of actions to record. Typically 1, but more for some (like notifications).
     :param action_type: The type of action, as a string. Usually a command.
@@ -190,18 +327,66 @@ def action_counter(messages_number: int, action_type: str) -> None:
 
     # Format the current day as a string.
     current_day = strftime("%Y-%m-%d")
+    PENDING_ACTIONS[(current_day, str(action_type))] += messages_number
 
-    # Open the file for reading and access its content.
-    with open(FILE_ADDRESS_COUNTER, "a+", encoding="utf-8") as f:
-        current_actions_dict = json.load(f)
-        if current_day in current_actions_dict:  # This day has been recorded.
-            if action_type in current_actions_dict[current_day]:
-                current_actions_dict[current_day][action_type] += messages_number
-            else:
-                current_actions_dict[current_day][action_type] = messages_number
-        else:  # This day hasn't been recorded.
-            current_actions_dict[current_day] = {action_type: messages_number}
-            json.dump(current_actions_dict, f, sort_keys=True, indent=4)
+
+def action_counter_flush(conn: sqlite3.Connection) -> int:
+    """
+    Writes the pending action counts to the main database in a single transaction and clears them.
+
+    :param conn: The connection to the main database.
+    :return: The number of (day, action) counts that were written.
+    """
+
+    if not PENDING_ACTIONS:
+        return 0
+
+    with conn:
+        conn.executemany(
+            "INSERT INTO action_counts (day, action, count) VALUES (?, ?, ?) "
+            "ON CONFLICT(day, action) DO UPDATE SET count = count + excluded.count",
+            [(day, action, count) for (day, action), count in PENDING_ACTIONS.items()],
+        )
+    written = len(PENDING_ACTIONS)
+    PENDING_ACTIONS.clear()
+    logger.debug(f"action_counter_flush: Wrote {written} action counts.")
+
+    return written
+
+
+def action_counter_export(
+    conn: sqlite3.Connection, file_address: str = FILE_ADDRESS_COUNTER
+) -> Dict[str, Dict[str, int]]:
+    """
+    Writes the recorded action counts out in the format of the old counter log, a dictionary of days with a
+    dictionary of actions and their counts for each, for anything that still reads that file. Counts are only ever
+    added to the current day, so only it and the day before are read again; the older days are kept from the file.
+    Every day is read if the file is missing or unreadable.
+
+    :param conn: The connection to the main database.
+    :param file_address: Where to write the JSON file.
+    :return: The dictionary that was written.
+    """
+
+    actions_dict = _shared_cache_load(file_address)
+    if actions_dict:
+        yesterday = datetime.date.today() - datetime.timedelta(days=1)
+        since_day = yesterday.strftime("%Y-%m-%d")
+    else:
+        since_day = ""
+    for day in [day for day in actions_dict if day >= since_day]:
+        del actions_dict[day]
+    for day, action, count in conn.execute(
+        "SELECT day, action, count FROM action_counts WHERE day >= ? "
+        "ORDER BY day, action",
+        (since_day,),
+    ):
+        actions_dict.setdefault(day, {})[action] = count
+
+    with open(file_address, "w", encoding="utf-8") as f:
+        json.dump(actions_dict, f, sort_keys=True, indent=4)
+
+    return actions_dict
 
 
 def time_convert_to_string(unix_integer) -> str:
@@ -215,3 +400,46 @@ def time_convert_to_string(unix_integer) -> str:
         :19
     ]
     return f"{utc_time}Z"
+
+
+def _shared_cache_load(file_address: str) -> Dict[str, Any]:
+    opener = gzip.open if file_address.endswith(".gz") else open
+    try:
+        with opener(file_address, "rt", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError, EOFError):
+        return {}
+
+
+def shared_cache_read(file_address: str, subreddit: str) -> Dict[str, Any]:
+    """
+    Reads what one of the bots saved to a shared cache file (such as `FILE_ADDRESS_MODERATORS`) for a subreddit, so
+    that another process can use it instead of fetching it again. Files ending in `.gz` are gzipped.
+
+    :param file_address: The cache file to read.
+    :param subreddit: The name of the subreddit that the data is for.
+    :return: The dictionary saved for the subreddit. Empty if there is none or the file cannot be read.
+    """
+
+    return _shared_cache_load(file_address).get(subreddit) or {}
+
+
+def shared_cache_write(file_address: str, subreddit: str, data: Dict[str, Any]) -> None:
+    """
+    Saves data for a subreddit to a shared cache file, keeping what is saved there for other subreddits. The file is
+    written to a temporary file first and then swapped in, so that another process never reads a half-written one.
+
+    :param file_address: The cache file to write.
+    :param subreddit: The name of the subreddit that the data is for.
+    :param data: A dictionary that can be saved as JSON.
+    :return: Nothing.
+    """
+
+    saved = _shared_cache_load(file_address)
+    saved[subreddit] = data
+
+    opener = gzip.open if file_address.endswith(".gz") else open
+    temporary_address = f"{file_address}.{os.getpid()}.tmp"
+    with opener(temporary_address, "wt", encoding="utf-8") as f:
+        json.dump(saved, f)
+    os.replace(temporary_address, file_address)
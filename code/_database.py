@@ -0,0 +1,1109 @@
+#!/usr/bin/env python3
+
+"""
+DATABASE SCHEMA FUNCTIONS
+
+Ziwen keeps its state in three local SQLite files: the main database (notifications, points, processed items, action counts),
+the cache database (edit cache, multipliers, Wikipedia lookups), and the Ajo database. Their tables were originally
+created by hand, so this module holds the changes that have been made to them since, as an ordered list of named
+migrations per file.
+Each applied migration is recorded in a `schema_migrations` table inside that file so that it only ever runs once.
+
+Schema functions are all prefixed with `database` in their name. This module also holds `ProcessedStore`, which
+records the posts and comments that have already been processed, and `LanguageStatisticsStore`, an indexed copy of
+the language statistics file. Zifang's equivalents are `ZifangProcessedStore` and `ZifangPostWindow`, its window of
+recent posts.
+"""
+
+import ast
+import hashlib
+import json
+import math
+import os
+import sqlite3
+import struct
+import time
+import zlib
+from code._config import FILE_ADDRESS_COUNTER, logger
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Set, Tuple
+
+"""SCHEMA HELPERS"""
+
+
+def database_columns(conn: sqlite3.Connection, table_name: str) -> List[str]:
+    """
+    Returns the names of the columns of a table.
+
+    :param conn: The SQLite connection to check.
+    :param table_name: The name of the table.
+    :return: A list of column names. Empty if the table does not exist.
+    """
+
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table_name})")]
+
+
+def database_add_column(
+    conn: sqlite3.Connection, table_name: str, column_name: str, column_type: str
+) -> None:
+    """
+    Adds a column to a table if it isn't already there.
+
+    :param conn: The SQLite connection to modify.
+    :param table_name: The name of the table.
+    :param column_name: The name of the new column.
+    :param column_type: The SQLite type of the new column, e.g. `TEXT`.
+    :return: Nothing.
+    """
+
+    if column_name not in database_columns(conn, table_name):
+        conn.execute(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column_type}")
+
+
+def database_ajo_columns(ajo_data: Dict[str, Any]) -> Tuple[str | None, str | None]:
+    """
+    Derives the queryable status and language code of an Ajo from its dictionary, which is either the `__dict__` of
+    a live Ajo or the dictionary stored in the Ajo database. Older Ajos keep their language data at the top level,
+    newer ones keep it under `ajo_language_info`.
+
+    :param ajo_data: A dictionary of Ajo data.
+    :return: A tuple of the status and the language code(s). Defined multiple posts keep per-language statuses in
+             the Ajo itself, so their status is None. Multiple codes are joined with `+`.
+    """
+
+    status = ajo_data.get("status")
+    if not isinstance(status, str) or not status:
+        status = None
+
+    language_info = ajo_data.get("ajo_language_info") or ajo_data
+    if not isinstance(language_info, dict):
+        language_info = vars(language_info)
+
+    codes = []
+    for key in ("language_code_1", "language_code_3"):
+        value = language_info.get(key)
+        if isinstance(value, str):
+            value = [value]
+        codes = [code for code in value or [] if code]
+        if codes:
+            break
+
+    return status, "+".join(codes) if codes else None
+
+
+def database_content_hash(text: str) -> int:
+    """
+    Returns a 64-bit hash of some text, as a signed integer so that it fits in an SQLite INTEGER column.
+
+    :param text: The text to hash, e.g. the body of a comment.
+    :return: A signed 64-bit integer.
+    """
+
+    digest = hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+def database_compress_text(text: str) -> bytes:
+    """
+    Compresses text for storage in a BLOB column.
+
+    :param text: The text to compress.
+    :return: The zlib-compressed UTF-8 bytes of the text.
+    """
+
+    return zlib.compress(text.encode("utf-8"))
+
+
+def database_decompress_text(data: bytes) -> str:
+    """
+    Reverses `database_compress_text`.
+
+    :param data: The compressed bytes.
+    :return: The original text.
+    """
+
+    return zlib.decompress(data).decode("utf-8")
+
+
+def database_attach(conn: sqlite3.Connection, schema_name: str, path: str) -> None:
+    """
+    Attaches another database file to a connection under a schema name, unless it is already attached.
+
+    :param conn: The SQLite connection to attach to.
+    :param schema_name: The name to refer to the attached database by, e.g. `ajo` for `ajo.local_database`.
+    :param path: The path of the database file.
+    :return: Nothing.
+    """
+
+    attached = [row[1] for row in conn.execute("PRAGMA database_list")]
+    if schema_name not in attached:
+        conn.commit()  # Databases cannot be attached in the middle of a transaction.
+        conn.execute("ATTACH DATABASE ? AS ?", (path, schema_name))
+
+
+"""MIGRATIONS"""
+
+
+def _main_base(conn: sqlite3.Connection) -> None:
+    for statement in (
+        "CREATE TABLE IF NOT EXISTS language_cache (language_code TEXT, language_data TEXT)",
+        "CREATE TABLE IF NOT EXISTS notify_monthly_limit (username TEXT, received INTEGER)",
+        "CREATE TABLE IF NOT EXISTS notify_users (language_code TEXT, username TEXT)",
+        "CREATE TABLE IF NOT EXISTS oldcomments (id TEXT)",
+        "CREATE TABLE IF NOT EXISTS oldposts (id TEXT)",
+        "CREATE TABLE IF NOT EXISTS total_commands (username TEXT, commands TEXT)",
+        "CREATE TABLE IF NOT EXISTS total_points "
+        "(month_year TEXT, pid TEXT, username TEXT, points TEXT, oid TEXT)",
+    ):
+        conn.execute(statement)
+
+
+def _main_notify_monthly_counts(conn: sqlite3.Connection) -> None:
+    """
+    Replaces the per-user dictionaries of `notify_monthly_limit` with one row per user, language, and month.
+    The old dictionaries did not record a month, so their counts are assigned to the current one.
+    """
+
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS notify_monthly_counts (username TEXT NOT NULL, language_code TEXT NOT NULL, "
+        "month TEXT NOT NULL, count INTEGER NOT NULL DEFAULT 0, PRIMARY KEY (username, language_code, month))"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_notify_monthly_counts_month ON notify_monthly_counts(month)"
+    )
+
+    current_month = datetime.fromtimestamp(time.time()).strftime("%Y-%m")
+    exploded = []
+    for username, received in conn.execute(
+        "SELECT username, received FROM notify_monthly_limit"
+    ):
+        try:
+            received = ast.literal_eval(received)
+        except (ValueError, SyntaxError):
+            logger.warning(
+                f"database: Could not parse notification counts for {username}."
+            )
+            continue
+        for language_code, count in received.items():
+            exploded.append((username, language_code, current_month, count))
+    conn.executemany(
+        "INSERT INTO notify_monthly_counts VALUES (?, ?, ?, ?) "
+        "ON CONFLICT(username, language_code, month) DO UPDATE SET count = count + excluded.count",
+        exploded,
+    )
+    conn.execute("DROP TABLE notify_monthly_limit")
+
+
+def _cache_base(conn: sqlite3.Connection) -> None:
+    conn.execute("CREATE TABLE IF NOT EXISTS comment_cache (id TEXT, content TEXT)")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS multiplier_cache "
+        "(month_year TEXT, language_name TEXT, language_multiplier TEXT)"
+    )
+
+
+def _cache_comment_hashes(conn: sqlite3.Connection) -> None:
+    """
+    Rebuilds the edit cache to store a content hash for comparisons and a compressed copy of the body for diffs,
+    keyed by comment ID and with a created time so that it can be pruned by age. Existing entries have no recorded
+    time and are given the current one.
+    """
+
+    conn.execute(
+        "CREATE TABLE comment_cache_new (id TEXT PRIMARY KEY, content_hash INTEGER NOT NULL, "
+        "created_utc INTEGER NOT NULL, content BLOB)"
+    )
+    current_time = int(time.time())
+    conn.executemany(
+        "INSERT OR REPLACE INTO comment_cache_new VALUES (?, ?, ?, ?)",
+        [
+            (
+                comment_id,
+                database_content_hash(content),
+                current_time,
+                database_compress_text(content),
+            )
+            for comment_id, content in conn.execute(
+                "SELECT id, content FROM comment_cache WHERE content IS NOT NULL"
+            )
+        ],
+    )
+    conn.execute("DROP TABLE comment_cache")
+    conn.execute("ALTER TABLE comment_cache_new RENAME TO comment_cache")
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_comment_cache_created ON comment_cache(created_utc)"
+    )
+
+
+def _cache_language_statistics(conn: sqlite3.Connection) -> None:
+    """
+    Adds an indexed copy of `_statistics.json`, one row per language code, and a table recording the modification
+    time of the file it was last loaded from.
+    """
+
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS language_statistics (language_code TEXT PRIMARY KEY, content_hash INTEGER, "
+        "data TEXT)"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS language_statistics_source (path TEXT PRIMARY KEY, mtime REAL)"
+    )
+
+
+def _cache_wikipedia(conn: sqlite3.Connection) -> None:
+    """
+    Adds Zifang's cache of Wikipedia lookups, keyed by language code and term. A term that could not be resolved is
+    stored with no summary, so that it is not looked up again on every run either.
+    """
+
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS wikipedia_cache (language_code TEXT NOT NULL, term TEXT NOT NULL, "
+        "summary TEXT, url TEXT, expires_utc INTEGER NOT NULL, PRIMARY KEY (language_code, term))"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_wikipedia_cache_expires ON wikipedia_cache(expires_utc)"
+    )
+
+
+def _ajo_base(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS local_database (id TEXT, created_utc INTEGER, ajo TEXT)"
+    )
+
+
+def _ajo_index_columns(conn: sqlite3.Connection) -> None:
+    """
+    Adds status, language, and claim columns to the Ajo database so that they can be queried without loading each
+    Ajo, and makes `id` unique so that `ajo_writer` can upsert.
+    """
+
+    for column_name, column_type in (
+        ("status", "TEXT"),
+        ("language_code", "TEXT"),
+        ("claim_user", "TEXT"),
+        ("claim_time", "INTEGER"),
+    ):
+        database_add_column(conn, "local_database", column_name, column_type)
+
+    # Keep only the most recent copy of any duplicated Ajo before making the ID unique.
+    conn.execute(
+        "DELETE FROM local_database WHERE rowid NOT IN "
+        "(SELECT MAX(rowid) FROM local_database GROUP BY id)"
+    )
+    conn.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_local_database_id ON local_database(id)"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_local_database_claims "
+        "ON local_database(status, claim_time)"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_local_database_language "
+        "ON local_database(language_code, created_utc)"
+    )
+
+    # Backfill the new columns from the stored Ajos.
+    backfill = []
+    for ajo_id, ajo_text in conn.execute("SELECT id, ajo FROM local_database"):
+        try:
+            ajo_data = ast.literal_eval(ajo_text)
+        except (ValueError, SyntaxError):
+            logger.warning(f"database: Could not parse stored Ajo {ajo_id}.")
+            continue
+        status, language_code = database_ajo_columns(ajo_data)
+        claim_time = None
+        if status == "inprogress":
+            claim_time = (ajo_data.get("time_delta") or {}).get("inprogress")
+        backfill.append((status, language_code, claim_time, ajo_id))
+    conn.executemany(
+        "UPDATE local_database SET status = ?, language_code = ?, claim_time = ? WHERE id = ?",
+        backfill,
+    )
+
+
+def _main_total_command_counts(conn: sqlite3.Connection) -> None:
+    """
+    Replaces the per-user dictionaries of `total_commands` with one row per user and command.
+    """
+
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS total_command_counts (username TEXT NOT NULL, command TEXT NOT NULL, "
+        "count INTEGER NOT NULL DEFAULT 0, PRIMARY KEY (username, command))"
+    )
+
+    exploded = []
+    for username, commands in conn.execute(
+        "SELECT username, commands FROM total_commands"
+    ):
+        try:
+            commands = ast.literal_eval(commands)
+        except (ValueError, SyntaxError):
+            logger.warning(f"database: Could not parse command counts for {username}.")
+            continue
+        for command, count in commands.items():
+            if command != "Notifications":  # Notifications are counted separately.
+                exploded.append((username, command, count))
+    conn.executemany(
+        "INSERT INTO total_command_counts VALUES (?, ?, ?) "
+        "ON CONFLICT(username, command) DO UPDATE SET count = count + excluded.count",
+        exploded,
+    )
+    conn.execute("DROP TABLE total_commands")
+
+
+def _main_processed_items(conn: sqlite3.Connection) -> None:
+    """
+    Moves `oldposts` and `oldcomments` into a single table of processed items with the time they were processed,
+    so that both can be pruned by age. Existing entries have no recorded time and are given the current one.
+    """
+
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS processed_items (kind TEXT NOT NULL, id TEXT NOT NULL, "
+        "processed_utc INTEGER NOT NULL, PRIMARY KEY (kind, id)) WITHOUT ROWID"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_processed_items_time ON processed_items(processed_utc)"
+    )
+    current_time = int(time.time())
+    for kind, table_name in (("post", "oldposts"), ("comment", "oldcomments")):
+        conn.execute(
+            f"INSERT OR IGNORE INTO processed_items SELECT ?, id, ? FROM {table_name} WHERE id IS NOT NULL",
+            (kind, current_time),
+        )
+        conn.execute(f"DROP TABLE {table_name}")
+
+
+def _main_total_points_integer(conn: sqlite3.Connection) -> None:
+    """
+    Rebuilds `total_points` with an integer `points` column (it was stored as text) and adds the indexes used by
+    the points reports and leaderboards.
+    """
+
+    conn.execute(
+        "CREATE TABLE total_points_new "
+        "(month_year TEXT, pid TEXT, username TEXT, points INTEGER NOT NULL DEFAULT 0, oid TEXT)"
+    )
+    conn.execute(
+        "INSERT INTO total_points_new SELECT month_year, pid, username, CAST(points AS INTEGER), oid "
+        "FROM total_points"
+    )
+    conn.execute("DROP TABLE total_points")
+    conn.execute("ALTER TABLE total_points_new RENAME TO total_points")
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_total_points_user "
+        "ON total_points(username, month_year, oid, points)"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_total_points_month "
+        "ON total_points(month_year, username, points)"
+    )
+
+
+def _main_action_counts(conn: sqlite3.Connection) -> None:
+    """
+    Creates the table of daily action counts, which replaces the counter JSON log. Any counts already in that log
+    are imported.
+    """
+
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS action_counts (day TEXT NOT NULL, action TEXT NOT NULL, "
+        "count INTEGER NOT NULL DEFAULT 0, PRIMARY KEY (day, action)) WITHOUT ROWID"
+    )
+    if not os.path.exists(FILE_ADDRESS_COUNTER):
+        return
+
+    try:
+        with open(FILE_ADDRESS_COUNTER, encoding="utf-8") as f:
+            actions_dict = json.load(f)
+    except (OSError, ValueError):
+        logger.warning("database: Could not read the existing counter log.")
+        return
+    conn.executemany(
+        "INSERT OR IGNORE INTO action_counts VALUES (?, ?, ?)",
+        [
+            (day, action, count)
+            for day, actions in actions_dict.items()
+            for action, count in actions.items()
+        ],
+    )
+
+
+def _main_bot_comments(conn: sqlite3.Connection) -> None:
+    """
+    Creates the index of the bot's own comments (claim notices, lookup replies, and so on) that Komento reads instead
+    of walking a submission's whole comment tree, and the table of submissions whose bot comments are all in it.
+    """
+
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS bot_comments (comment_id TEXT PRIMARY KEY, submission_id TEXT NOT NULL, "
+        "kind TEXT NOT NULL, parent_id TEXT, payload TEXT, created_utc INTEGER NOT NULL)"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_bot_comments_submission ON bot_comments(submission_id)"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS bot_comment_submissions "
+        "(submission_id TEXT PRIMARY KEY, indexed_utc INTEGER NOT NULL) WITHOUT ROWID"
+    )
+
+
+def _main_outbox(conn: sqlite3.Connection) -> None:
+    """
+    Creates the outbox of private messages (notifications and pages) waiting to be sent by `notifier_outbox_drain`.
+    """
+
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS outbox (id INTEGER PRIMARY KEY, recipient TEXT NOT NULL, "
+        "subject TEXT NOT NULL, body TEXT NOT NULL, language TEXT, post_id TEXT, "
+        "attempts INTEGER NOT NULL DEFAULT 0, created_utc INTEGER NOT NULL, next_attempt_utc INTEGER NOT NULL)"
+    )
+
+
+def _main_notify_digests(conn: sqlite3.Connection) -> None:
+    """
+    Creates the table of users who get their notifications as digests, and marks the outbox messages that are
+    digest entries, to be combined into one message per user when they are sent.
+    """
+
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS notify_digest_users "
+        "(username TEXT PRIMARY KEY, opted_utc INTEGER NOT NULL) WITHOUT ROWID"
+    )
+    database_add_column(conn, "outbox", "digest", "INTEGER NOT NULL DEFAULT 0")
+
+
+def _main_zifang_processed(conn: sqlite3.Connection) -> None:
+    """
+    Creates the table of posts and comments Zifang has acted on, which replaces reading the list of them from the
+    `zifang_config` wiki page. The page is kept as a backup, and `synced` marks the IDs that are already on it.
+    """
+
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS zifang_processed (id TEXT PRIMARY KEY, processed_utc INTEGER NOT NULL, "
+        "synced INTEGER NOT NULL DEFAULT 0) WITHOUT ROWID"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_zifang_processed_time ON zifang_processed(processed_utc)"
+    )
+
+
+def _main_zifang_window(conn: sqlite3.Connection) -> None:
+    """
+    Creates Zifang's window of recent posts, which it adds new posts to as they come in instead of going through the
+    whole listing of new posts every cycle.
+    """
+
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS zifang_window (id TEXT PRIMARY KEY, author TEXT, title TEXT NOT NULL, "
+        "created_utc INTEGER NOT NULL) WITHOUT ROWID"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_zifang_window_author ON zifang_window(author, created_utc)"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_zifang_window_time ON zifang_window(created_utc)"
+    )
+
+
+def _main_outbox_limit_code(conn: sqlite3.Connection) -> None:
+    """
+    Adds the language code that a notification in the outbox counts toward in the recipient's monthly limit, so that
+    it is only counted once it has been sent. Pages and messages already waiting have none.
+    """
+
+    database_add_column(conn, "outbox", "limit_code", "TEXT")
+
+
+def _main_zifang_window_checked(conn: sqlite3.Connection) -> None:
+    """
+    Marks the posts in Zifang's window that were already checked for close-out, so that each post is fetched for it
+    only once after it is old enough.
+    """
+
+    database_add_column(
+        conn, "zifang_window", "closeout_checked", "INTEGER NOT NULL DEFAULT 0"
+    )
+
+
+MAIN_MIGRATIONS: List[Tuple[str, Callable[[sqlite3.Connection], None]]] = [
+    ("main_base", _main_base),
+    ("main_notify_monthly_counts", _main_notify_monthly_counts),
+    ("main_total_command_counts", _main_total_command_counts),
+    ("main_total_points_integer", _main_total_points_integer),
+    ("main_processed_items", _main_processed_items),
+    ("main_action_counts", _main_action_counts),
+    ("main_bot_comments", _main_bot_comments),
+    ("main_outbox", _main_outbox),
+    ("main_notify_digests", _main_notify_digests),
+    ("main_zifang_processed", _main_zifang_processed),
+    ("main_zifang_window", _main_zifang_window),
+    ("main_outbox_limit_code", _main_outbox_limit_code),
+    ("main_zifang_window_checked", _main_zifang_window_checked),
+]
+CACHE_MIGRATIONS: List[Tuple[str, Callable[[sqlite3.Connection], None]]] = [
+    ("cache_base", _cache_base),
+    ("cache_comment_hashes", _cache_comment_hashes),
+    ("cache_language_statistics", _cache_language_statistics),
+    ("cache_wikipedia", _cache_wikipedia),
+]
+AJO_MIGRATIONS: List[Tuple[str, Callable[[sqlite3.Connection], None]]] = [
+    ("ajo_base", _ajo_base),
+    ("ajo_index_columns", _ajo_index_columns),
+]
+
+
+"""MIGRATION RUNNER"""
+
+
+def database_migrate(
+    conn: sqlite3.Connection,
+    migrations: List[Tuple[str, Callable[[sqlite3.Connection], None]]],
+) -> List[str]:
+    """
+    Applies any migrations that have not yet been applied to a database, in order. Each migration runs in its own
+    transaction along with its entry in `schema_migrations`, so a failed migration leaves nothing half-done.
+
+    :param conn: The SQLite connection to migrate.
+    :param migrations: An ordered list of (name, function) tuples.
+    :return: A list of the names of the migrations that were applied this time.
+    """
+
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS schema_migrations (name TEXT PRIMARY KEY, applied_utc INTEGER)"
+    )
+    conn.commit()
+    applied = {row[0] for row in conn.execute("SELECT name FROM schema_migrations")}
+
+    newly_applied = []
+    for name, migration in migrations:
+        if name in applied:
+            continue
+        with conn:
+            conn.execute(
+                "BEGIN"
+            )  # Schema changes do not open a transaction on their own.
+            migration(conn)
+            conn.execute(
+                "INSERT INTO schema_migrations VALUES (?, ?)", (name, int(time.time()))
+            )
+        logger.info(f"database: Applied migration `{name}`.")
+        newly_applied.append(name)
+
+    return newly_applied
+
+
+def database_setup(
+    conn_main: sqlite3.Connection,
+    conn_cache: sqlite3.Connection,
+    conn_ajo: sqlite3.Connection,
+) -> List[str]:
+    """
+    Brings all three of Ziwen's databases up to the current schema.
+
+    :param conn_main: Connection to the main database.
+    :param conn_cache: Connection to the cache database.
+    :param conn_ajo: Connection to the Ajo database.
+    :return: A list of the names of the migrations that were applied.
+    """
+
+    applied = []
+    applied += database_migrate(conn_main, MAIN_MIGRATIONS)
+    applied += database_migrate(conn_cache, CACHE_MIGRATIONS)
+    applied += database_migrate(conn_ajo, AJO_MIGRATIONS)
+
+    return applied
+
+
+"""PROCESSED ITEMS"""
+
+
+class BloomFilter:
+    """
+    A fixed-size Bloom filter of strings. It can say that a key has definitely not been added, or that it probably
+    has (with roughly `error_rate` false positives once `capacity` keys have been added).
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01) -> None:
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def __positions(self, key: str):
+        # Double hashing: two 64-bit halves of one digest generate all the positions.
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return (
+            (first + index * second) % self.size for index in range(self.hash_count)
+        )
+
+    def add(self, key: str) -> None:
+        for position in self.__positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self.__positions(key)
+        )
+
+
+class ProcessedStore:
+    """
+    Keeps track of the posts and comments that have already been processed, in the `processed_items` table of the
+    main database. A Bloom filter saved to disk answers most lookups for new items without querying the table; the
+    table is only checked when the filter reports a probable match. Items are kept for a retention period and then
+    pruned, which is safe as long as that period is longer than the age of anything Reddit's listings return.
+
+    The saved filter records when it was written. On loading, anything processed after that (e.g. before a crash)
+    is added back from the table, so the filter never misses an item that is in the table.
+    """
+
+    # The header of the saved filter: bit size, hash count, and the Unix time it was saved.
+    HEADER = struct.Struct("<QIQ")
+
+    def __init__(
+        self, conn: sqlite3.Connection, filter_path: str, capacity: int = 200000
+    ) -> None:
+        self.conn = conn
+        self.filter_path = filter_path
+        self.capacity = capacity
+        self.__filter: BloomFilter | None = None  # Loaded on first use.
+        self.skipped_queries = 0
+
+    def __rebuild(self) -> BloomFilter:
+        bloom = BloomFilter(self.capacity)
+        for kind, item_id in self.conn.execute("SELECT kind, id FROM processed_items"):
+            bloom.add(f"{kind}:{item_id}")
+        return bloom
+
+    def __load(self) -> BloomFilter:
+        if self.__filter is not None:
+            return self.__filter
+
+        bloom = None
+        try:
+            with open(self.filter_path, "rb") as f:
+                size, hash_count, saved_utc = self.HEADER.unpack(
+                    f.read(self.HEADER.size)
+                )
+                bits = bytearray(f.read())
+            bloom = BloomFilter(self.capacity)
+            if (size, hash_count, len(bits)) != (
+                bloom.size,
+                bloom.hash_count,
+                len(bloom.bits),
+            ):
+                bloom = None  # Saved with a different capacity.
+            else:
+                bloom.bits = bits
+                for kind, item_id in self.conn.execute(
+                    "SELECT kind, id FROM processed_items WHERE processed_utc >= ?",
+                    (saved_utc,),
+                ):
+                    bloom.add(f"{kind}:{item_id}")
+        except (OSError, struct.error):
+            pass
+
+        if bloom is None:
+            logger.info("ProcessedStore: Rebuilding the processed items filter.")
+            bloom = self.__rebuild()
+        self.__filter = bloom
+        return bloom
+
+    def is_processed(self, kind: str, item_id: str) -> bool:
+        """
+        Checks whether an item has already been processed.
+
+        :param kind: `post` or `comment`.
+        :param item_id: The Reddit ID of the item.
+        :return: True if it has been processed, False otherwise.
+        """
+
+        if f"{kind}:{item_id}" not in self.__load():
+            self.skipped_queries += 1
+            return False
+        row = self.conn.execute(
+            "SELECT 1 FROM processed_items WHERE kind = ? AND id = ?", (kind, item_id)
+        ).fetchone()
+        return row is not None
+
+    def mark_processed(self, kind: str, item_id: str) -> None:
+        """
+        Records an item as processed.
+
+        :param kind: `post` or `comment`.
+        :param item_id: The Reddit ID of the item.
+        :return: Nothing.
+        """
+
+        self.conn.execute(
+            "INSERT OR IGNORE INTO processed_items VALUES (?, ?, ?)",
+            (kind, item_id, int(time.time())),
+        )
+        self.conn.commit()
+        self.__load().add(f"{kind}:{item_id}")
+
+    def forget(self, kind: str, item_id: str) -> None:
+        """
+        Removes an item so that it will be processed again (e.g. a comment that was edited to add a command).
+        The filter keeps its bits for it, which only means the table is checked for it.
+
+        :param kind: `post` or `comment`.
+        :param item_id: The Reddit ID of the item.
+        :return: Nothing.
+        """
+
+        self.conn.execute(
+            "DELETE FROM processed_items WHERE kind = ? AND id = ?", (kind, item_id)
+        )
+        self.conn.commit()
+
+    def prune(self, retention: int) -> int:
+        """
+        Deletes items processed longer ago than the retention period, then rebuilds and saves the filter so that
+        it does not fill up with deleted items.
+
+        :param retention: How long to keep items, in seconds.
+        :return: The number of items deleted.
+        """
+
+        deleted = self.conn.execute(
+            "DELETE FROM processed_items WHERE processed_utc < ?",
+            (int(time.time()) - retention,),
+        ).rowcount
+        self.conn.commit()
+        self.__filter = self.__rebuild()
+        self.save()
+        return deleted
+
+    def save(self) -> None:
+        """
+        Writes the filter to disk, replacing the previous copy in one step.
+
+        :return: Nothing.
+        """
+
+        if self.__filter is None:
+            return
+        temporary_path = f"{self.filter_path}.tmp"
+        with open(temporary_path, "wb") as f:
+            f.write(
+                self.HEADER.pack(
+                    self.__filter.size, self.__filter.hash_count, int(time.time())
+                )
+            )
+            f.write(self.__filter.bits)
+        os.replace(temporary_path, self.filter_path)
+
+
+class ZifangProcessedStore:
+    """
+    The posts and comments that Zifang has already acted on, in the `zifang_processed` table of the main database.
+    It also keeps track of which IDs have been backed up to the wiki, so that the backup is only written when
+    something changed.
+    """
+
+    def __init__(self, conn: sqlite3.Connection) -> None:
+        self.conn = conn
+
+    def is_processed(self, item_id: str) -> bool:
+        """
+        Checks whether a post or comment has already been acted on.
+
+        :param item_id: The Reddit ID of the item.
+        :return: True if it has been processed, False otherwise.
+        """
+
+        row = self.conn.execute(
+            "SELECT 1 FROM zifang_processed WHERE id = ?", (item_id,)
+        ).fetchone()
+        return row is not None
+
+    def add(self, item_ids: List[str], synced: bool = False) -> int:
+        """
+        Records posts or comments as acted on.
+
+        :param item_ids: The Reddit IDs of the items.
+        :param synced: Whether the items are already on the wiki, e.g. when importing them from it.
+        :return: The number of items that were not recorded before.
+        """
+
+        current_time = int(time.time())
+        added = self.conn.executemany(
+            "INSERT OR IGNORE INTO zifang_processed VALUES (?, ?, ?)",
+            [(item_id, current_time, int(synced)) for item_id in item_ids],
+        ).rowcount
+        self.conn.commit()
+        return added
+
+    def count(self) -> int:
+        """
+        :return: The number of items recorded.
+        """
+
+        return self.conn.execute("SELECT COUNT(*) FROM zifang_processed").fetchone()[0]
+
+    def changed(self) -> bool:
+        """
+        :return: True if there are items that have not been backed up to the wiki yet.
+        """
+
+        row = self.conn.execute(
+            "SELECT 1 FROM zifang_processed WHERE synced = 0 LIMIT 1"
+        ).fetchone()
+        return row is not None
+
+    def recent(self, limit: int) -> List[str]:
+        """
+        Returns the most recently processed items, for the backup on the wiki.
+
+        :param limit: How many items to return at the most.
+        :return: A list of Reddit IDs, sorted.
+        """
+
+        rows = self.conn.execute(
+            "SELECT id FROM zifang_processed ORDER BY processed_utc DESC LIMIT ?",
+            (limit,),
+        )
+        return sorted(item_id for (item_id,) in rows)
+
+    def mark_synced(self) -> None:
+        """
+        Records that every item has been backed up to the wiki.
+
+        :return: Nothing.
+        """
+
+        self.conn.execute("UPDATE zifang_processed SET synced = 1 WHERE synced = 0")
+        self.conn.commit()
+
+    def prune(self, retention: int) -> int:
+        """
+        Deletes items processed longer ago than the retention period.
+
+        :param retention: How long to keep items, in seconds.
+        :return: The number of items deleted.
+        """
+
+        deleted = self.conn.execute(
+            "DELETE FROM zifang_processed WHERE processed_utc < ?",
+            (int(time.time()) - retention,),
+        ).rowcount
+        self.conn.commit()
+        return deleted
+
+
+class ZifangPostWindow:
+    """
+    The recent posts of the subreddit that Zifang checks for duplicates and close-outs, in the `zifang_window` table
+    of the main database. Each post is stored once with its author, title, and created time, when it first appears.
+    """
+
+    def __init__(self, conn: sqlite3.Connection) -> None:
+        self.conn = conn
+
+    def add(self, posts: List[Tuple[str, str | None, str, int]]) -> int:
+        """
+        Adds posts to the window.
+
+        :param posts: A list of (ID, lowercased author name or None if deleted, title, created time) tuples.
+        :return: The number of posts that were not in the window before.
+        """
+
+        added = self.conn.executemany(
+            "INSERT OR IGNORE INTO zifang_window (id, author, title, created_utc) "
+            "VALUES (?, ?, ?, ?)",
+            posts,
+        ).rowcount
+        self.conn.commit()
+        return added
+
+    def known(self, post_ids: List[str]) -> Set[str]:
+        """
+        :param post_ids: A list of Reddit post IDs.
+        :return: The IDs among them that are already in the window.
+        """
+
+        if not post_ids:
+            return set()
+        rows = self.conn.execute(
+            f"SELECT id FROM zifang_window WHERE id IN ({', '.join('?' * len(post_ids))})",
+            post_ids,
+        )
+        return {post_id for (post_id,) in rows}
+
+    def author_posts(self, authors: List[str], since_utc: int) -> Dict[str, List[str]]:
+        """
+        Gets the posts that each of the given authors made since a time.
+
+        :param authors: A list of lowercased author names.
+        :param since_utc: The Unix time to get posts from.
+        :return: A dictionary of author names and the IDs of their posts, oldest first.
+        """
+
+        author_posts = defaultdict(list)
+        if not authors:
+            return author_posts
+        for author, post_id in self.conn.execute(
+            f"SELECT author, id FROM zifang_window WHERE author IN ({', '.join('?' * len(authors))}) "
+            "AND created_utc >= ? ORDER BY created_utc",
+            [*authors, since_utc],
+        ):
+            author_posts[author].append(post_id)
+        return author_posts
+
+    def unprocessed_before(self, before_utc: int) -> List[str]:
+        """
+        Gets the posts made before a time that Zifang has not acted on or checked for close-out yet.
+
+        :param before_utc: The Unix time to get posts until.
+        :return: A list of post IDs, oldest first.
+        """
+
+        rows = self.conn.execute(
+            "SELECT id FROM zifang_window WHERE created_utc <= ? AND author IS NOT NULL "
+            "AND NOT closeout_checked AND id NOT IN (SELECT id FROM zifang_processed) "
+            "ORDER BY created_utc",
+            (before_utc,),
+        )
+        return [post_id for (post_id,) in rows]
+
+    def mark_checked(self, post_ids: List[str]) -> None:
+        """
+        Marks posts as checked for close-out, so that they are not fetched for it again.
+
+        :param post_ids: A list of Reddit post IDs.
+        :return: Nothing.
+        """
+
+        self.conn.executemany(
+            "UPDATE zifang_window SET closeout_checked = 1 WHERE id = ?",
+            [(post_id,) for post_id in post_ids],
+        )
+        self.conn.commit()
+
+    def remove(self, post_ids: List[str]) -> None:
+        """
+        Removes posts from the window, e.g. ones that were removed as duplicates.
+
+        :param post_ids: A list of Reddit post IDs.
+        :return: Nothing.
+        """
+
+        self.conn.executemany(
+            "DELETE FROM zifang_window WHERE id = ?",
+            [(post_id,) for post_id in post_ids],
+        )
+        self.conn.commit()
+
+    def prune(self, before_utc: int) -> int:
+        """
+        Deletes the posts made before a time.
+
+        :param before_utc: The Unix time before which posts are deleted.
+        :return: The number of posts deleted.
+        """
+
+        deleted = self.conn.execute(
+            "DELETE FROM zifang_window WHERE created_utc < ?", (before_utc,)
+        ).rowcount
+        self.conn.commit()
+        return deleted
+
+
+"""LANGUAGE STATISTICS"""
+
+
+class LanguageStatisticsStore:
+    """
+    An indexed copy of the language statistics file (`_statistics.json`), stored one language per row so that a
+    single language can be read without parsing the whole file. The file is only parsed again when its modification
+    time changes, and then only the languages whose data changed are rewritten.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, statistics_path: str) -> None:
+        self.conn = conn
+        self.statistics_path = statistics_path
+
+    def refresh(self) -> int:
+        """
+        Reloads the statistics file if it has changed since it was last loaded.
+
+        :return: The number of languages that were added, updated, or removed. 0 if the file hasn't changed.
+        """
+
+        try:
+            mtime = os.stat(self.statistics_path).st_mtime
+        except OSError:
+            logger.warning("LanguageStatisticsStore: The statistics file is missing.")
+            return 0
+        stored = self.conn.execute(
+            "SELECT mtime FROM language_statistics_source WHERE path = ?",
+            (self.statistics_path,),
+        ).fetchone()
+        if stored is not None and stored[0] == mtime:
+            return 0
+
+        with open(self.statistics_path, encoding="utf-8") as f:
+            statistics_data = json.load(f)
+
+        stored_hashes = dict(
+            self.conn.execute(
+                "SELECT language_code, content_hash FROM language_statistics"
+            )
+        )
+        changed = []
+        for language_code, language_data in statistics_data.items():
+            serialized = json.dumps(language_data, sort_keys=True)
+            content_hash = database_content_hash(serialized)
+            if stored_hashes.get(language_code) != content_hash:
+                changed.append((language_code, content_hash, serialized))
+        removed = [(code,) for code in stored_hashes if code not in statistics_data]
+
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO language_statistics VALUES (?, ?, ?)", changed
+            )
+            self.conn.executemany(
+                "DELETE FROM language_statistics WHERE language_code = ?", removed
+            )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO language_statistics_source VALUES (?, ?)",
+                (self.statistics_path, mtime),
+            )
+        logger.info(
+            f"LanguageStatisticsStore: Reloaded statistics. {len(changed)} updated, {len(removed)} removed."
+        )
+        return len(changed) + len(removed)
+
+    def get(self, language_code: str) -> Dict[str, Any] | None:
+        """
+        Returns the statistics for one language, refreshing the store first if the file has changed.
+
+        :param language_code: Any language code.
+        :return: The language dictionary if it exists. None otherwise.
+        """
+
+        self.refresh()
+        row = self.conn.execute(
+            "SELECT data FROM language_statistics WHERE language_code = ?",
+            (language_code,),
+        ).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def all(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Returns the statistics for every language, refreshing the store first if the file has changed.
+
+        :return: A dictionary of language codes and their language dictionaries.
+        """
+
+        self.refresh()
+        return {
+            language_code: json.loads(data)
+            for language_code, data in self.conn.execute(
+                "SELECT language_code, data FROM language_statistics"
+            )
+        }
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+
+"""
+MODERATOR FUNCTIONS
+
+Both bots check whether users are moderators of r/translator, Zifang once for every post it checks for duplicates.
+`ModeratorCache` keeps the set of moderators in memory and only fetches it again from Reddit when it is older than
+its time to live.
+
+The set is also saved to a file so that another process, such as Zifang running right after Ziwen, can use it instead
+of fetching it again, as long as it is recent.
+"""
+
+import time
+from code._config import (
+    FILE_ADDRESS_MODERATORS,
+    logger,
+    shared_cache_read,
+    shared_cache_write,
+)
+from typing import FrozenSet
+
+import praw
+
+# How long (in seconds) a fetched list of moderators is used before it is fetched again.
+MODERATORS_TTL = 3600
+
+
+class ModeratorCache:
+    """The lowercased usernames of a subreddit's moderators, fetched at most once per time to live."""
+
+    def __init__(
+        self,
+        subreddit_helper: praw.reddit.models.Subreddit,
+        file_address: str = FILE_ADDRESS_MODERATORS,
+        ttl: int = MODERATORS_TTL,
+    ):
+        self.subreddit_helper = subreddit_helper
+        self.file_address = file_address
+        self.ttl = ttl
+        self.names: FrozenSet[str] = frozenset()
+        self.fetched_utc = 0.0
+
+    def is_mod(self, username: str) -> bool:
+        """
+        Checks whether a user is a moderator of the subreddit.
+
+        :param username: The Reddit username of an individual, in any case.
+        :return: True if the user is a moderator, False otherwise.
+        """
+
+        return username.lower() in self.moderators()
+
+    def moderators(self) -> FrozenSet[str]:
+        """
+        Returns the moderators of the subreddit, from memory, from a recent enough saved copy, or from Reddit, in
+        that order.
+
+        :return: A frozenset of lowercased usernames.
+        """
+
+        if time.time() - self.fetched_utc > self.ttl and not self._load():
+            self.refresh()
+
+        return self.names
+
+    def refresh(self) -> None:
+        """
+        Fetches the moderators from Reddit and saves them for other processes, e.g. after the moderators change.
+
+        :return: Nothing.
+        """
+
+        self.names = frozenset(
+            moderator.name.lower() for moderator in self.subreddit_helper.moderator()
+        )
+        self.fetched_utc = time.time()
+        logger.debug(f"Moderators: Fetched {len(self.names)} moderators.")
+
+        shared_cache_write(
+            self.file_address,
+            str(self.subreddit_helper),
+            {"fetched_utc": self.fetched_utc, "moderators": sorted(self.names)},
+        )
+
+    def _load(self) -> bool:
+        saved = shared_cache_read(self.file_address, str(self.subreddit_helper))
+        if not saved or time.time() - saved["fetched_utc"] > self.ttl:
+            return False
+
+        self.names = frozenset(saved["moderators"])
+        self.fetched_utc = saved["fetched_utc"]
+        return True
@@ -71,6 +71,21 @@ A {post_type} has been newly identified as {language_name}:
 **[{otitle}]({opermalink})** posted by u/{oauthor}.
 """
 
+MSG_NOTIFY_DIGEST = """
+Hey there u/{username},
+
+Here are the new posts on r/translator for the languages you're subscribed to:
+
+{posts}
+"""
+
+MSG_DIGEST_ON = (
+    "Your notifications will now be sent together as a digest, at most once every {} minutes. "
+    "Send a message with the subject `Digest` and the text `off` to get them one at a time again."
+)
+
+MSG_DIGEST_OFF = "Your notifications will now be sent one at a time as posts come in."
+
 MSG_NO_POINTS = (
     "You haven't earned any points on r/translator yet. "
     "You can earn points by helping identify or translate requests in our community!"
@@ -115,9 +130,9 @@ If this is in error, please comment `!reset` on your post or message the r/trans
 https://www.reddit.com{1}). Thank you.
 """
 
-MSG_WIKIPAGE_FULL = (
-    "The [{0} wiki page](https://www.reddit.com/r/translatorBOT/wiki/{0}) seems to be full. "
-    "Please archive some of the older entries on that page."
+MSG_WIKIPAGE_ROLLOVER = (
+    "The [{0} wiki page](https://www.reddit.com/r/translator/wiki/{0}) is full, so new entries are now written "
+    "to the [{1} wiki page](https://www.reddit.com/r/translator/wiki/{1})."
 )
 
 MSG_MISSING_ASSETS = """
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+
+"""
+SCHEDULER FUNCTIONS
+
+The bots were written to be run by cron, doing one pass of everything every ten minutes. In daemon mode a single warm
+process stays alive instead, and this scheduler runs each stage of the bot on its own interval. Stages run one at a
+time in the main thread, so they never overlap.
+
+A stage that raises is logged and tried again at its next interval. A stage that takes longer than its interval is
+not run back-to-back to catch up: its missed runs are dropped and it is next run a full interval after it finished.
+SIGINT and SIGTERM stop the scheduler once the running stage is done, after which the shutdown functions run.
+"""
+
+import signal
+import threading
+import time
+import traceback
+from code._api_usage import api_usage_stage
+from code._config import logger
+from typing import Callable, Dict, List
+
+# The command-line argument that starts a bot in daemon mode.
+DAEMON_ARGUMENT = "--daemon"
+
+
+class ScheduledStage:
+    """A function that the scheduler runs every `interval` seconds, along with its timing."""
+
+    def __init__(self, name: str, function: Callable[[], None], interval: float):
+        self.name = name
+        self.function = function
+        self.interval = interval
+        self.next_run = 0.0  # Monotonic time. Every stage is due on startup.
+        self.overruns = 0
+
+
+class Scheduler:
+    """
+    Runs named stages at their intervals until it is stopped. See the module docstring for how overruns, errors,
+    and shutdowns are handled.
+    """
+
+    def __init__(self, error_handler: Callable[[str], None] | None = None):
+        """
+        :param error_handler: A function that is passed the traceback of any stage that raises, such as
+                              `record_error_log`.
+        """
+
+        self.stages: List[ScheduledStage] = []
+        self.shutdown_functions: List[Callable[[], None]] = []
+        self.error_handler = error_handler
+        self.stop_event = threading.Event()
+
+    def add_stage(
+        self, name: str, function: Callable[[], None], interval: float
+    ) -> None:
+        """
+        Adds a stage. Stages that are due at the same time run in the order they were added.
+
+        :param name: The name of the stage, used for logging and interval overrides.
+        :param function: A function that takes no arguments.
+        :param interval: How often to run the stage, in seconds.
+        :return: Nothing.
+        """
+
+        self.stages.append(ScheduledStage(name, function, interval))
+
+    def add_shutdown(self, function: Callable[[], None]) -> None:
+        """
+        Adds a function to be run when the scheduler stops, such as one that saves state.
+
+        :param function: A function that takes no arguments.
+        :return: Nothing.
+        """
+
+        self.shutdown_functions.append(function)
+
+    def stop(self, *_args) -> None:
+        """
+        Asks the scheduler to stop after the running stage. Also usable as a signal handler.
+
+        :return: Nothing.
+        """
+
+        if not self.stop_event.is_set():
+            logger.info("Scheduler: Stopping after the current stage.")
+        self.stop_event.set()
+
+    def run_stage(self, stage: ScheduledStage) -> None:
+        """
+        Runs one stage and schedules its next run.
+
+        :param stage: The stage to run.
+        :return: Nothing.
+        """
+
+        started = time.monotonic()
+        try:
+            with api_usage_stage(
+                stage.name
+            ):  # Count its Reddit requests under this stage.
+                stage.function()
+        except Exception:  # A failing stage should not take the others down with it.
+            error_entry = traceback.format_exc()
+            logger.error(f"Scheduler: Stage `{stage.name}` encountered an error.")
+            if self.error_handler is not None:
+                self.error_handler(error_entry)
+        finished = time.monotonic()
+
+        elapsed = finished - started
+        if elapsed > stage.interval:
+            stage.overruns += 1
+            stage.next_run = finished + stage.interval
+            logger.warning(
+                f"Scheduler: Stage `{stage.name}` took {elapsed:.1f}s, longer than its "
+                f"{stage.interval}s interval ({stage.overruns} overruns). Skipping its missed runs."
+            )
+        else:
+            stage.next_run = started + stage.interval
+        logger.debug(f"Scheduler: Stage `{stage.name}` finished in {elapsed:.1f}s.")
+
+    def run(self, install_signal_handlers: bool = True) -> None:
+        """
+        Runs the stages until `stop` is called or a shutdown signal is received, then runs the shutdown functions.
+
+        :param install_signal_handlers: Whether to stop on SIGINT and SIGTERM. Only possible in the main thread.
+        :return: Nothing.
+        """
+
+        if install_signal_handlers:
+            signal.signal(signal.SIGINT, self.stop)
+            signal.signal(signal.SIGTERM, self.stop)
+        logger.info(
+            f"Scheduler: Starting with stages "
+            f"{', '.join(f'{stage.name} ({stage.interval}s)' for stage in self.stages)}."
+        )
+
+        try:
+            while not self.stop_event.is_set():
+                now = time.monotonic()
+                due = [stage for stage in self.stages if stage.next_run <= now]
+                if not due:
+                    # Sleep until the next stage is due, waking early if stopped.
+                    next_run = min(stage.next_run for stage in self.stages)
+                    self.stop_event.wait(next_run - now)
+                    continue
+                for stage in due:
+                    if self.stop_event.is_set():
+                        break
+                    self.run_stage(stage)
+        finally:
+            for function in self.shutdown_functions:
+                try:
+                    function()
+                except Exception:
+                    logger.error(
+                        f"Scheduler: Shutdown function failed.\n{traceback.format_exc()}"
+                    )
+            logger.info("Scheduler: Stopped.")
+
+
+def scheduler_intervals(
+    defaults: Dict[str, float], arguments: List[str]
+) -> Dict[str, float]:
+    """
+    Applies interval overrides given on the command line as `stage=seconds` to a dictionary of default intervals.
+
+    :param defaults: A dictionary of stage names and their default intervals in seconds.
+    :param arguments: The command-line arguments, e.g. `["--daemon", "ziwen_posts=120"]`.
+    :return: A new dictionary of stage names and intervals.
+    """
+
+    intervals = dict(defaults)
+    for argument in arguments:
+        name, separator, seconds = argument.partition("=")
+        if not separator or name not in intervals:
+            continue
+        try:
+            intervals[name] = float(seconds)
+        except ValueError:
+            logger.warning(f"Scheduler: Ignoring invalid interval `{argument}`.")
+
+    return intervals
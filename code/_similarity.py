@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+
+"""
+TITLE SIMILARITY FUNCTIONS
+
+Zifang removes posts that repeat an earlier post by the same author. Some authors make dozens of posts a day, so the
+titles of an author are scored against each other all at once: every title is normalized a single time, and
+`rapidfuzz.process.cdist` fills in the whole matrix of scores in native code, across all cores.
+
+Rather than one average for all of an author's posts, the titles are grouped into clusters of those that are similar
+to each other, so that an author with two unrelated requests and one repeated request only has the repeat removed.
+
+Similarity functions are all prefixed with `title` in their name, except `numerical_sequence`.
+"""
+
+import re
+from code._config import logger
+from typing import List
+
+import numpy as np
+from rapidfuzz import fuzz, process, utils
+
+# How close we want the numbers in a sequence of titles to be together.
+NUMERICAL_SIMILARITY = 20
+# Matches one or more digits preceded by a space.
+NUMBER_PATTERN = re.compile(r"\s(\d+)")
+
+
+def title_similarity_matrix(titles: List[str]) -> np.ndarray:
+    """
+    Scores every title against every other one with `fuzz.token_sort_ratio`.
+
+    :param titles: The titles to compare.
+    :return: A square matrix of scores out of 100, in the order of `titles`.
+    """
+
+    processed = [utils.default_process(title) for title in titles]
+
+    return process.cdist(
+        processed,
+        processed,
+        scorer=fuzz.token_sort_ratio,
+        dtype=np.uint8,
+        workers=-1,
+    )
+
+
+def title_similarity_clusters(titles: List[str], confidence: float) -> List[List[int]]:
+    """
+    Groups titles into clusters of similar ones. Two titles are in the same cluster if they score at least
+    `confidence` against each other, or are both similar to a third title in it.
+
+    :param titles: The titles to compare.
+    :param confidence: The lowest score, out of 100, for two titles to count as similar.
+    :return: A list of clusters, each a sorted list of at least two indices into `titles`.
+    """
+
+    if len(titles) < 2:
+        return []
+
+    similar = title_similarity_matrix(titles) >= confidence
+    cluster_of = np.full(len(titles), -1)
+    clusters = []
+
+    for start in range(len(titles)):
+        if cluster_of[start] != -1:
+            continue
+        cluster_of[start] = start
+        members = [start]
+        queue = [start]
+        while queue:
+            neighbours = np.flatnonzero(similar[queue.pop()] & (cluster_of == -1))
+            cluster_of[neighbours] = start
+            members.extend(int(index) for index in neighbours)
+            queue.extend(neighbours)
+        if len(members) > 1:
+            clusters.append(sorted(members))
+
+    return clusters
+
+
+def numerical_sequence(strings: List[str]) -> bool:
+    """
+    Assesses titles to see if they are likely related but differ purely
+    based on numbers.
+
+    :param strings: Titles to look at.
+    :return: `False` if the titles look like a numbered sequence (or have
+             no numbers to compare), `True` if the usual rules apply.
+    """
+    numbers = []
+
+    for string in strings:
+        matches = [int(x) for x in NUMBER_PATTERN.findall(string)]
+        if matches:
+            numbers.append(matches)
+
+    # Exit early if there are not enough numbers to compare.
+    if len(numbers) < 2:
+        logger.info(">>> [ZF]: Not enough numbers found in these titles. Skipping...")
+        return False
+
+    # Go through the differences.
+    logger.info(f">>> [ZF]: Numbers found in the titles were: {numbers}")
+    total_sums = [sum(x) for x in numbers]
+    differences = [b - a for a, b in zip(total_sums, total_sums[1:])]
+    average_difference = sum(differences) / len(differences)
+
+    logger.info(f">>> [ZF]: The numerical sequence difference is {average_difference}.")
+
+    # If the average difference in numbers between the titles is lower
+    # than our threshold, return `False`, telling the other function
+    # NOT to remove it.
+    return average_difference == 0 or average_difference >= NUMERICAL_SIMILARITY
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+
+"""
+SNAPSHOT FUNCTIONS
+
+Several stages of Ziwen and Zifang read the same two listings of r/translator within minutes of each other: the newest
+posts and the newest comments. `RedditSnapshot` fetches each listing once per cycle, at the deepest limit any stage
+asks for, and hands every stage the same objects.
+
+Each listing fetched from Reddit is also saved in a compact form (the plain attributes of each item, gzipped JSON)
+so that another process, such as Zifang running right after Ziwen, can use it instead of fetching it again, as long
+as it is recent and deep enough.
+
+A process that runs its stages on their own intervals sets `memory_age`, so that a stage run more often than the
+cycle still sees new posts and comments each time.
+"""
+
+import time
+from code._config import (
+    FILE_ADDRESS_SNAPSHOT,
+    logger,
+    shared_cache_read,
+    shared_cache_write,
+)
+from typing import Any, Dict, List
+
+import praw
+
+# How long (in seconds) a saved listing can be used by another process.
+SNAPSHOT_MAX_AGE = 300
+# How deep each listing is fetched at the least, covering every stage that uses it.
+SNAPSHOT_DEPTHS = {"new": 100, "comments": 200}
+# Reddit's listings go no deeper than this, which is what a limit of None fetches.
+LISTING_MAXIMUM = 1000
+
+
+class RedditSnapshot:
+    """
+    The newest posts and comments of a subreddit, fetched once per cycle and shared by the stages that need them.
+    Lists returned are copies, so stages can reorder them freely, but the items in them are shared.
+    """
+
+    def __init__(
+        self,
+        reddit: praw.Reddit,
+        subreddit_helper: praw.reddit.models.Subreddit,
+        file_address: str = FILE_ADDRESS_SNAPSHOT,
+        max_age: int = SNAPSHOT_MAX_AGE,
+        memory_age: float | None = None,
+    ):
+        self.reddit = reddit
+        self.subreddit_helper = subreddit_helper
+        self.file_address = file_address
+        self.max_age = max_age
+        # How long (in seconds) this process reuses what it fetched. None for until `new_cycle`.
+        self.memory_age = memory_age
+        # Listing kind to (depth, items, fetched time) for the current cycle.
+        self.listings: Dict[str, tuple] = {}
+
+    def new_posts(self, limit: int | None) -> List[praw.models.Submission]:
+        """
+        Returns the newest posts of the subreddit, newest first, as `subreddit.new(limit=limit)` would.
+
+        :param limit: How many posts to return. None for as many as Reddit allows.
+        :return: A list of Submissions.
+        """
+
+        return self.listing("new", limit)
+
+    def comments(self, limit: int | None) -> List[praw.models.Comment]:
+        """
+        Returns the newest comments of the subreddit, newest first, as `subreddit.comments(limit=limit)` would.
+
+        :param limit: How many comments to return. None for as many as Reddit allows.
+        :return: A list of Comments.
+        """
+
+        return self.listing("comments", limit)
+
+    def new_cycle(self) -> None:
+        """
+        Forgets the listings of the current cycle so that the next request fetches them again. Only needed by a
+        process that runs more than one cycle.
+
+        :return: Nothing.
+        """
+
+        self.listings.clear()
+
+    def expired(self, fetched_utc: float) -> bool:
+        """
+        Whether something fetched at a time is too old for this process to use again, according to `memory_age`.
+
+        :param fetched_utc: The Unix time it was fetched.
+        :return: `True` if it should be fetched again.
+        """
+
+        return (
+            self.memory_age is not None and time.time() - fetched_utc > self.memory_age
+        )
+
+    def listing(self, kind: str, limit: int | None) -> List[Any]:
+        """
+        Returns a listing from this cycle's copy, from a recent enough saved copy, or from Reddit, in that order.
+
+        :param kind: `new` or `comments`.
+        :param limit: How many items to return. None for as many as Reddit allows.
+        :return: A list of PRAW objects, newest first.
+        """
+
+        limit = LISTING_MAXIMUM if limit is None else limit
+        current = self.listings.get(kind)
+        if current is None or current[0] < limit or self.expired(current[2]):
+            self.listings[kind] = self._load(kind, limit) or self._fetch(kind, limit)
+
+        return self.listings[kind][1][:limit]
+
+    def _fetch(self, kind: str, limit: int) -> tuple:
+        depth = max(limit, SNAPSHOT_DEPTHS.get(kind, 0))
+        listing_function = getattr(self.subreddit_helper, kind)
+        items = list(listing_function(limit=depth))
+        logger.debug(f"Snapshot: Fetched {len(items)} items from `{kind}`.")
+        fetched_utc = time.time()
+        self._save(kind, depth, items, fetched_utc)
+
+        return depth, items, fetched_utc
+
+    def _load(self, kind: str, limit: int) -> tuple | None:
+        listings = shared_cache_read(self.file_address, str(self.subreddit_helper))
+        saved = listings.get(kind)
+        if not saved or saved["depth"] < limit:
+            return None
+        if time.time() - saved["fetched_utc"] > self.max_age:
+            return None
+        if self.expired(saved["fetched_utc"]):
+            return None
+
+        model = praw.models.Submission if kind == "new" else praw.models.Comment
+        items = [model(self.reddit, _data=data) for data in saved["items"]]
+        logger.debug(f"Snapshot: Loaded {len(items)} saved items from `{kind}`.")
+
+        return saved["depth"], items, saved["fetched_utc"]
+
+    def _save(
+        self, kind: str, depth: int, items: List[Any], fetched_utc: float
+    ) -> None:
+        listings = shared_cache_read(self.file_address, str(self.subreddit_helper))
+        listings[kind] = {
+            "fetched_utc": fetched_utc,
+            "depth": depth,
+            "items": [snapshot_item_data(item) for item in items],
+        }
+        shared_cache_write(self.file_address, str(self.subreddit_helper), listings)
+
+
+def snapshot_item_data(item: Any) -> Dict[str, Any]:
+    """
+    Reduces a Submission or Comment to its plain attributes, which is enough to rebuild it with `_data`. Anything
+    left out is fetched by PRAW if it is accessed on the rebuilt item.
+
+    :param item: A PRAW Submission or Comment.
+    :return: A dictionary of attributes that can be saved as JSON.
+    """
+
+    data = {}
+    for key, value in vars(item).items():
+        if key.startswith("_"):
+            continue
+        if key == "author":
+            # Reddit's own placeholder for deleted authors, which PRAW turns back into None.
+            data[key] = value.name if value is not None else "[deleted]"
+        elif key == "subreddit":
+            data[key] = value.display_name
+        elif value is None or isinstance(value, (str, int, float, bool)):
+            data[key] = value
+
+    return data
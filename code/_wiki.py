@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+
+"""
+WIKI FUNCTIONS
+
+Ziwen keeps several logs on the wiki of r/translator, such as the `saved`, `identified`, and `verification_log` pages,
+to which it adds one line at a time. Editing a wiki page means sending the whole page back, so instead of reading and
+writing a page for every line, `WikiAppendBuffer` collects the lines for each page during a cycle and adds them all
+with one edit per page when it is flushed.
+
+Each edit names the revision it was based on, so an edit that conflicts with someone else's is tried again on top of
+theirs. When a page grows too large for Reddit, its lines are written to a new continuation page (e.g.
+`identified_2`) that starts with the same table header, and the moderators are told about it. Later lines go
+straight to the continuation page.
+
+Lines for a page that could not be edited at all are saved to a file when the buffer is flushed, so that they are
+added by the next flush even if this process exits first, as it does after a single pass.
+"""
+
+import re
+from code._config import (
+    FILE_ADDRESS_WIKI_PAGES,
+    FILE_ADDRESS_WIKI_PENDING,
+    logger,
+    shared_cache_read,
+    shared_cache_write,
+)
+from code._responses import MSG_WIKIPAGE_ROLLOVER
+from typing import Dict, List, Tuple
+
+import praw
+import prawcore
+
+# How many times an edit is tried again after a conflict with another edit.
+WIKI_EDIT_ATTEMPTS = 3
+
+
+class WikiAppendBuffer:
+    """Lines waiting to be added to the end of wiki pages, written with one edit per page by `flush`."""
+
+    def __init__(
+        self,
+        reddit: praw.Reddit,
+        subreddit_helper: praw.reddit.models.Subreddit,
+        file_address: str = FILE_ADDRESS_WIKI_PAGES,
+        notify_subreddit: str = "translatorBOT",
+        pending_address: str = FILE_ADDRESS_WIKI_PENDING,
+    ):
+        self.reddit = reddit
+        self.subreddit_helper = subreddit_helper
+        self.file_address = file_address
+        self.notify_subreddit = notify_subreddit
+        self.pending_address = pending_address
+        # Page name to a list of (line, edit reason), in the order they were added. Starts with the lines that an
+        # earlier flush could not write.
+        self.pending: Dict[str, List[Tuple[str, str]]] = {
+            page_name: [tuple(entry) for entry in entries]
+            for page_name, entries in shared_cache_read(
+                pending_address, str(subreddit_helper)
+            ).items()
+        }
+        self.pending_saved = bool(self.pending)
+        # Page name to the continuation page that lines for it are now written to.
+        self.continuations: Dict[str, str] = self._load()
+
+    def append(self, page_name: str, line: str, reason: str) -> None:
+        """
+        Adds a line to the end of a wiki page when the buffer is next flushed.
+
+        :param page_name: The name of the wiki page, e.g. `identified`.
+        :param line: The line to add.
+        :param reason: The reason for the edit, as shown in the page's history.
+        :return: Nothing.
+        """
+
+        self.pending.setdefault(page_name, []).append((line, reason))
+
+    def flush(self) -> int:
+        """
+        Writes the waiting lines, one edit per page. Lines for a page that could not be edited are kept for the next
+        flush, and saved for the next process in case this one exits first.
+
+        :return: The number of lines written.
+        """
+
+        written = 0
+        for page_name in list(self.pending):
+            entries = self.pending[page_name]
+            try:
+                self._write(page_name, entries)
+            except (
+                prawcore.exceptions.PrawcoreException,
+                praw.exceptions.PRAWException,
+            ) as ex:
+                logger.warning(f"Wiki: Could not update the '{page_name}' page: {ex!r}")
+                continue
+            del self.pending[page_name]
+            written += len(entries)
+
+        if self.pending or self.pending_saved:
+            shared_cache_write(
+                self.pending_address, str(self.subreddit_helper), self.pending
+            )
+            self.pending_saved = bool(self.pending)
+
+        return written
+
+    def _write(self, page_name: str, entries: List[Tuple[str, str]]) -> None:
+        lines = "\n".join(line for line, _ in entries)
+        reason = entries[0][1]
+        if len(entries) > 1:
+            reason += f" (and {len(entries) - 1} more)"
+        target_name = self.continuations.get(page_name, page_name)
+
+        for _ in range(WIKI_EDIT_ATTEMPTS):
+            page = self.subreddit_helper.wiki[target_name]
+            try:
+                content = str(page.content_md)
+                revision = getattr(page, "revision_id", None)
+            except (
+                prawcore.exceptions.NotFound
+            ):  # A continuation page that has yet to be written to.
+                content = wiki_table_header(self._original_content(page_name))
+                revision = None
+            try:
+                page.edit(
+                    content=f"{content}\n{lines}" if content else lines,
+                    reason=reason,
+                    previous=revision,
+                )
+            except (
+                prawcore.exceptions.Conflict
+            ):  # Someone else edited it in the meantime.
+                logger.info(
+                    f"Wiki: Edit conflict on the '{target_name}' page. Trying again."
+                )
+                continue
+            except prawcore.exceptions.TooLarge:
+                target_name = self._roll_over(page_name, target_name)
+                continue
+            logger.info(
+                f"Wiki: Added {len(entries)} lines to the '{target_name}' page."
+            )
+            return
+
+        raise prawcore.exceptions.PrawcoreException(
+            f"The '{target_name}' page could not be edited after {WIKI_EDIT_ATTEMPTS} attempts."
+        )
+
+    def _original_content(self, page_name: str) -> str:
+        try:
+            return str(self.subreddit_helper.wiki[page_name].content_md)
+        except prawcore.exceptions.NotFound:
+            return ""
+
+    def _roll_over(self, page_name: str, full_name: str) -> str:
+        """
+        Moves the lines of a page to its next continuation page after the current one turned out to be full.
+
+        :return: The name of the continuation page.
+        """
+
+        number = re.search(r"_(\d+)$", full_name) if full_name != page_name else None
+        next_name = f"{page_name}_{int(number.group(1)) + 1 if number else 2}"
+        self.continuations[page_name] = next_name
+        self._save()
+
+        logger.warning(
+            f"Wiki: The '{full_name}' page is full. Continuing on '{next_name}'."
+        )
+        self.reddit.subreddit(self.notify_subreddit).message(
+            subject=f"[Notification] '{full_name}' Wiki Page Full",
+            message=MSG_WIKIPAGE_ROLLOVER.format(full_name, next_name),
+        )
+
+        return next_name
+
+    def _load(self) -> Dict[str, str]:
+        return shared_cache_read(self.file_address, str(self.subreddit_helper))
+
+    def _save(self) -> None:
+        shared_cache_write(
+            self.file_address, str(self.subreddit_helper), self.continuations
+        )
+
+
+def wiki_table_header(content: str) -> str:
+    """
+    Gets the Markdown table header at the start of a wiki page, so a continuation page can begin with the same one.
+
+    :param content: The Markdown content of a wiki page.
+    :return: The lines up to and including the table's separator line. Empty if there is no table header.
+    """
+
+    lines = content.splitlines()
+    for index, line in enumerate(lines):
+        if re.match(r"^\|?\s*:?-{3,}", line.strip()):
+            return "\n".join(lines[: index + 1])
+
+    return ""
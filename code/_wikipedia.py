@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+
+"""
+WIKIPEDIA FUNCTIONS
+
+Zifang replies to comments that put terms in curly braces, like `{{Tang dynasty}}`, with a summary of each term from
+Wikipedia. Resolving one term can take several requests (the summary, a retry with auto-suggest, and the page for its
+URL), and the same terms come up again and again.
+
+`WikipediaResolver` looks up all the terms of a run together: identical terms are looked up once, terms resolved
+recently are read from the cache database, and the rest are looked up concurrently by a small pool of threads. Terms
+that could not be resolved are cached too, for a shorter time. Errors that may be temporary, such as a timeout, are not
+cached, so the term is tried again next run.
+"""
+
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from code._config import logger
+from typing import Dict, Iterable, Tuple
+
+import requests
+import wikipedia
+
+# How long (in seconds) a resolved term is cached.
+WIKIPEDIA_TTL = 7 * 86400
+# How long (in seconds) a term that could not be resolved is cached.
+WIKIPEDIA_FAILURE_TTL = 86400
+# How many terms are looked up at the same time.
+WIKIPEDIA_WORKERS = 4
+# How many sentences of a page's summary are used.
+WIKIPEDIA_SENTENCES = 3
+
+
+def wikipedia_fetch(term: str, language_code: str = "en") -> Tuple[str, str] | None:
+    """
+    Looks up a term on Wikipedia, first as an exact title and then with auto-suggest.
+
+    :param term: The term to look up, without punctuation.
+    :param language_code: The language code of the Wikipedia to use. Must be the one set with `wikipedia.set_lang`.
+    :return: A tuple of the first paragraph of the summary and the URL of the page, or None if it could not be
+             resolved. Raises on errors that may be temporary.
+    """
+
+    term_entry = None
+
+    # By default, turn off auto suggest.
+    try:
+        term_summary = wikipedia.summary(
+            term, auto_suggest=False, redirect=True, sentences=WIKIPEDIA_SENTENCES
+        )
+    except (
+        wikipedia.exceptions.DisambiguationError,
+        wikipedia.exceptions.PageError,
+    ):
+        # No direct matches, try auto suggest.
+        try:
+            term_summary = wikipedia.summary(
+                term.strip(), sentences=WIKIPEDIA_SENTENCES
+            )
+            term_entry = wikipedia.page(term).url
+        except (
+            wikipedia.exceptions.DisambiguationError,
+            wikipedia.exceptions.PageError,
+        ):
+            return None  # Still no dice.
+
+    # Clean up the text for the entry.
+    if "\n" in term_summary:
+        term_summary = term_summary.split("\n")[0].strip()
+    if "==" in term_summary:
+        term_summary = term_summary.split("==")[0].strip()
+    if not term_entry:
+        term_format = term.replace(" ", "_")
+        term_entry = f"https://{language_code}.wikipedia.org/wiki/{term_format}"
+
+    return term_summary, term_entry
+
+
+class WikipediaResolver:
+    """
+    Resolves terms to Wikipedia summaries and URLs, through a cache in SQLite. The cache is only read and written
+    from the calling thread; the threads of the pool only make the requests to Wikipedia.
+    """
+
+    def __init__(
+        self,
+        conn: sqlite3.Connection,
+        ttl: int = WIKIPEDIA_TTL,
+        failure_ttl: int = WIKIPEDIA_FAILURE_TTL,
+        workers: int = WIKIPEDIA_WORKERS,
+    ) -> None:
+        self.conn = conn
+        self.ttl = ttl
+        self.failure_ttl = failure_ttl
+        self.workers = workers
+
+    def resolve(
+        self, terms: Iterable[str], language_code: str = "en"
+    ) -> Dict[str, Tuple[str, str] | None]:
+        """
+        Resolves terms from the cache, or otherwise from Wikipedia, and caches the results.
+
+        :param terms: The terms to look up, without punctuation. Repeated terms are looked up once.
+        :param language_code: The language code of the Wikipedia to use.
+        :return: A dictionary of each term and a tuple of its summary and URL, or None if it could not be resolved.
+        """
+
+        unique_terms = list(dict.fromkeys(terms))
+        results = self.cached(unique_terms, language_code)
+        missing = [term for term in unique_terms if term not in results]
+        if not missing:
+            return results
+
+        wikipedia.set_lang(language_code)  # Set once here, as the threads share it.
+        logger.info(f"[ZF]: > Now searching for {missing} on Wikipedia...")
+        with ThreadPoolExecutor(
+            max_workers=min(self.workers, len(missing))
+        ) as executor:
+            futures = {
+                term: executor.submit(wikipedia_fetch, term, language_code)
+                for term in missing
+            }
+
+        current_time = int(time.time())
+        rows = []
+        for term, future in futures.items():
+            try:
+                results[term] = future.result()
+            except (
+                requests.exceptions.RequestException,
+                wikipedia.exceptions.WikipediaException,
+            ) as e:
+                # Possibly temporary, so it is not cached.
+                logger.warning(
+                    f"[ZF]: >> Unable to reach Wikipedia for '{term}': {e!r}"
+                )
+                results[term] = None
+                continue
+            if results[term] is None:
+                logger.info(
+                    f"[ZF]: >> Unable to resolve '{term}' on Wikipedia. Skipping."
+                )
+                rows.append(
+                    (language_code, term, None, None, current_time + self.failure_ttl)
+                )
+            else:
+                rows.append(
+                    (language_code, term, *results[term], current_time + self.ttl)
+                )
+
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO wikipedia_cache VALUES (?, ?, ?, ?, ?)", rows
+            )
+            self.conn.execute(
+                "DELETE FROM wikipedia_cache WHERE expires_utc <= ?", (current_time,)
+            )
+
+        return results
+
+    def cached(
+        self, terms: Iterable[str], language_code: str = "en"
+    ) -> Dict[str, Tuple[str, str] | None]:
+        """
+        Returns the terms that are in the cache and have not expired.
+
+        :param terms: The terms to look up.
+        :param language_code: The language code of the Wikipedia to use.
+        :return: A dictionary of each cached term and a tuple of its summary and URL, or None if it could not be
+                 resolved.
+        """
+
+        terms = list(terms)
+        placeholders = ", ".join("?" * len(terms))
+        rows = self.conn.execute(
+            f"SELECT term, summary, url FROM wikipedia_cache WHERE language_code = ? "
+            f"AND term IN ({placeholders}) AND expires_utc > ?",
+            (language_code, *terms, int(time.time())),
+        )
+
+        return {
+            term: (summary, url) if summary is not None else None
+            for term, summary, url in rows
+        }
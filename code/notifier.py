@@ -9,20 +9,24 @@ languages.
 
 The two main functions are: `ziwen_notifier`, the actual function that sends messages to people.
                             `ziwen_messages`, the function that proccesses incoming messages to the bot.
+
+Notifications and pages are not sent right away. They are added to an outbox in the main database, which
+`notifier_outbox_drain` sends from at a steady pace in its own step, so that a language with many subscribers does not
+hold up the processing of posts and commands. Users who opt into digests get all their notifications within
+`NOTIFICATIONS_DIGEST_WINDOW` combined into one message.
 """
 
-import csv
-import json
 import random
 import re
 import time
 from code._config import (
     BOT_DISCLAIMER,
     FILE_ADDRESS_ACTIVITY,
-    FILE_ADDRESS_ALL_STATISTICS,
     FILE_ADDRESS_ERROR,
     KEYWORDS,
+    NOTIFICATIONS_DIGEST_WINDOW,
     NOTIFICATIONS_LIMIT,
+    RECORD_WRITER,
     action_counter,
     logger,
     time_convert_to_string,
@@ -31,10 +35,13 @@ from code._language_consts import ISO_LANGUAGE_COUNTRY_ASSOCIATED, MAIN_LANGUAGE
 from code._languages import comment_info_parser, convert, language_list_splitter
 from code._responses import (
     MSG_CANNOT_PROCESS,
+    MSG_DIGEST_OFF,
+    MSG_DIGEST_ON,
     MSG_LANGUAGE_FREQUENCY,
     MSG_NO_POINTS,
     MSG_NO_SUBSCRIPTIONS,
     MSG_NOTIFY,
+    MSG_NOTIFY_DIGEST,
     MSG_NOTIFY_IDENTIFY,
     MSG_NSFW_WARNING,
     MSG_PAGE,
@@ -45,14 +52,24 @@ from code._responses import (
     MSG_UNSUBSCRIBE_BUTTON,
 )
 from code.Ajo import ajo_loader
-from code.Ziwen_helper import CORRECTED_SUBREDDIT, ZiwenConfig
+from code.Ziwen_helper import ZiwenConfig
 from datetime import datetime
 from sqlite3 import Cursor
-from typing import Any, Dict, List, Tuple
+from typing import Any, Callable, Dict, List, Tuple
 
 import praw  # Simple interface to the Reddit API that also handles rate limiting of requests.
 import prawcore
 
+# How fast messages are sent from the outbox, in messages per second, and how many can be sent in a burst.
+OUTBOX_RATE = 1.0
+OUTBOX_BURST = 5
+# How long one drain of the outbox may take, in seconds. Anything left is sent by the next drain.
+OUTBOX_DRAIN_SECONDS = 240
+# How many times a message is tried before it is dropped, and how long to wait before the first retry in seconds.
+# The wait doubles with each attempt.
+OUTBOX_MAX_ATTEMPTS = 3
+OUTBOX_RETRY_DELAY = 600
+
 
 def messaging_is_valid_user(username: str, reddit: praw.Reddit) -> bool:
     """
@@ -96,6 +113,9 @@ def notifier_list_pruner(username: str, config: ZiwenConfig) -> None | str:
     config.cursor_main.execute(
         "DELETE FROM notify_users WHERE username = ?", (username,)
     )
+    config.cursor_main.execute(
+        "DELETE FROM notify_digest_users WHERE username = ?", (username,)
+    )
     config.conn_main.commit()
     logger.info(
         f"notifier_list_pruner: Deleted subscription information for u/{username}."
@@ -147,6 +167,9 @@ def notifier_language_list_editor(
         config.cursor_main.execute(
             "DELETE FROM notify_users WHERE username = ?", (username,)
         )
+        config.cursor_main.execute(
+            "DELETE FROM notify_digest_users WHERE username = ?", (username,)
+        )
         config.conn_main.commit()
     elif len(language_list) == 0:
         return
@@ -176,21 +199,21 @@ def notifier_language_list_editor(
                 config.conn_main.commit()
 
 
-def load_statistics_data(language_code: str) -> Dict[str, Any]:
+def load_statistics_data(language_code: str, config: ZiwenConfig) -> Dict[str, Any]:
     """
-    Function that loads the language statistics dictionary from our saved JSON file.
+    Function that loads the language statistics dictionary for a language from our saved JSON file, via its indexed
+    copy in the cache database.
 
     :param language_code: Any language code.
     :return: The language dictionary if it exists. None otherwise.
     """
 
-    # Open the file
-    with open(FILE_ADDRESS_ALL_STATISTICS, encoding="utf-8") as f:
-        stats_data = json.load(f)
-        return stats_data.get(language_code)
+    return config.language_statistics.get(language_code)
 
 
-def messaging_language_frequency_table(language_list: List[str]) -> str:
+def messaging_language_frequency_table(
+    language_list: List[str], config: ZiwenConfig
+) -> str:
     """
     This is a function that supercedes `messaging_language_frequency` and can generate a table given a list of language
     codes about the relative frequency for language notifications.
@@ -204,7 +227,7 @@ def messaging_language_frequency_table(language_list: List[str]) -> str:
         language_name = convert(code).language_name
 
         # Retrieve stored data.
-        language_data = load_statistics_data(code)
+        language_data = load_statistics_data(code, config)
         if language_data is not None:
             # There is historical statistics for this language.
             daily_rate = language_data["rate_daily"]
@@ -243,17 +266,12 @@ def record_activity_csv(
     """
     Function that writes tuples of data to a CSV. It can be used for
     various things, but the first part should be activity type, then
-    the date and time. This is written to FILE_ADDRESS_ACTIVITY.
+    the date and time. This is written to FILE_ADDRESS_ACTIVITY by the
+    background record writer, which batches rows together.
     :param data_tuple: Package of data we want to insert.
     :return:
     """
-    with open(
-        FILE_ADDRESS_ACTIVITY, mode="a", newline="", encoding="utf-8"
-    ) as csv_file:
-        data_writer = csv.writer(
-            csv_file, delimiter=",", quotechar='"', quoting=csv.QUOTE_MINIMAL
-        )
-        data_writer.writerow(data_tuple)
+    RECORD_WRITER.append_row(FILE_ADDRESS_ACTIVITY, data_tuple)
 
 
 def fetch_users_to_notify(cursor_main: Cursor, language_code: str):
@@ -263,6 +281,381 @@ def fetch_users_to_notify(cursor_main: Cursor, language_code: str):
     return cursor_main.fetchall()
 
 
+class TokenBucket:
+    """
+    Paces actions to an average `rate` per second, allowing bursts of up to `capacity` actions after a quiet spell.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: int,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+
+    def take(self) -> None:
+        """
+        Takes a token, waiting until one is available.
+
+        :return: Nothing.
+        """
+
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < 1:
+            self.sleep((1 - self.tokens) / self.rate)
+            self.tokens = 1.0
+            self.updated = self.clock()
+        self.tokens -= 1
+
+
+def notifier_outbox_add(
+    messages: List[Tuple[str, str, str]],
+    language: str,
+    post_id: str | None,
+    config: ZiwenConfig,
+    limit_code: str | None = None,
+) -> None:
+    """
+    Adds messages to the outbox, to be sent by `notifier_outbox_drain`.
+
+    :param messages: A list of (recipient username, subject, body) tuples.
+    :param language: The language the messages are about, for the records.
+    :param post_id: The Reddit ID of the post the messages are about, if any.
+    :param limit_code: The language code whose monthly limit each message counts toward once it is sent, for
+                       notifications. None for messages that don't count, like pages.
+    :return: Nothing.
+    """
+
+    current_time = int(time.time())
+    config.cursor_main.executemany(
+        "INSERT INTO outbox (recipient, subject, body, language, post_id, created_utc, next_attempt_utc, "
+        "limit_code) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        [
+            (
+                recipient,
+                subject,
+                body,
+                language,
+                post_id,
+                current_time,
+                current_time,
+                limit_code,
+            )
+            for recipient, subject, body in messages
+        ],
+    )
+    config.conn_main.commit()
+
+
+def notifier_digest_add(
+    entries: List[Tuple[str, str]],
+    language: str,
+    post_id: str | None,
+    config: ZiwenConfig,
+    limit_code: str | None = None,
+) -> None:
+    """
+    Adds notifications for users who get digests to the outbox. Each entry is held until the user's digest is due,
+    which is `NOTIFICATIONS_DIGEST_WINDOW` after the first entry waiting for it.
+
+    :param entries: A list of (recipient username, digest line) tuples. The line is a Markdown list item for the post.
+    :param language: The language the notification is about.
+    :param post_id: The Reddit ID of the post the notification is about, if any.
+    :param limit_code: The language code whose monthly limit each entry counts toward once it is sent.
+    :return: Nothing.
+    """
+
+    current_time = int(time.time())
+    config.cursor_main.executemany(
+        "INSERT INTO outbox (recipient, subject, body, language, post_id, created_utc, next_attempt_utc, digest, "
+        "limit_code) VALUES (?, '', ?, ?, ?, ?, COALESCE((SELECT MIN(next_attempt_utc) FROM outbox "
+        "WHERE recipient = ? AND digest = 1), ?), 1, ?)",
+        [
+            (
+                recipient,
+                line,
+                language,
+                post_id,
+                current_time,
+                recipient,
+                current_time + NOTIFICATIONS_DIGEST_WINDOW,
+                limit_code,
+            )
+            for recipient, line in entries
+        ],
+    )
+    config.conn_main.commit()
+
+
+def notifier_digest_users(usernames: List[str], config: ZiwenConfig) -> List[str]:
+    """
+    Checks which of a list of users have opted to get their notifications as digests.
+
+    :param usernames: A list of Reddit usernames.
+    :return: The usernames of those who get digests.
+    """
+
+    if not usernames:
+        return []
+    config.cursor_main.execute(
+        f"SELECT username FROM notify_digest_users WHERE username IN ({', '.join('?' * len(usernames))})",
+        list(usernames),
+    )
+
+    return [row["username"] for row in config.cursor_main.fetchall()]
+
+
+def notifier_limit_writer(
+    usernames: List[str],
+    language_code: str,
+    config: ZiwenConfig,
+    num_notifications: int = 1,
+) -> None:
+    """
+    A function to record how many notifications users have received this month, per language.
+    (e.g. kungming2 | yue | 2023-08 | 2)
+    Called by `notifier_outbox_drain` once a notification has actually been sent. The caller commits.
+    Rows from earlier months are cleared out by `ZiwenConfig.maintenance_notify_limits_cleaner`.
+
+    :param usernames: The usernames of the people who just received a notification.
+    :param language_code: The language code for which the notification was for.
+    :param num_notifications: The number of notifications each user was sent. 1 by default.
+    :return: Nothing.
+    """
+
+    if not usernames:
+        return
+
+    month_string = datetime.fromtimestamp(time.time()).strftime("%Y-%m")
+    config.cursor_main.executemany(
+        "INSERT INTO notify_monthly_counts (username, language_code, month, count) VALUES (?, ?, ?, ?) "
+        "ON CONFLICT(username, language_code, month) DO UPDATE SET count = count + excluded.count",
+        [
+            (username, language_code, month_string, num_notifications)
+            for username in usernames
+        ],
+    )
+
+
+def _notifier_outbox_delete(message_ids: List[int], config: ZiwenConfig) -> None:
+    config.cursor_main.executemany(
+        "DELETE FROM outbox WHERE id = ?", [(message_id,) for message_id in message_ids]
+    )
+
+
+def _notifier_outbox_retry(
+    message_ids: List[int], attempts: int, config: ZiwenConfig
+) -> bool:
+    """
+    Schedules a message that could not be sent to be tried again later, or drops it if it has been tried too often.
+
+    :return: True if it will be tried again, False if it was dropped.
+    """
+
+    attempts += 1
+    if attempts >= OUTBOX_MAX_ATTEMPTS:
+        _notifier_outbox_delete(message_ids, config)
+        return False
+
+    next_attempt = int(time.time()) + OUTBOX_RETRY_DELAY * 2 ** (attempts - 1)
+    config.cursor_main.executemany(
+        "UPDATE outbox SET attempts = ?, next_attempt_utc = ? WHERE id = ?",
+        [(attempts, next_attempt, message_id) for message_id in message_ids],
+    )
+    return True
+
+
+def _notifier_outbox_messages(
+    waiting: List[Any],
+) -> List[Tuple[List[int], str, str, str, List[str], int, List[str]]]:
+    """
+    Turns the rows waiting in the outbox into the messages to send, combining each user's digest entries into one.
+
+    :param waiting: Rows of (id, recipient, subject, body, language, attempts, digest, limit code), oldest first.
+    :return: A list of (outbox IDs, recipient, subject, body, languages, attempts, limit codes) tuples. The limit
+             codes are those of the notifications in the message, one for each.
+    """
+
+    messages = []
+    digests = {}
+    for (
+        message_id,
+        recipient,
+        subject,
+        body,
+        language,
+        attempts,
+        digest,
+        limit_code,
+    ) in waiting:
+        limit_codes = [limit_code] if limit_code else []
+        if not digest:
+            messages.append(
+                (
+                    [message_id],
+                    recipient,
+                    subject,
+                    body,
+                    [language],
+                    attempts,
+                    limit_codes,
+                )
+            )
+        elif recipient in digests:
+            ids, lines, languages, digest_attempts, digest_codes = digests[recipient]
+            ids.append(message_id)
+            lines.append(body)
+            digest_codes += limit_codes
+            if language not in languages:
+                languages.append(language)
+            digests[recipient][3] = max(digest_attempts, attempts)
+        else:
+            digests[recipient] = [
+                [message_id],
+                [body],
+                [language],
+                attempts,
+                limit_codes,
+            ]
+            # Keep the digest at the place of its oldest entry.
+            messages.append(recipient)
+
+    for index, entry in enumerate(messages):
+        if isinstance(entry, str):
+            ids, lines, languages, attempts, limit_codes = digests[entry]
+            subject = (
+                f"[Notification] New {languages[0]} post on r/translator"
+                if len(lines) == 1
+                else f"[Notification] {len(lines)} new posts on r/translator"
+            )
+            body = (
+                MSG_NOTIFY_DIGEST.format(username=entry, posts="\n".join(lines))
+                + BOT_DISCLAIMER
+                + MSG_UNSUBSCRIBE_BUTTON
+            )
+            messages[index] = (
+                ids,
+                entry,
+                subject,
+                body,
+                languages,
+                attempts,
+                limit_codes,
+            )
+
+    return messages
+
+
+def notifier_outbox_drain(
+    config: ZiwenConfig,
+    time_budget: float = OUTBOX_DRAIN_SECONDS,
+    bucket: TokenBucket | None = None,
+) -> int:
+    """
+    Sends the messages waiting in the outbox, oldest first, paced by a token bucket. A message to a user who no
+    longer exists is dropped and the user is removed from the notifications database. Other failures are tried again
+    later. Sending stops when the time budget is used up or Reddit says the bot is sending too many messages.
+
+    :param config: The bot's configuration.
+    :param time_budget: How long to keep sending for, in seconds.
+    :param bucket: The token bucket to pace the messages with. A new one by default.
+    :return: The number of messages sent.
+    """
+
+    bucket = bucket or TokenBucket(OUTBOX_RATE, OUTBOX_BURST)
+    drain_start = time.time()
+    deadline = time.monotonic() + time_budget
+    config.cursor_main.execute(
+        "SELECT id, recipient, subject, body, language, attempts, digest, limit_code FROM outbox "
+        "WHERE next_attempt_utc <= ? ORDER BY id",
+        (int(drain_start),),
+    )
+    waiting = config.cursor_main.fetchall()
+
+    sent = failed = 0
+    languages = []
+    for (
+        message_ids,
+        recipient,
+        subject,
+        body,
+        message_languages,
+        attempts,
+        limit_codes,
+    ) in _notifier_outbox_messages(waiting):
+        if time.monotonic() >= deadline:
+            break
+        bucket.take()
+
+        try:
+            config.reddit.redditor(recipient).message(subject=subject, message=body)
+        except praw.exceptions.RedditAPIException as ex:
+            if any(item.error_type == "RATELIMIT" for item in ex.items):
+                logger.info(
+                    "Outbox: Reddit is limiting messages. Stopping until the next drain."
+                )
+                break
+            logger.info(
+                f"Outbox: An error occurred while sending a message to u/{recipient}. Removing..."
+            )
+            failed += 1
+            # The user probably deleted their account. Remove them from our database and drop the message.
+            if notifier_list_pruner(recipient, config) is not None:
+                _notifier_outbox_delete(message_ids, config)
+            else:
+                _notifier_outbox_retry(message_ids, attempts, config)
+        except prawcore.exceptions.PrawcoreException:
+            # Reddit or the connection had a problem.
+            logger.info(
+                f"Outbox: Could not reach Reddit to message u/{recipient}. Retrying later."
+            )
+            failed += 1
+            _notifier_outbox_retry(message_ids, attempts, config)
+        else:
+            _notifier_outbox_delete(message_ids, config)
+            # Only notifications that were actually sent count toward the user's monthly limit.
+            for limit_code in set(limit_codes):
+                notifier_limit_writer(
+                    [recipient], limit_code, config, limit_codes.count(limit_code)
+                )
+            sent += 1
+            languages += [
+                language for language in message_languages if language not in languages
+            ]
+        # Commit after each message so that a crash never sends one twice.
+        config.conn_main.commit()
+
+    config.cursor_main.execute("SELECT COUNT(*) FROM outbox")
+    queue_depth = config.cursor_main.fetchone()[0]
+    logger.info(
+        f"Outbox: Sent {sent} messages with {failed} failures. {queue_depth} messages are waiting."
+    )
+
+    # Record to a log how long it took.
+    if sent:
+        messaging_seconds = time.time() - drain_start
+        payload = (
+            time_convert_to_string(drain_start),
+            "Messaging run",
+            sent,
+            ", ".join(languages),
+            messaging_seconds / 60,
+            round(messaging_seconds / sent, 2),
+        )
+        record_activity_csv(payload)
+
+    return sent
+
+
 def notifier_page_translators(
     language_code: str,
     language_name: str,
@@ -301,6 +694,7 @@ def notifier_page_translators(
 
     if len(page_users_list) == 0:  # There is no one on the list for it.
         return None  # Exit, return None.
+    messages = []
     for target_username in page_users_list:
         message = MSG_PAGE.format(
             username=target_username,
@@ -318,22 +712,16 @@ def notifier_page_translators(
         if is_nsfw:
             message += MSG_NSFW_WARNING
 
-        # Send the actual message. Delete the username if an error is encountered.
-        try:
-            config.reddit.redditor(str(target_username)).message(
-                subject=subject_line, message=message + BOT_DISCLAIMER
-            )
-            logger.info(
-                f"Paging: Messaged u/{target_username} for a {language_name} post."
-            )
-        except (
-            praw.exceptions.APIException
-        ):  # There was an error... User probably does not exist anymore.
-            logger.debug(
-                f"Paging: Error occurred sending message to u/{target_username}. Removing..."
-            )
-            # Remove the username from our database.
-            notifier_list_pruner(target_username, config)
+        messages.append((str(target_username), subject_line, message + BOT_DISCLAIMER))
+
+    # Queue the actual messages. Users who no longer exist are removed when they are sent.
+    post_id = re.search(r"comments/(\w+)", opermalink)
+    notifier_outbox_add(
+        messages, language_name, post_id.group(1) if post_id else None, config
+    )
+    logger.info(
+        f"Paging: Queued messages to {', '.join(page_users_list)} for a {language_name} post."
+    )
 
     return page_users_list
 
@@ -404,6 +792,8 @@ class ZiwenNotifier:
         Function to check how many messages a person can expect for a subscription request. Note that if the language is
         common (that is, it's been requested every single month) we get the last `months_calculate` months' data for more
         accurate statistics.
+        The monthly post counts come from the local language statistics (see `load_statistics_data`), which only change
+        once a month, so this does not need to access the wiki.
 
         :param language_name: The language for which we are checking its statistics.
         :return freq_string: A formatted string that tells a user how often a language is requested.
@@ -415,47 +805,24 @@ class ZiwenNotifier:
         lang_wiki_name = lang_wiki_name.replace(" ", "_")
 
         lang_name_original = language_name
-        per_month_lines_edit = []
-        total_posts = []
 
-        if " " in language_name:  # Wiki links need underscores instead of spaces.
-            language_name = language_name.replace(" ", "_")
-
-        # Fetch the wikipage.
-        overall_page = self.config.reddit.subreddit(CORRECTED_SUBREDDIT).wiki[
-            language_name.lower()
-        ]
-        try:
-            overall_page_content = str(overall_page.content_md)
-        except (
-            prawcore.exceptions.NotFound,
-            prawcore.exceptions.BadRequest,
-            KeyError,
-            praw.exceptions.RedditAPIException,
-            prawcore.exceptions.Redirect,  # Tends to happen with "community" requests
-        ):
-            # There is no page for this language
+        language_data = load_statistics_data(
+            convert(language_name).language_code, self.config
+        )
+        if not language_data:
+            # There are no statistics for this language
             return None  # Exit with nothing.
 
-        per_month_lines = overall_page_content.split("\n")  # Separate into lines.
-
-        for line in per_month_lines[5:]:  # We omit the header of the page.
-            # We only want the first part, with month|year|total
-            work_line = line.split("(", 1)[0]
-            # Strip the formatting.
-            for character in "[] ":
-                work_line = work_line.replace(character, "")
-            per_month_lines_edit.append(work_line)
-
-        # Only get the ones that have a year in them
-        per_month_lines_edit = [x for x in per_month_lines_edit if "20" in x]
-
-        for row in per_month_lines_edit:
-            month_posts = int(row.split("|")[2])  # We take the number of posts here.
-            total_posts.append(month_posts)  # add it to the list of post counts.
+        # Monthly entries are keyed by year and month, e.g. `2017-05`.
+        recorded_months = sorted(
+            key for key in language_data if re.match(r"\d{4}-\d{2}$", key)
+        )
+        total_posts = [language_data[month]["num_total"] for month in recorded_months]
+        if not total_posts:
+            return None
 
         # The number of months we have data for the language.
-        months_with_data = len(per_month_lines_edit)
+        months_with_data = len(recorded_months)
         # Get the number of months since we started statistic keeping
         months_since = self.__messaging_months_elapsed()
 
@@ -541,67 +908,6 @@ class ZiwenNotifier:
 
         return list(final_specific_usernames - all_broader_usernames)
 
-    def __notifier_limit_writer(
-        self,
-        username: str,
-        language_code: str,
-        num_notifications: int = 1,
-    ) -> None:
-        """
-        A function to record how many notifications a user has received. (e.g. kungming2, {'yue': 2, 'unknown': 1, 'ar': 3})
-        This function iterates the recorded number by num_notifications each time it's called and stores it in a dictionary.
-        It creates a new record if the user has not been recorded before, otherwise it updates a dictionary.
-        The database will be cleared out monthly by a separate function contained within Wenyuan.
-
-        :param username: The username of the person who just received a notification.
-        :param language_code: The language code for which the notification was for.
-        :param num_notifications: The number of notifications the user was sent. 1 by default.
-        :return: Nothing.
-        """
-
-        monthly_limit_dictionary = {}
-
-        # Fetch the data
-        self.config.cursor_main.execute(
-            "SELECT received FROM notify_monthly_limit WHERE username = ?", (username,)
-        )
-        user_data = self.config.cursor_main.fetchone()
-
-        # Parse the user's data. Load it if it exists.
-        if user_data is not None:  # There's a record.
-            # Take the stored dictionary.
-            monthly_limit_dictionary = user_data["received"]
-            # Convert the string to a proper dictionary.
-            monthly_limit_dictionary = eval(monthly_limit_dictionary)
-
-        # Write the changes to the database.
-        if language_code not in monthly_limit_dictionary and user_data is None:
-            # Create a new record, user doesn't exist.
-            # Define the key and its value.
-            monthly_limit_dictionary[language_code] = num_notifications
-
-            # Write to the database.
-            to_store = (username, str(monthly_limit_dictionary))
-            self.config.cursor_main.execute(
-                "INSERT INTO notify_monthly_limit VALUES (?, ?)", to_store
-            )
-        else:  # Update an existing one.
-            # Attempt to update the dictionary value.
-            if language_code in monthly_limit_dictionary:
-                monthly_limit_dictionary[language_code] += num_notifications
-            else:
-                monthly_limit_dictionary[language_code] = num_notifications
-
-            # Write to the database.
-            to_store = (str(monthly_limit_dictionary), username)
-            self.config.cursor_main.execute(
-                "UPDATE notify_monthly_limit SET received = ? WHERE username = ?",
-                to_store,
-            )
-
-        # Commit changes.
-        self.config.conn_main.commit()
-
     def __notifier_title_cleaner(self, otitle: str) -> str:
         """
         Simple function to replace problematic Markdown characters like `[` or `]` that can mess up links.
@@ -802,8 +1108,16 @@ class ZiwenNotifier:
         if len(notify_users_list) == 0:
             return []
 
-        messaging_start = time.time()
+        # Users who get digests get one line each, to be combined with their other notifications.
+        digest_users = notifier_digest_users(notify_users_list, self.config)
+        digest_line = f"* **{language_name}**: [{otitle}]({opermalink}) by u/{oauthor}"
+        if is_identify:
+            digest_line += " *(newly identified)*"
+
+        messages = []
         for username in notify_users_list:
+            if username in digest_users:
+                continue
             # Is from an !identify command.
             cur_message = MSG_NOTIFY if not is_identify else MSG_NOTIFY_IDENTIFY
             message = cur_message.format(
@@ -814,34 +1128,30 @@ class ZiwenNotifier:
                 opermalink=opermalink,
                 oauthor=oauthor,
             )
-            try:
-                self.config.reddit.redditor(username).message(
-                    subject=f"[Notification] New {language_name} post on r/translator",
-                    message=message + BOT_DISCLAIMER + MSG_UNSUBSCRIBE_BUTTON,
+            messages.append(
+                (
+                    username,
+                    f"[Notification] New {language_name} post on r/translator",
+                    message + BOT_DISCLAIMER + MSG_UNSUBSCRIBE_BUTTON,
                 )
-                # Record that they have been messaged
-                self.__notifier_limit_writer(username, language_code)
-            except praw.exceptions.APIException:  # If the user deleted their account...
-                logger.info(
-                    f"Notifier: An error occured while sending a message to u/{username}. Removing..."
-                )
-                # Remove the username from our database.
-                notifier_list_pruner(username, self.config)
+            )
 
-        # Record to a log how long it took.
-        messaging_mins = (time.time() - messaging_start) / 60
-        seconds_per_message = (time.time() - messaging_start) / len(notify_users_list)
-        payload = (
-            time_convert_to_string(messaging_start),
-            "Messaging run",
-            len(notify_users_list),
+        # Queue the messages, which are sent by `notifier_outbox_drain`.
+        post_id = re.search(r"comments/(\w+)", opermalink)
+        post_id = post_id.group(1) if post_id else None
+        # Each counts toward the user's monthly limit once it is sent.
+        notifier_outbox_add(
+            messages, language_name, post_id, self.config, limit_code=language_code
+        )
+        notifier_digest_add(
+            [(username, digest_line) for username in digest_users],
             language_name,
-            messaging_mins,
-            round(seconds_per_message, 2),
+            post_id,
+            self.config,
+            limit_code=language_code,
         )
-        record_activity_csv(payload)
         logger.info(
-            f"Notifier: Sent notifications to {len(notify_users_list)} users signed up for {language_name}."
+            f"Notifier: Queued notifications to {len(notify_users_list)} users signed up for {language_name}."
         )
 
         return notify_users_list
@@ -861,61 +1171,39 @@ class ZiwenMessageProcessor:
         Function that pairs with messaging_user_statistics_writer. Takes a username and looks up what commands they have
         been recorded as using.
         If they have data, it will return a nicely formatted table. Since the notifications data is also recorded in the
-        same database, this function will also format the data in that dictionary and integrate it into the table.
+        same database, this function will also fetch this month's notification counts in the same query and integrate
+        them into the table.
 
         :param username: The username of a Reddit user.
         :return: None if the user has no data (no commands that they called), a sorted table otherwise.
         """
 
-        # Get commands data.
-        self.config.cursor_main.execute(
-            "SELECT commands FROM total_commands WHERE username = ?", (self.mauthor,)
-        )
-        username_commands_data = self.config.cursor_main.fetchone()
-
-        # Get notifications data.
+        # Get the commands data and this month's notifications data together, commands first.
+        month_string = datetime.fromtimestamp(time.time()).strftime("%Y-%m")
         self.config.cursor_main.execute(
-            "SELECT received FROM notify_monthly_limit WHERE username = ?",
-            (self.mauthor,),
+            "SELECT 0 AS is_notification, command AS name, count FROM total_command_counts WHERE username = ? "
+            "UNION ALL SELECT 1, language_code, count FROM notify_monthly_counts WHERE username = ? AND month = ? "
+            "ORDER BY is_notification, name",
+            (self.mauthor, self.mauthor, month_string),
         )
-        notifications_commands_data = self.config.cursor_main.fetchone()
-        commands_lines_to_post = []
-        # Iterate over commands data.
-        if username_commands_data is None:  # There is no data for this user.
-            commands_lines_to_post = None
-        else:  # There's data. Get the data and format it line-by-line.
-            commands_dictionary = eval(username_commands_data["commands"])
-            # We only want the stored dict here.
-            for command_type, value in sorted(commands_dictionary.items()):
-                if command_type != "Notifications":  # This is a regular command.
-                    if command_type == KEYWORDS.back_quote:
-                        command_type = "`lookup`"
-                    formatted_line = f"| {command_type} | {value} |"
-                    commands_lines_to_post.append(formatted_line)
-
-        notifications_lines_to_post = None
-        # Iterate over notifications data. Get the dictionary of notifications that were sent.
-        if notifications_commands_data is not None:
-            notifications_lines_to_post = []
-            notification_dict = eval(notifications_commands_data["received"])
-            for language_code, notification_num in sorted(notification_dict.items()):
-                formatted_line = (
-                    f"| Notifications (`{language_code}`) | {notification_num} |"
-                )
-                # Reform it as a string from a list.
-                notifications_lines_to_post.append(formatted_line)
+        user_statistics_data = self.config.cursor_main.fetchall()
 
-        if username_commands_data is None and notifications_commands_data is None:
+        if not user_statistics_data:
             # Absolutely no information.
             return None
-        # Format everything together. Convert None to blank list.
-        if commands_lines_to_post is None:
-            commands_lines_to_post = []
-        if notifications_lines_to_post is None:
-            notifications_lines_to_post = []
-        return "| Command | Times |\n|---------|-------|\n" + "\n".join(
-            commands_lines_to_post + notifications_lines_to_post
-        )
+
+        lines_to_post = []
+        for row in user_statistics_data:
+            if row["is_notification"]:
+                formatted_line = f"| Notifications (`{row['name']}`) | {row['count']} |"
+            else:
+                command_type = row["name"]
+                if command_type == KEYWORDS.back_quote:
+                    command_type = "`lookup`"
+                formatted_line = f"| {command_type} | {row['count']} |"
+            lines_to_post.append(formatted_line)
+
+        return "| Command | Times |\n|---------|-------|\n" + "\n".join(lines_to_post)
 
     def __points_retreiver(self) -> str:
         """
@@ -929,60 +1217,32 @@ class ZiwenMessageProcessor:
         current_time = time.time()
         month_string = datetime.fromtimestamp(current_time).strftime("%Y-%m")
 
-        self.config.cursor_main.execute(
-            "SELECT points FROM total_points WHERE username = ? AND month_year = ?",
-            (self.mauthor, month_string),
+        # One row per month, then a row with the totals.
+        points_report = self.config.points_user_report(self.mauthor)
+        if not points_report or points_report[-1]["points"] == 0:
+            # User has no points listed.
+            return MSG_NO_POINTS
+        *monthly_rows, totals_row = points_report
+
+        month_points = next(
+            (
+                row["points"]
+                for row in monthly_rows
+                if row["month_year"] == month_string
+            ),
+            0,
         )
-        # Returns a list of lists.
-        username_month_points_data = self.config.cursor_main.fetchall()
-
-        self.config.cursor_main.execute(
-            "SELECT points, oid, month_year FROM total_points WHERE username = ?",
-            (self.mauthor,),
+        to_post = (
+            f"You've earned **{month_points} points** on r/translator this month.\n\n"
+            f"You've earned **{totals_row['points']} points** in total and participated in **{totals_row['posts']} posts**.\n\n"
         )
-        username_all_points_data = self.config.cursor_main.fetchall()
-
-        # Compile the monthly number of points the user has earned.
-        month_points = sum(data["points"] for data in username_month_points_data)
-        # Compile the total number of points the user has earned.
-        all_points = 0
-        # Compile the total number of posts participated.
-        recorded_posts = set()
-        # Compile the total number of months that have been recorded. .
-        recorded_months = set()
-        for data in username_all_points_data:
-            all_points += data["points"]
-            recorded_posts.add(data["oid"])
-            recorded_months.add(data["month_year"])
-
-        recorded_posts_count = len(recorded_posts)
-        to_post = ""
-        if all_points != 0:  # The user has points listed.
-            to_post += (
-                f"You've earned **{month_points} points** on r/translator this month.\n\n"
-                f"You've earned **{all_points} points** in total and participated in **{recorded_posts_count} posts**.\n\n"
-            )
-            to_post += "Year/Month | Points | Number of Posts Participated\n-----------|--------|------------------"
-        else:  # User has no points listed.
-            return MSG_NO_POINTS
+        to_post += "Year/Month | Points | Number of Posts Participated\n-----------|--------|------------------"
 
         # Generate rows of data from the points data.
-        for month in sorted(recorded_months):
-            self.config.cursor_main.execute(
-                "SELECT points, oid FROM total_points WHERE username = ? AND month_year = ?",
-                (self.mauthor, month),
-            )
-            month_data = self.config.cursor_main.fetchall()
-
-            recorded_month_points = 0
-            scratchpad_posts = set()
-            for data in month_data:
-                recorded_month_points += data["points"]
-                scratchpad_posts.add(data["oid"])
-
-            to_post += f"\n{month} | {recorded_month_points} | {len(scratchpad_posts)}"
+        for row in monthly_rows:
+            to_post += f"\n{row['month_year']} | {row['points']} | {row['posts']}"
         # Add a summary row for the totals.
-        to_post += f"\n*Total* | {all_points} | {recorded_posts_count}"
+        to_post += f"\n*Total* | {totals_row['points']} | {totals_row['posts']}"
 
         return to_post
 
@@ -993,7 +1253,8 @@ class ZiwenMessageProcessor:
         :return logging_output: A formatted string using Markdown's indenting syntax for code (four spaces per line).
         """
 
-        # Error stuff. Open the file.
+        # Error stuff. Wait for any queued entries, then open the file.
+        RECORD_WRITER.flush()
         with open(FILE_ADDRESS_ERROR, encoding="utf-8") as f:
             error_logs = f.read()
 
@@ -1039,7 +1300,9 @@ class ZiwenMessageProcessor:
                 "thanks", "Thank you"
             )
             bullet_list = "\n* ".join(final_match_names)
-            frequency_table = messaging_language_frequency_table(language_matches)
+            frequency_table = messaging_language_frequency_table(
+                language_matches, self.config
+            )
 
             # Pull it all together with the template.
             main_body = MSG_SUBSCRIBE.format(
@@ -1112,6 +1375,29 @@ class ZiwenMessageProcessor:
             )
             action_counter(len(language_matches), "Unsubscriptions")
 
+    def process_digest(self):
+        # User wants their notifications combined into digests, or no longer wants that.
+        logger.info(f"Messages: New digest request from u/{self.mauthor}.")
+
+        # The command to turn digests off is a subject of `Digest off`, or a message whose text is just `off`.
+        subject_words = self.message.subject.lower().split()
+        body_text = self.mbody.strip(" .!`*\n").lower()
+        if subject_words == ["digest", "off"] or body_text == "off":
+            self.config.cursor_main.execute(
+                "DELETE FROM notify_digest_users WHERE username = ?", (self.mauthor,)
+            )
+            reply = MSG_DIGEST_OFF
+        else:
+            self.config.cursor_main.execute(
+                "INSERT OR IGNORE INTO notify_digest_users VALUES (?, ?)",
+                (self.mauthor, int(time.time())),
+            )
+            reply = MSG_DIGEST_ON.format(NOTIFICATIONS_DIGEST_WINDOW // 60)
+        self.config.conn_main.commit()
+
+        self.message.reply(reply + BOT_DISCLAIMER + MSG_UNSUBSCRIBE_BUTTON)
+        action_counter(1, "Digest changes")
+
     def process_ping(self):
         logger.info(f"Messages: New status check from u/{self.mauthor}.")
         to_post = "Ziwen is running nominally.\n\n"
@@ -1275,6 +1561,7 @@ def ziwen_messages(config: ZiwenConfig):
 
     * `subscribe`
     * `unsubscribe`
+    * `digest`
     * `ping`
     * `status`
     * `points`
@@ -1295,6 +1582,7 @@ def ziwen_messages(config: ZiwenConfig):
         keyword_mapping = [
             ("unsubscribe", processor.process_unsubscribe),
             ("subscribe", processor.process_subscribe),
+            ("digest", processor.process_digest),
             ("ping", processor.process_ping),
             ("status", processor.process_status),
             ("add", processor.process_add),
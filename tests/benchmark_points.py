@@ -0,0 +1,97 @@
+"""
+Timings for the points report and leaderboards on a synthetic multi-year dataset.
+Not collected by default; run with `python -m pytest tests/benchmark_points.py -s`.
+"""
+
+import random
+import sqlite3
+import time
+from unittest.mock import MagicMock
+
+from code._database import MAIN_MIGRATIONS, database_migrate
+from code.Ziwen_helper import ZiwenConfig
+
+YEARS = 6
+USERS = 3000
+ROWS = 300000
+
+
+def build_config():
+    random.seed(0)
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    database_migrate(conn, MAIN_MIGRATIONS)
+    months = [
+        f"{2018 + year}-{month:02d}" for year in range(YEARS) for month in range(1, 13)
+    ]
+    # A few prolific users and a long tail, like the real data.
+    users = [f"user{index}" for index in range(USERS)]
+    weights = [1 / (index + 1) for index in range(USERS)]
+    rows = []
+    for index, username in enumerate(random.choices(users, weights, k=ROWS)):
+        rows.append(
+            (
+                random.choice(months),
+                f"c{index}",
+                username,
+                random.randint(1, 21),
+                f"p{random.randrange(ROWS // 4)}",
+            )
+        )
+    conn.executemany("INSERT INTO total_points VALUES (?, ?, ?, ?, ?)", rows)
+    conn.commit()
+
+    config = MagicMock(ZiwenConfig)
+    config.cursor_main = conn.cursor()
+    return config, months
+
+
+def per_month_report(cursor, username):
+    # The previous approach: all rows for the user, then one query per recorded month.
+    cursor.execute(
+        "SELECT points, oid, month_year FROM total_points WHERE username = ?",
+        (username,),
+    )
+    recorded_months = {row["month_year"] for row in cursor.fetchall()}
+    report = []
+    for month in sorted(recorded_months):
+        cursor.execute(
+            "SELECT points, oid FROM total_points WHERE username = ? AND month_year = ?",
+            (username, month),
+        )
+        month_data = cursor.fetchall()
+        report.append(
+            (
+                month,
+                sum(row["points"] for row in month_data),
+                len({row["oid"] for row in month_data}),
+            )
+        )
+    return report
+
+
+def test_benchmark_points_report():
+    config, months = build_config()
+    usernames = [f"user{index}" for index in range(50)]
+
+    start = time.perf_counter()
+    old_reports = [per_month_report(config.cursor_main, name) for name in usernames]
+    old_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    new_reports = [ZiwenConfig.points_user_report(config, name) for name in usernames]
+    new_time = time.perf_counter() - start
+
+    for old, new in zip(old_reports, new_reports):
+        assert old == [tuple(row) for row in new[:-1]]
+
+    start = time.perf_counter()
+    leaderboards = ZiwenConfig.points_monthly_leaderboards(config, 10)
+    leaderboard_time = time.perf_counter() - start
+    assert len(leaderboards) == len(months)
+
+    print(
+        f"\n{ROWS} rows over {YEARS} years: per-month reports {old_time:.3f}s, "
+        f"grouped reports {new_time:.3f}s for {len(usernames)} users; "
+        f"top 10 leaderboards for {len(months)} months {leaderboard_time:.3f}s"
+    )
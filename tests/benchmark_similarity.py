@@ -0,0 +1,57 @@
+"""
+Timings for Zifang's duplicate title clustering against the previous pairwise loop, for prolific authors.
+Not collected by default; run with `python -m pytest tests/benchmark_similarity.py -s`.
+"""
+
+import random
+import time
+from itertools import combinations
+
+from rapidfuzz import fuzz
+
+from code._similarity import title_similarity_clusters
+
+AUTHOR_POSTS = [50, 100, 200]
+LANGUAGES = ["Japanese", "Chinese", "Korean", "Arabic", "Russian", "Hindi", "Latin"]
+WORDS = "what does this say please help me read the sign letter tattoo song lyrics old photo card".split()
+
+
+def make_titles(count):
+    random.seed(count)
+    titles = []
+    for _ in range(count):
+        if titles and random.random() < 0.3:
+            titles.append(random.choice(titles))  # A repeated request.
+        else:
+            language = random.choice(LANGUAGES)
+            words = " ".join(random.choices(WORDS, k=random.randint(3, 9)))
+            titles.append(f"[{language} > English] {words}")
+    return titles
+
+
+def average_similarity(strings):
+    # The previous approach: one Python call per pair, averaged.
+    scores = [
+        fuzz.token_sort_ratio(strings[i], strings[j])
+        for i, j in combinations(range(len(strings)), 2)
+    ]
+    return sum(scores) / len(scores)
+
+
+def test_benchmark_similarity():
+    for count in AUTHOR_POSTS:
+        titles = [title.lower() for title in make_titles(count)]
+
+        start = time.perf_counter()
+        average_similarity(titles)
+        old_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        clusters = title_similarity_clusters(titles, 85)
+        new_time = time.perf_counter() - start
+
+        assert clusters
+        print(
+            f"\n{count} posts by one author: pairwise average {old_time * 1000:.1f}ms, "
+            f"clusters {new_time * 1000:.1f}ms ({len(clusters)} clusters)"
+        )
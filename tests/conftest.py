@@ -4,3 +4,27 @@ from unittest.mock import MagicMock
 # this runs before all other tests start importing things, so the server
 # doesn't complain about not having this file
 sys.modules["code._login"] = MagicMock()
+
+import pytest
+
+
+@pytest.fixture
+def make_subreddit():
+    """
+    Returns a function that makes a mock of r/translator. `wiki` is a function that returns the wiki page of a given
+    name. Each other keyword argument is a listing method of the subreddit, such as `new` or `moderator`, and the
+    items it returns, up to the `limit` passed to it.
+    """
+
+    def factory(wiki=None, **listings):
+        subreddit_helper = MagicMock()
+        subreddit_helper.__str__.return_value = "translator"
+        if wiki is not None:
+            subreddit_helper.wiki.__getitem__.side_effect = wiki
+        for name, items in listings.items():
+            getattr(subreddit_helper, name).side_effect = (
+                lambda limit=None, items=items: iter(items[:limit])
+            )
+        return subreddit_helper
+
+    return factory
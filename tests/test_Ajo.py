@@ -1,5 +1,8 @@
 import pytest
-from code.Ajo import Ajo, AjoLanguageInfo
+import sqlite3
+from code._database import AJO_MIGRATIONS, database_migrate
+from code.Ajo import Ajo, AjoLanguageInfo, ajo_writer
+from code.Ziwen_helper import ZiwenConfig
 from unittest.mock import MagicMock
 import praw
 import pickle
@@ -93,3 +96,35 @@ def test_ajo_from_reddit_pickle():
         data = pickle.loads(f.read())
         my_ajo = Ajo.init_from_submission(data, {})
         assert repr(my_ajo) == pickled_data_output
+
+
+@pytest.fixture
+def ajo_config():
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    database_migrate(conn, AJO_MIGRATIONS)
+    config = MagicMock(ZiwenConfig)
+    config.conn_ajo = conn
+    config.cursor_ajo = conn.cursor()
+    return config
+
+
+def test_ajo_writer_indexes_claim(test_ajo, ajo_config):
+    test_ajo.set_status("inprogress")
+    ajo_writer(test_ajo, ajo_config, claim_user="someone", claim_time=1000)
+    # A later write without claim information keeps the existing claim.
+    ajo_writer(test_ajo, ajo_config)
+    row = ajo_config.conn_ajo.execute("SELECT * FROM local_database").fetchall()
+    assert len(row) == 1
+    assert (row[0]["status"], row[0]["language_code"]) == ("inprogress", "it")
+    assert (row[0]["claim_user"], row[0]["claim_time"]) == ("someone", 1000)
+
+
+def test_ajo_writer_clears_claim(test_ajo, ajo_config):
+    test_ajo.set_status("inprogress")
+    ajo_writer(test_ajo, ajo_config, claim_user="someone", claim_time=1000)
+    test_ajo.set_status("translated")
+    ajo_writer(test_ajo, ajo_config)
+    row = ajo_config.conn_ajo.execute("SELECT * FROM local_database").fetchone()
+    assert row["status"] == "translated"
+    assert row["claim_user"] is None and row["claim_time"] is None
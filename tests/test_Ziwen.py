@@ -1,7 +1,22 @@
+import sqlite3
 import time
+from collections import Counter
 from unittest.mock import MagicMock, patch
 import praw
-from code.Ziwen import edit_comment_processor, points_tabulator
+from code._database import (
+    CACHE_MIGRATIONS,
+    MAIN_MIGRATIONS,
+    database_compress_text,
+    database_content_hash,
+    database_migrate,
+)
+from code.Ziwen import (
+    edit_comment_processor,
+    messaging_user_statistics_flush,
+    messaging_user_statistics_writer,
+    points_tabulator,
+    progress_checker,
+)
 
 
 @patch("code.Ziwen.config")
@@ -17,7 +32,7 @@ def test_points_tabulator(mocked_config_instance):
 
     mocked_config_instance.cursor_main.execute.assert_called_with(
         "INSERT INTO total_points VALUES (?, ?, ?, ?, ?)",
-        ("2023-08", "123", "author", "3", "oid"),
+        ("2023-08", "123", "author", 3, "oid"),
     )
 
 
@@ -28,7 +43,88 @@ def test_edit_comment_processor(mocked_config_instance):
     comment.id = "123"
     comment.edited = True
     comment.created_utc = time.time() - 5
+    mocked_config_instance.cursor_cache.fetchone.return_value = None
     edit_comment_processor(comment)
     mocked_config_instance.cursor_cache.execute.assert_called_with(
-        "INSERT INTO comment_cache VALUES (?, ?)", ("123", "body")
+        "INSERT INTO comment_cache (id, content_hash, created_utc, content) VALUES (?, ?, ?, ?) "
+        "ON CONFLICT(id) DO UPDATE SET content_hash = excluded.content_hash, content = excluded.content",
+        (
+            "123",
+            database_content_hash("body"),
+            int(comment.created_utc),
+            database_compress_text("body"),
+        ),
     )
+
+
+@patch("code.Ziwen.config")
+def test_edit_comment_processor_unchanged(mocked_config_instance):
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    database_migrate(conn, CACHE_MIGRATIONS)
+    mocked_config_instance.conn_cache = conn
+    mocked_config_instance.cursor_cache = conn.cursor()
+
+    comment = MagicMock(spec=praw.reddit.models.Comment)
+    comment.body = "!translated"
+    comment.id = "123"
+    comment.edited = True
+    comment.created_utc = time.time() - 5
+    assert edit_comment_processor(comment)  # Newly stored.
+    assert not edit_comment_processor(comment)  # Same hash, nothing to do.
+
+    comment.created_utc = time.time() - 2 * 86400
+    conn.execute("DELETE FROM comment_cache")
+    assert not edit_comment_processor(comment)  # Outside the edit window.
+    assert conn.execute("SELECT COUNT(*) FROM comment_cache").fetchone()[0] == 0
+
+
+@patch("code.Ziwen.config")
+def test_messaging_user_statistics_flush(mocked_config_instance):
+    conn = sqlite3.connect(":memory:")
+    database_migrate(conn, MAIN_MIGRATIONS)
+    mocked_config_instance.conn_main = conn
+    mocked_config_instance.cursor_main = conn.cursor()
+    mocked_config_instance.pending_user_commands = Counter()
+
+    messaging_user_statistics_writer("!id: ja `word` `other`", "author")
+    messaging_user_statistics_writer("!identify: zh", "author")
+    messaging_user_statistics_flush()
+
+    assert mocked_config_instance.pending_user_commands == Counter()
+    assert conn.execute(
+        "SELECT command, count FROM total_command_counts ORDER BY command"
+    ).fetchall() == [("!identify:", 2), ("`", 2)]
+
+
+@patch("code.Ziwen.ajo_writer")
+@patch("code.Ziwen.ajo_loader")
+@patch("code.Ziwen.reddit")
+@patch("code.Ziwen.config")
+def test_progress_checker(
+    mocked_config_instance, mocked_reddit, mocked_loader, mocked_writer
+):
+    mocked_config_instance.cursor_ajo.fetchall.return_value = [
+        {"id": "flaired", "claim_time": None},
+        {"id": "unclaimed", "claim_time": None},
+    ]
+    flaired = MagicMock(link_flair_css_class="translated")
+    unclaimed = MagicMock(link_flair_css_class="inprogress")
+    mocked_reddit.submission.side_effect = lambda id: {
+        "flaired": flaired,
+        "unclaimed": unclaimed,
+    }[id]
+    stored_ajos = {"flaired": MagicMock(), "unclaimed": MagicMock()}
+    mocked_loader.side_effect = lambda oid, config: stored_ajos[oid]
+    mocked_config_instance.komento_analysis.return_value = {}
+
+    progress_checker()
+
+    # The stored Ajo of a post flaired outside the bot is updated, not rebuilt.
+    stored_ajos["flaired"].set_status.assert_called_once_with("translated")
+    mocked_writer.assert_any_call(stored_ajos["flaired"], mocked_config_instance)
+    # A post in progress without a claim comment is left alone, but marked as checked.
+    stored_ajos["unclaimed"].set_status.assert_not_called()
+    stored_ajos["unclaimed"].update_reddit.assert_not_called()
+    assert mocked_writer.call_args.args[0] is stored_ajos["unclaimed"]
+    assert "claim_time" in mocked_writer.call_args.kwargs
@@ -2,6 +2,7 @@ from sqlite3 import Connection, Cursor
 from unittest.mock import MagicMock, Mock, patch
 
 import pytest
+from code._wiki import WikiAppendBuffer
 from code.Ziwen_command_processor import ZiwenCommandProcessor
 from code.Ajo import Ajo, AjoLanguageInfo
 import praw
@@ -36,6 +37,7 @@ def mock_config():
     config.cursor_ajo = MagicMock(Cursor)
     config.conn_main = MagicMock(Connection)
     config.post_templates = {}
+    config.wiki_buffer = MagicMock(WikiAppendBuffer)
     return config
 
 
@@ -283,6 +285,37 @@ def test_process_backquote(mock_comment, mock_ajo, mock_submission, mock_config)
     )
 
 
+def test_process_backquote_records_original_case(
+    mock_comment, mock_ajo, mock_submission, mock_config
+):
+    mock_ajo.ajo_language_info.language_name = ["Spanish"]
+    processor = ZiwenCommandProcessor(
+        "`me llamo pedro`",
+        "",
+        mock_comment,
+        "",
+        "",
+        "",
+        "",
+        mock_ajo,
+        mock_submission,
+        0,
+        0,
+        "",
+        "`Me llamo Pedro`",
+        "",
+        mock_config,
+    )
+    processor.other_matches = lambda _match, post_content, _key: post_content.append(
+        "test"
+    )
+    processor.process_backquote()
+    # The index is compared against the comment as written when it is edited.
+    mock_config.komento_record.assert_called_once_with(
+        mock_comment.reply.return_value, parent_body="`Me llamo Pedro`"
+    )
+
+
 def test_process_set(mock_comment, mock_ajo, mock_submission, mock_config):
     mock_config.is_mod.return_value = True
     processor = ZiwenCommandProcessor(
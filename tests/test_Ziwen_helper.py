@@ -1,6 +1,15 @@
-from unittest.mock import MagicMock
+import json
+from unittest.mock import MagicMock, patch
 import praw
+import sqlite3
 
+from code._database import (
+    CACHE_MIGRATIONS,
+    MAIN_MIGRATIONS,
+    LanguageStatisticsStore,
+    database_migrate,
+)
+from code._responses import COMMENT_CLAIM
 from code.Ziwen_helper import ZiwenConfig, lookup_matcher
 
 
@@ -8,6 +17,197 @@ def test_ziwenconfig_init():
     ZiwenConfig(MagicMock(praw.Reddit), MagicMock(praw.reddit.models.SubredditHelper))
 
 
+def test_ziwenconfig_init_attached():
+    config = ZiwenConfig(
+        MagicMock(praw.Reddit),
+        MagicMock(praw.reddit.models.SubredditHelper),
+        attached=True,
+    )
+    assert config.conn_main is config.conn_cache is config.conn_ajo
+    schemas = [row[1] for row in config.conn_main.execute("PRAGMA database_list")]
+    assert schemas == ["main", "cache", "ajo"]
+
+
+def test_points_language_report():
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    database_migrate(conn, MAIN_MIGRATIONS)
+    conn.execute("ATTACH DATABASE ':memory:' AS ajo")
+    conn.execute(
+        "CREATE TABLE ajo.local_database (id TEXT, status TEXT, language_code TEXT)"
+    )
+    conn.executemany(
+        "INSERT INTO ajo.local_database VALUES (?, ?, ?)",
+        [("p1", "translated", "ja"), ("p2", "untranslated", "zh")],
+    )
+    conn.executemany(
+        "INSERT INTO total_points VALUES (?, ?, ?, ?, ?)",
+        [
+            ("2023-01", "c1", "user", 3, "p1"),
+            ("2023-01", "c2", "other", 4, "p1"),
+            ("2023-01", "c3", "user", 2, "p2"),
+        ],
+    )
+    conn.execute("INSERT INTO notify_users VALUES ('zh', 'user')")
+    config = MagicMock(ZiwenConfig)
+    config.conn_main = conn
+    config.cursor_main = conn.cursor()
+
+    report = ZiwenConfig.points_language_report(config, "2023-01")
+    assert [tuple(row) for row in report] == [("ja", 7, 2, 1), ("zh", 2, 1, 1)]
+    coverage = ZiwenConfig.notify_coverage_report(config)
+    assert [tuple(row) for row in coverage] == [("zh", 1, 1)]
+
+
+def test_points_user_report():
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    database_migrate(conn, MAIN_MIGRATIONS)
+    conn.executemany(
+        "INSERT INTO total_points VALUES (?, ?, ?, ?, ?)",
+        [
+            ("2023-01", "c1", "user", 3, "p1"),
+            ("2023-01", "c2", "user", 2, "p1"),
+            ("2023-02", "c3", "user", 5, "p1"),
+            ("2023-02", "c4", "other", 9, "p2"),
+        ],
+    )
+    config = MagicMock(ZiwenConfig)
+    config.cursor_main = conn.cursor()
+    report = ZiwenConfig.points_user_report(config, "user")
+    assert [tuple(row) for row in report] == [
+        ("2023-01", 5, 1),
+        ("2023-02", 5, 1),
+        (None, 10, 1),
+    ]
+    leaderboards = ZiwenConfig.points_monthly_leaderboards(config, 1)
+    assert [row["username"] for row in leaderboards["2023-02"]] == ["other"]
+
+
+def test_points_worth_precomputer(tmp_path):
+    statistics_path = tmp_path / "statistics.json"
+    statistics_path.write_text(
+        json.dumps(
+            {
+                "ja": {
+                    "name": "Japanese",
+                    "num_months": 2,
+                    "2023-01": {"num_total": 400, "percentage_total": 0.2},
+                    "2023-02": {"num_total": 500, "percentage_total": 0.25},
+                },
+                "ang": {
+                    "name": "Old English",
+                    "2023-02": {"num_total": 10, "percentage_total": 0.0003},
+                },
+                "zh": {
+                    "name": "Chinese",
+                    "2020-03": {"num_total": 300, "percentage_total": 0.0005},
+                },
+                "ain": {
+                    "name": "Ainu",
+                    "2023-02": {"num_total": 1, "percentage_total": 0.0005},
+                },
+                "xyz": {"name": "Nothing Yet"},
+            }
+        )
+    )
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    database_migrate(conn, CACHE_MIGRATIONS)
+    config = MagicMock(ZiwenConfig)
+    config.conn_cache = conn
+    config.cursor_cache = conn.cursor()
+    config.language_statistics = LanguageStatisticsStore(conn, str(statistics_path))
+    config.cached_multipliers = {}
+    config.reddit = MagicMock()
+
+    # In March 2023, Japanese had 25% of last month's requests, Old English far less than 1%. Chinese has no data
+    # for last month and Ainu too few requests in it, so they are left to the wiki.
+    with patch("code.Ziwen_helper.time", return_value=1678838400):
+        assert ZiwenConfig.points_worth_precomputer(config) == {
+            "Japanese": 1,
+            "Old_English": 20,
+        }
+        assert conn.execute("SELECT COUNT(*) FROM multiplier_cache").fetchone()[0] == 2
+
+        # A new run loads them from the cache and never needs the wiki for them.
+        config.cached_multipliers = {}
+        ZiwenConfig.points_worth_cacher(config)
+        config.points_worth_precomputer.assert_not_called()
+        assert ZiwenConfig.points_worth_determiner(config, "Old English") == 20
+        config.reddit.subreddit.assert_not_called()
+
+
+@patch("code.Ziwen_helper.komento_analyzer")
+def test_komento_analysis_memo(mock_analyzer):
+    config = ZiwenConfig(MagicMock(), MagicMock(praw.reddit.models.SubredditHelper))
+    config.conn_main = sqlite3.connect(":memory:")
+    database_migrate(config.conn_main, MAIN_MIGRATIONS)
+    config.cursor_main = config.conn_main.cursor()
+    calls_used = iter([10, 13, 13, 14])
+    config.reddit.auth.limits.get.side_effect = lambda key: next(calls_used)
+    mock_analyzer.return_value = {"bot_long": "c1"}
+    submission = MagicMock(praw.models.Submission)
+    submission.id = "p1"
+
+    assert config.komento_analysis(submission) == {"bot_long": "c1"}
+    assert config.komento_analysis(submission) == {"bot_long": "c1"}
+    assert mock_analyzer.call_count == 1
+    # After the bot acts on the submission, it is analyzed again when the users' comments are needed.
+    config.komento_invalidate("p1")
+    config.komento_analysis(submission, user_signals=True)
+    assert mock_analyzer.call_count == 2
+    config.komento_analysis(submission)
+    assert config.komento_cycle_report() == 3 + 1
+    assert config.komento_memo == {}
+
+    # In daemon mode, analyses are not reused once the listings would be fetched again.
+    config.reddit.auth.limits.get.side_effect = None
+    config.snapshot.memory_age = -1
+    config.komento_analysis(submission, user_signals=True)
+    config.komento_analysis(submission, user_signals=True)
+    assert mock_analyzer.call_count == 4
+
+
+def test_komento_bot_comment_index():
+    config = ZiwenConfig(MagicMock(), MagicMock(praw.reddit.models.SubredditHelper))
+    config.conn_main = sqlite3.connect(":memory:")
+    database_migrate(config.conn_main, MAIN_MIGRATIONS)
+    config.cursor_main = config.conn_main.cursor()
+    submission = MagicMock(praw.models.Submission)
+    submission.id = "p1"
+    config.komento_index_submission("p1", [])
+
+    claim_note = MagicMock(praw.models.Comment)
+    claim_note.id, claim_note.link_id, claim_note.parent_id = "c1", "t3_p1", "t3_p1"
+    claim_note.body = COMMENT_CLAIM.format(
+        claimer="someone", time="2023-01-02 03:04:05", language_name="Japanese"
+    )
+    config.komento_record(claim_note)
+    lookup_reply = MagicMock(praw.models.Comment)
+    lookup_reply.id, lookup_reply.link_id, lookup_reply.parent_id = (
+        "c3",
+        "t3_p1",
+        "t1_c2",
+    )
+    lookup_reply.body = (
+        "*u/op (OP), the following lookup results may be of interest.* [Wiktionary]"
+    )
+    config.komento_record(lookup_reply, parent_body="`猫`")
+
+    with patch("code.Ziwen_helper.komento_analyzer") as mock_analyzer:
+        komento_data = config.komento_analysis(submission)
+        mock_analyzer.assert_not_called()
+    assert komento_data["bot_claim_comment"] == "c1"
+    assert komento_data["claim_user"] == "someone"
+    assert komento_data["bot_lookup_replies"] == {"c2": ["c3"]}
+    assert komento_data["bot_lookup_correspond"] == {"c2": ["猫"]}
+
+    config.komento_delete("c1")
+    config.reddit.comment.assert_called_with(id="c1")
+    assert "bot_claim_comment" not in config.komento_analysis(submission)
+
+
 def test_lookup_matcher1():
     assert lookup_matcher("`嫁狗随狗`", None) == ["嫁狗随狗"]
 
@@ -26,3 +226,27 @@ def test_lookup_matcher4():
     assert lookup_matcher("!identify: spanish \n `me llamo`", "Chinese") == {
         "Spanish": ["me", "llamo"]
     }
+
+
+@patch("code.Ziwen_helper.komento_analyzer")
+def test_komento_crosspost_original_comment(mock_analyzer):
+    config = ZiwenConfig(MagicMock(), MagicMock(praw.reddit.models.SubredditHelper))
+    config.conn_main = sqlite3.connect(":memory:")
+    database_migrate(config.conn_main, MAIN_MIGRATIONS)
+    config.cursor_main = config.conn_main.cursor()
+    config.reddit.auth.limits.get.return_value = None
+    submission = MagicMock(praw.models.Submission)
+    submission.id = "p1"
+    xp_payload = {"op": "op", "requester": "requester", "original_submission": "abc123"}
+    mock_analyzer.return_value = {"bot_xp_comment": "c1"}
+
+    # Without the original comment in the index, the thread is walked to find it.
+    config.komento_index_submission("p1", [("c1", "xp", "p1", dict(xp_payload))])
+    config.komento_analysis(submission)
+    assert mock_analyzer.call_count == 1
+
+    config.komento_invalidate("p1")
+    xp_payload["original_comment"] = "c0"
+    config.komento_index_submission("p1", [("c1", "xp", "p1", xp_payload)])
+    assert config.komento_analysis(submission)["bot_xp_original_comment"] == "c0"
+    assert mock_analyzer.call_count == 1
@@ -0,0 +1,44 @@
+import csv
+
+from code import _api_usage
+from code._api_usage import (
+    API_USAGE,
+    api_usage_caller,
+    api_usage_flush,
+    api_usage_stage,
+    api_usage_summary,
+)
+
+
+def test_api_usage_caller():
+    # Called from a test, there is no function of the bot on the stack.
+    assert api_usage_caller() == ("other", "other")
+    with api_usage_stage("ziwen_posts"):
+        assert api_usage_caller() == ("ziwen_posts", "other")
+    assert api_usage_caller() == ("other", "other")
+
+
+def test_api_usage_flush_and_summary(tmp_path, monkeypatch):
+    csv_path = str(tmp_path / "activity.csv")
+    monkeypatch.setattr(_api_usage, "FILE_ADDRESS_ACTIVITY", csv_path)
+    with open(csv_path, "w", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerow(("2023-08-01T00:00:00Z", "Cycle run", 20, "", 1.5))
+
+    API_USAGE.clear()
+    API_USAGE[("ziwen_bot", "komento_analyzer")] = [6, 3.0]
+    API_USAGE[("ziwen_posts", "ziwen_posts")] = [2, 0.5]
+    assert api_usage_flush("2023-08-01T00:00:00Z") == 8
+    assert not API_USAGE
+    API_USAGE[("ziwen_posts", "ziwen_posts")] = [5, 1.5]
+    api_usage_flush("2023-08-01T00:10:00Z")
+    _api_usage.RECORD_WRITER.flush()
+
+    # Rows of other activity types are left out.
+    assert api_usage_summary(file_address=csv_path) == [
+        ("ziwen_posts > ziwen_posts", 7, 2.0 / 7),
+        ("ziwen_bot > komento_analyzer", 6, 0.5),
+    ]
+    # Only the latest run.
+    assert api_usage_summary(runs=1, file_address=csv_path) == [
+        ("ziwen_posts > ziwen_posts", 5, 1.5 / 5)
+    ]
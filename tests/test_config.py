@@ -0,0 +1,40 @@
+import csv
+
+from code._config import RecordWriter, shared_cache_read, shared_cache_write
+
+
+def test_record_writer(tmp_path):
+    text_path = str(tmp_path / "filter.md")
+    csv_path = str(tmp_path / "activity.csv")
+    writer = RecordWriter()
+
+    writer.append(text_path, "\nfirst")
+    writer.append_row(csv_path, ("2023-08-01T00:00:00Z", "Cycle run", 20, "a, b", 1.5))
+    writer.append(text_path, "\nsecond")
+    writer.flush()
+    with open(text_path, encoding="utf-8") as f:
+        assert f.read() == "\nfirst\nsecond"
+
+    for index in range(100):
+        writer.append_row(csv_path, (index, "Notifications"))
+    # Closing writes everything that is still queued.
+    writer.close()
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ["2023-08-01T00:00:00Z", "Cycle run", "20", "a, b", "1.5"]
+    assert len(rows) == 101 and rows[-1] == ["99", "Notifications"]
+
+    # After closing, records are written directly.
+    writer.append(text_path, "\nthird")
+    with open(text_path, encoding="utf-8") as f:
+        assert f.read().endswith("\nthird")
+
+
+def test_shared_cache(tmp_path):
+    for file_address in (str(tmp_path / "cache.json"), str(tmp_path / "cache.json.gz")):
+        assert shared_cache_read(file_address, "translator") == {}
+        shared_cache_write(file_address, "translator", {"moderators": ["a"]})
+        shared_cache_write(file_address, "test", {"moderators": ["b"]})
+        assert shared_cache_read(file_address, "translator") == {"moderators": ["a"]}
+        assert shared_cache_read(file_address, "test") == {"moderators": ["b"]}
+        assert shared_cache_read(file_address, "other") == {}
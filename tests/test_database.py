@@ -0,0 +1,161 @@
+import json
+import os
+import sqlite3
+from time import strftime
+
+from code._config import action_counter, action_counter_export, action_counter_flush
+from code._database import (
+    AJO_MIGRATIONS,
+    CACHE_MIGRATIONS,
+    LanguageStatisticsStore,
+    MAIN_MIGRATIONS,
+    ProcessedStore,
+    ZifangPostWindow,
+    ZifangProcessedStore,
+    database_migrate,
+)
+
+
+def test_ajo_migration_backfills_columns():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE local_database (id TEXT, created_utc INTEGER, ajo TEXT)")
+    stored = "{'id': 'abc', 'status': 'inprogress', 'time_delta': {'inprogress': 500}, 'ajo_language_info': {'language_code_1': ['ja'], 'language_code_3': ['jpn']}}"
+    conn.executemany(
+        "INSERT INTO local_database VALUES (?, ?, ?)",
+        [("abc", 1, stored), ("abc", 1, stored)],
+    )
+    conn.commit()
+
+    assert database_migrate(conn, AJO_MIGRATIONS) == ["ajo_base", "ajo_index_columns"]
+    assert conn.execute(
+        "SELECT id, status, language_code, claim_time FROM local_database"
+    ).fetchall() == [("abc", "inprogress", "ja", 500)]
+    # Running it again changes nothing.
+    assert database_migrate(conn, AJO_MIGRATIONS) == []
+
+
+def test_processed_store(tmp_path):
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE oldposts (id TEXT)")
+    conn.execute("INSERT INTO oldposts VALUES ('old')")
+    conn.commit()
+    database_migrate(conn, MAIN_MIGRATIONS)
+    filter_path = str(tmp_path / "processed.bloom")
+
+    store = ProcessedStore(conn, filter_path, capacity=1000)
+    assert store.is_processed("post", "old")
+    assert not store.is_processed("post", "new")
+    store.mark_processed("post", "new")
+    store.save()
+    store.mark_processed("comment", "after_save")
+
+    # A fresh store loads the saved filter and picks up what was added after it was saved.
+    reloaded = ProcessedStore(conn, filter_path, capacity=1000)
+    assert reloaded.is_processed("post", "new")
+    assert reloaded.is_processed("comment", "after_save")
+    assert not reloaded.is_processed("post", "after_save")
+
+    reloaded.forget("comment", "after_save")
+    assert not reloaded.is_processed("comment", "after_save")
+    assert reloaded.prune(-1) == 2
+    assert not reloaded.is_processed("post", "old")
+
+
+def test_zifang_processed_store():
+    conn = sqlite3.connect(":memory:")
+    database_migrate(conn, MAIN_MIGRATIONS)
+    store = ZifangProcessedStore(conn)
+
+    # IDs imported from the wiki do not need to be backed up again.
+    assert store.add(["a1", "a2"], synced=True) == 2
+    assert store.count() == 2 and not store.changed()
+    assert store.add(["a2", "b3"]) == 1
+    assert store.is_processed("b3") and not store.is_processed("c4")
+    assert store.changed()
+    assert store.recent(10) == ["a1", "a2", "b3"]
+    store.mark_synced()
+    assert not store.changed()
+    assert store.prune(-1) == 3 and store.count() == 0
+
+
+def test_zifang_post_window():
+    conn = sqlite3.connect(":memory:")
+    database_migrate(conn, MAIN_MIGRATIONS)
+    window = ZifangPostWindow(conn)
+
+    assert (
+        window.add(
+            [
+                ("p1", "user", "[Japanese > English] Page 1", 1000),
+                ("p2", "other", "[Korean > English] Letter", 2000),
+                ("p3", "user", "[Japanese > English] Page 2", 3000),
+                ("p4", None, "[Thai > English] Sign", 3500),
+            ]
+        )
+        == 4
+    )
+    assert window.add([("p3", "user", "[Japanese > English] Page 2", 3000)]) == 0
+    assert window.known(["p2", "p9"]) == {"p2"}
+    assert window.author_posts(["user"], 0) == {"user": ["p1", "p3"]}
+    assert window.author_posts(["user"], 1500) == {"user": ["p3"]}
+
+    # Posts already acted on and those by deleted authors are not close-out candidates.
+    ZifangProcessedStore(conn).add(["p1"])
+    assert window.unprocessed_before(4000) == ["p2", "p3"]
+    # Posts already checked for close-out are not fetched for it again, even if they are seen again.
+    window.mark_checked(["p2"])
+    window.add([("p2", "other", "[Korean > English] Letter", 2000)])
+    assert window.unprocessed_before(4000) == ["p3"]
+    window.remove(["p3"])
+    assert window.prune(2500) == 2
+    assert window.known(["p1", "p2", "p3", "p4"]) == {"p4"}
+
+
+def test_language_statistics_store(tmp_path):
+    statistics_path = tmp_path / "statistics.json"
+    statistics_path.write_text(json.dumps({"ja": {"rate_monthly": 1}, "zh": {}}))
+    conn = sqlite3.connect(":memory:")
+    database_migrate(conn, CACHE_MIGRATIONS)
+
+    store = LanguageStatisticsStore(conn, str(statistics_path))
+    assert store.get("ja") == {"rate_monthly": 1}
+    assert store.get("xx") is None
+    assert store.refresh() == 0  # Unchanged file.
+
+    statistics_path.write_text(json.dumps({"ja": {"rate_monthly": 2}, "zh": {}}))
+    os.utime(statistics_path, (1, 1))
+    assert store.refresh() == 1  # Only the changed language is rewritten.
+    assert store.get("ja") == {"rate_monthly": 2}
+
+
+def test_action_counter(tmp_path):
+    conn = sqlite3.connect(":memory:")
+    database_migrate(conn, MAIN_MIGRATIONS)
+    today = strftime("%Y-%m-%d")
+    conn.execute("INSERT INTO action_counts VALUES (?, 'New posts', 4)", (today,))
+    conn.commit()
+
+    action_counter(1, "New posts")
+    action_counter(2, "New posts")
+    action_counter(0, "Notifications")
+    action_counter(1, "!id:")
+    # Nothing is written until the flush.
+    assert conn.execute("SELECT SUM(count) FROM action_counts").fetchone() == (4,)
+
+    assert action_counter_flush(conn) == 2
+    assert action_counter_flush(conn) == 0
+    export_path = str(tmp_path / "counter.json")
+    assert action_counter_export(conn, export_path) == {
+        today: {"!identify:": 1, "New posts": 7}
+    }
+    with open(export_path, encoding="utf-8") as f:
+        assert json.load(f) == {today: {"!identify:": 1, "New posts": 7}}
+
+    # Later exports only read the recent days again and keep the older ones from the file.
+    conn.execute("INSERT INTO action_counts VALUES ('2020-01-01', 'New posts', 3)")
+    conn.commit()
+    action_counter(1, "New posts")
+    action_counter_flush(conn)
+    assert action_counter_export(conn, export_path) == {
+        today: {"!identify:": 1, "New posts": 8}
+    }
@@ -0,0 +1,35 @@
+from unittest.mock import MagicMock
+
+from code._moderators import ModeratorCache
+
+
+def make_moderators(names):
+    moderators = []
+    for name in names:
+        moderator = MagicMock()
+        moderator.name = name
+        moderators.append(moderator)
+    return moderators
+
+
+def test_moderator_cache(tmp_path, make_subreddit):
+    file_address = str(tmp_path / "moderators.json")
+    subreddit_helper = make_subreddit(
+        moderator=make_moderators(["Kungming2", "AutoModerator"])
+    )
+    cache = ModeratorCache(subreddit_helper, file_address)
+
+    assert cache.is_mod("kungming2") and cache.is_mod("KUNGMING2")
+    assert not cache.is_mod("someone")
+    assert cache.moderators() == frozenset({"kungming2", "automoderator"})
+    assert subreddit_helper.moderator.call_count == 1
+
+    # Another process reuses the saved copy instead of fetching it again.
+    other_helper = make_subreddit(moderator=make_moderators(["Kungming2"]))
+    assert ModeratorCache(other_helper, file_address).is_mod("automoderator")
+    other_helper.moderator.assert_not_called()
+
+    # Once it is older than the time to live, it is fetched again.
+    expired = ModeratorCache(other_helper, file_address, ttl=-1)
+    assert not expired.is_mod("automoderator")
+    assert other_helper.moderator.call_count == 1
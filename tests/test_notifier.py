@@ -1,3 +1,4 @@
+import sqlite3
 from sqlite3 import Connection, Cursor
 from unittest.mock import MagicMock, patch
 import praw
@@ -5,8 +6,18 @@ import pytest
 from code.Ajo import Ajo
 
 from code.Ziwen_helper import ZiwenConfig
-from code.notifier import ZiwenMessageProcessor, ZiwenNotifier, ziwen_messages
+from code.notifier import (
+    TokenBucket,
+    ZiwenMessageProcessor,
+    ZiwenNotifier,
+    notifier_digest_add,
+    notifier_limit_writer,
+    notifier_outbox_add,
+    notifier_outbox_drain,
+    ziwen_messages,
+)
 from code._config import BOT_DISCLAIMER
+from code._database import LanguageStatisticsStore, MAIN_MIGRATIONS, database_migrate
 from code._responses import MSG_UNSUBSCRIBE_BUTTON
 
 
@@ -47,6 +58,107 @@ def test_ziwen_notifier(mock_config):
         ) == ["mem1", "mem2"]
 
 
+def test_messaging_language_frequency(mock_config):
+    mock_config.language_statistics = MagicMock(LanguageStatisticsStore)
+    mock_config.language_statistics.get.return_value = {
+        "name": "Japanese",
+        "2023-01": {"num_total": 300},
+        "2023-02": {"num_total": 600},
+    }
+    notifier = ZiwenNotifier(mock_config)
+    months_since = notifier._ZiwenNotifier__messaging_months_elapsed()
+    freq_string, stats_package = notifier._ZiwenNotifier__messaging_language_frequency(
+        "Japanese"
+    )
+    mock_config.language_statistics.get.assert_called_with("ja")
+    assert stats_package[1] == round(900 / months_since, 2)
+    assert stats_package[3] == 900
+
+
+def test_notifier_limit_writer(mock_config):
+    conn = sqlite3.connect(":memory:")
+    database_migrate(conn, MAIN_MIGRATIONS)
+    mock_config.conn_main = conn
+    mock_config.cursor_main = conn.cursor()
+    notifier_limit_writer(["mem1", "mem2"], "zh", mock_config)
+    notifier_limit_writer(["mem1"], "zh", mock_config)
+    assert conn.execute(
+        "SELECT username, language_code, count FROM notify_monthly_counts ORDER BY username"
+    ).fetchall() == [("mem1", "zh", 2), ("mem2", "zh", 1)]
+
+
+def test_token_bucket():
+    now = [0.0]
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    bucket = TokenBucket(2.0, 2, clock=lambda: now[0], sleep=sleep)
+    for _ in range(4):
+        bucket.take()
+    # The first two are a burst, the other two wait half a second each.
+    assert sleeps == [0.5, 0.5]
+    now[0] += 10
+    bucket.take()
+    assert len(sleeps) == 2
+
+
+@patch("code.notifier.record_activity_csv")
+def test_notifier_outbox(mock_record, mock_config):
+    conn = sqlite3.connect(":memory:")
+    database_migrate(conn, MAIN_MIGRATIONS)
+    mock_config.conn_main = conn
+    mock_config.cursor_main = conn.cursor()
+    mock_config.reddit = MagicMock()
+    notifier_outbox_add(
+        [
+            ("mem1", "Subject", "Hi mem1"),
+            ("gone", "Subject", "Hi gone"),
+            ("mem2", "Subject", "Hi mem2"),
+        ],
+        "Chinese",
+        "15f3gts",
+        mock_config,
+        limit_code="zh",
+    )
+
+    def redditor(username):
+        recipient = MagicMock()
+        if username == "gone":
+            recipient.message.side_effect = praw.exceptions.RedditAPIException(
+                [["USER_DOESNT_EXIST", "that user doesn't exist", "to"]]
+            )
+        return recipient
+
+    mock_config.reddit.redditor.side_effect = redditor
+    bucket = MagicMock(TokenBucket)
+    with patch("code.notifier.notifier_list_pruner", return_value="zh") as pruner:
+        assert notifier_outbox_drain(mock_config, bucket=bucket) == 2
+    pruner.assert_called_once_with("gone", mock_config)
+    assert bucket.take.call_count == 3
+    # Sent messages and those to deleted users are gone from the outbox.
+    assert conn.execute("SELECT COUNT(*) FROM outbox").fetchone()[0] == 0
+    assert mock_record.call_args[0][0][1:4] == ("Messaging run", 2, "Chinese")
+    # Only the notifications that were sent count toward the monthly limit.
+    assert conn.execute(
+        "SELECT username, count FROM notify_monthly_counts ORDER BY username"
+    ).fetchall() == [("mem1", 1), ("mem2", 1)]
+
+    # A failure for a user who still exists is tried again later.
+    notifier_outbox_add(
+        [("gone", "Subject", "Hi again")], "Chinese", None, mock_config, "zh"
+    )
+    with patch("code.notifier.notifier_list_pruner", return_value=None):
+        assert notifier_outbox_drain(mock_config, bucket=bucket) == 0
+    assert conn.execute("SELECT attempts FROM outbox").fetchall() == [(1,)]
+    assert conn.execute("SELECT COUNT(*) FROM notify_monthly_counts").fetchone()[0] == 2
+    # It is not due yet.
+    assert notifier_outbox_drain(mock_config, bucket=bucket) == 0
+    assert bucket.take.call_count == 4
+
+
 def generate_mock_message(message):
     mock_message = MagicMock(praw.reddit.models.Message)
     mock_message.author = "example_author"
@@ -81,6 +193,7 @@ def test_message_ping(mock_config):
 def test_ziwen_message_subscribe(mock_config):
     mock_message = generate_mock_message("SUBSCRIBE")
     mock_config.cursor_main.fetchone.return_value = {"user_count": 0}
+    mock_config.language_statistics.get.return_value = None
     processor = ZiwenMessageProcessor(mock_config, mock_message)
     processor.process_subscribe()
     mock_config.cursor_main.execute.assert_called_with(
@@ -103,12 +216,23 @@ def test_message_unsubscribe(mock_config):
 @patch("code.notifier.action_counter")
 def test_message_status(mock_config):
     mock_message = generate_mock_message("STATUS")
-    # response for each time fetchone is called
-    mock_config.cursor_main.fetchone.side_effect = [
-        {
-            "commands": "{'!doublecheck': 4, '!page:': 1, '!search:': 15, '!translated': 354, '!identify:': 192, '`': 150, '!missing': 11, '!set:': 31, '!claim': 1, '!reset': 10}"
-        },
-        {"received": '{"ja": 6, "zh": 4}'},
+    # the subscriptions, then the commands and notification counts
+    mock_config.cursor_main.fetchall.side_effect = [
+        [],
+        [
+            {"is_notification": 0, "name": "!claim", "count": 1},
+            {"is_notification": 0, "name": "!doublecheck", "count": 4},
+            {"is_notification": 0, "name": "!identify:", "count": 192},
+            {"is_notification": 0, "name": "!missing", "count": 11},
+            {"is_notification": 0, "name": "!page:", "count": 1},
+            {"is_notification": 0, "name": "!reset", "count": 10},
+            {"is_notification": 0, "name": "!search:", "count": 15},
+            {"is_notification": 0, "name": "!set:", "count": 31},
+            {"is_notification": 0, "name": "!translated", "count": 354},
+            {"is_notification": 0, "name": "`", "count": 150},
+            {"is_notification": 1, "name": "ja", "count": 6},
+            {"is_notification": 1, "name": "zh", "count": 4},
+        ],
     ]
     processor = ZiwenMessageProcessor(mock_config, mock_message)
     processor.process_status()
@@ -117,3 +241,50 @@ def test_message_status(mock_config):
         + BOT_DISCLAIMER
         + MSG_UNSUBSCRIBE_BUTTON
     )
+
+
+def test_notifier_digests(mock_config):
+    conn = sqlite3.connect(":memory:")
+    database_migrate(conn, MAIN_MIGRATIONS)
+    conn.row_factory = sqlite3.Row
+    mock_config.conn_main = conn
+    mock_config.cursor_main = conn.cursor()
+    mock_config.reddit = MagicMock()
+
+    message = generate_mock_message("Digest")
+    message.author, message.body = "mem1", "on"
+    with patch("code.notifier.action_counter"):
+        ZiwenMessageProcessor(mock_config, message).process_digest()
+    assert (
+        conn.execute("SELECT username FROM notify_digest_users").fetchone()[0] == "mem1"
+    )
+
+    notifier_digest_add(
+        [("mem1", "* **Chinese**: [one](link1)")], "Chinese", "a1", mock_config
+    )
+    notifier_digest_add(
+        [("mem1", "* **Japanese**: [two](link2)")], "Japanese", "a2", mock_config
+    )
+    notifier_outbox_add([("mem2", "Subject", "Hi mem2")], "Chinese", "a1", mock_config)
+    bucket = MagicMock(TokenBucket)
+    with patch("code.notifier.record_activity_csv"):
+        # The digest is held until its window is over.
+        assert notifier_outbox_drain(mock_config, bucket=bucket) == 1
+        conn.execute("UPDATE outbox SET next_attempt_utc = 0")
+        assert notifier_outbox_drain(mock_config, bucket=bucket) == 1
+    mock_config.reddit.redditor.assert_called_with("mem1")
+    sent = mock_config.reddit.redditor.return_value.message.call_args[1]
+    assert sent["subject"] == "[Notification] 2 new posts on r/translator"
+    assert "[one](link1)" in sent["message"] and "[two](link2)" in sent["message"]
+
+    # Only a message that is just the command turns digests off.
+    message = generate_mock_message("Digest")
+    message.author, message.body = "mem1", "I'll turn it off later, but on for now."
+    with patch("code.notifier.action_counter"):
+        ZiwenMessageProcessor(mock_config, message).process_digest()
+    assert conn.execute("SELECT COUNT(*) FROM notify_digest_users").fetchone()[0] == 1
+    message = generate_mock_message("Digest")
+    message.author, message.body = "mem1", "Off"
+    with patch("code.notifier.action_counter"):
+        ZiwenMessageProcessor(mock_config, message).process_digest()
+    assert conn.execute("SELECT COUNT(*) FROM notify_digest_users").fetchone()[0] == 0
@@ -0,0 +1,48 @@
+import time
+
+from code._scheduler import Scheduler, scheduler_intervals
+
+
+def test_scheduler_runs_stages_and_shuts_down():
+    scheduler = Scheduler(error_handler=lambda entry: errors.append(entry))
+    runs, errors, shutdowns = [], [], []
+
+    def fast():
+        runs.append("fast")
+        if runs.count("fast") == 3:
+            scheduler.stop()
+
+    def failing():
+        runs.append("failing")
+        raise ValueError("stage failed")
+
+    scheduler.add_stage("fast", fast, 0.01)
+    scheduler.add_stage("failing", failing, 0.01)
+    scheduler.add_stage("slow", lambda: runs.append("slow"), 3600)
+    scheduler.add_shutdown(lambda: shutdowns.append(True))
+    scheduler.run(install_signal_handlers=False)
+
+    assert runs.count("fast") == 3
+    assert runs.count("slow") == 1
+    # The failing stage is reported and does not stop the others.
+    assert runs.count("failing") == 2
+    assert len(errors) == 2 and "stage failed" in errors[0]
+    assert shutdowns == [True]
+
+
+def test_scheduler_skips_missed_runs():
+    scheduler = Scheduler()
+    scheduler.add_stage("overrun", lambda: time.sleep(0.05), 0.01)
+    stage = scheduler.stages[0]
+
+    scheduler.run_stage(stage)
+    # The next run is a full interval after the stage finished, not in the past.
+    assert stage.overruns == 1
+    assert stage.next_run > time.monotonic()
+
+
+def test_scheduler_intervals():
+    defaults = {"ziwen_posts": 600, "cc_ref": 600}
+    assert scheduler_intervals(
+        defaults, ["test", "--daemon", "ziwen_posts=120", "cc_ref=soon", "other=5"]
+    ) == {"ziwen_posts": 120.0, "cc_ref": 600}
@@ -0,0 +1,43 @@
+from code._similarity import (
+    numerical_sequence,
+    title_similarity_clusters,
+    title_similarity_matrix,
+)
+
+
+def test_title_similarity_matrix():
+    titles = [
+        "[Japanese > English] What does this say?",
+        "what does this say? [japanese > english]",
+    ]
+    matrix = title_similarity_matrix(titles)
+    assert matrix.shape == (2, 2)
+    assert matrix[0][0] == matrix[0][1] == 100
+
+
+def test_title_similarity_clusters():
+    titles = [
+        "[Japanese > English] What does this sign say?",
+        "[Korean > English] Lyrics of a song from the 90s",
+        "[Japanese > English] what does this sign say",
+        "[Arabic > English] Tattoo check please",
+        "[Japanese > English] What does this sign say?!",
+    ]
+    assert title_similarity_clusters(titles, 85) == [[0, 2, 4]]
+    assert title_similarity_clusters(titles[:1], 85) == []
+    assert title_similarity_clusters(titles, 101) == []
+
+
+def test_numerical_sequence():
+    assert not numerical_sequence(
+        ["[Chinese > English] Page 1", "[Chinese > English] Page 2"]
+    )
+    assert numerical_sequence(
+        ["[Chinese > English] Page 1", "[Chinese > English] Page 1"]
+    )
+    assert not numerical_sequence(
+        ["[Chinese > English] Page 1", "[Chinese > English] Page"]
+    )
+    assert not numerical_sequence(
+        ["[Chinese > English] A page", "[Chinese > English] A page"]
+    )
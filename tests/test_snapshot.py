@@ -0,0 +1,75 @@
+from unittest.mock import patch
+
+import praw
+
+from code._snapshot import RedditSnapshot
+
+
+def make_posts(reddit):
+    return [
+        praw.models.Submission(
+            reddit,
+            _data={
+                "id": f"p{index}",
+                "title": f"[Japanese > English] Post {index}",
+                "author": "[deleted]" if index == 2 else f"user{index}",
+                "subreddit": "translator",
+                "created_utc": 1700000000.0 - index,
+                "link_flair_css_class": None,
+            },
+        )
+        for index in range(300)
+    ]
+
+
+def test_snapshot_shares_listings(tmp_path, make_subreddit):
+    reddit = praw.Reddit(client_id="id", client_secret="secret", user_agent="test")
+    listing = make_posts(reddit)
+    subreddit_helper = make_subreddit(new=listing)
+    file_address = str(tmp_path / "snapshot.json.gz")
+
+    snapshot = RedditSnapshot(reddit, subreddit_helper, file_address)
+    posts = snapshot.new_posts(80)
+    posts.reverse()
+    assert [post.id for post in snapshot.new_posts(100)][:2] == ["p0", "p1"]
+    # Both requests are served by one fetch at the default depth.
+    subreddit_helper.new.assert_called_once_with(limit=100)
+
+    # Another process reuses the saved listing.
+    other_subreddit_helper = make_subreddit(new=listing)
+    other = RedditSnapshot(reddit, other_subreddit_helper, file_address)
+    restored = other.new_posts(50)
+    other_subreddit_helper.new.assert_not_called()
+    assert len(restored) == 50
+    assert restored[1].title == "[Japanese > English] Post 1"
+    assert restored[1].author.name == "user1"
+    assert restored[1].link_flair_css_class is None
+    # Posts whose author was deleted are saved and restored too.
+    assert restored[2].author is None
+
+    # A deeper request than what was saved is fetched again.
+    assert len(other.new_posts(250)) == 250
+    other_subreddit_helper.new.assert_called_once_with(limit=250)
+
+    # Saved listings that are too old are not used.
+    stale_subreddit_helper = make_subreddit(new=listing)
+    stale = RedditSnapshot(reddit, stale_subreddit_helper, file_address, max_age=-1)
+    stale.new_posts(50)
+    stale_subreddit_helper.new.assert_called_once_with(limit=100)
+
+
+def test_snapshot_memory_age(tmp_path, make_subreddit):
+    reddit = praw.Reddit(client_id="id", client_secret="secret", user_agent="test")
+    subreddit_helper = make_subreddit(new=make_posts(reddit))
+    file_address = str(tmp_path / "snapshot.json.gz")
+    snapshot = RedditSnapshot(reddit, subreddit_helper, file_address, memory_age=60)
+
+    with patch("code._snapshot.time.time", return_value=1700000000.0):
+        snapshot.new_posts(50)
+    with patch("code._snapshot.time.time", return_value=1700000030.0):
+        snapshot.new_posts(50)
+    assert subreddit_helper.new.call_count == 1
+    # Once it is older than `memory_age`, neither this copy nor the saved one is used.
+    with patch("code._snapshot.time.time", return_value=1700000090.0):
+        snapshot.new_posts(50)
+    assert subreddit_helper.new.call_count == 2
@@ -0,0 +1,110 @@
+from unittest.mock import MagicMock
+
+import prawcore
+
+from code._wiki import WikiAppendBuffer, wiki_table_header
+
+HEADER = "| Date | Title | Language |\n|------|-------|----------|"
+
+
+class FakePage:
+    def __init__(self, pages, name, errors):
+        self.pages, self.name, self.errors = pages, name, errors
+        self.revision_id = f"{name}-{len(pages.get(name, ''))}"
+
+    @property
+    def content_md(self):
+        if self.name not in self.pages:
+            raise prawcore.exceptions.NotFound(MagicMock(status_code=404))
+        return self.pages[self.name]
+
+    def edit(self, content, reason, previous):
+        if self.errors:
+            raise self.errors.pop(0)(MagicMock(status_code=409))
+        self.pages[self.name] = content
+
+
+def test_wiki_append_buffer(tmp_path, make_subreddit):
+    file_address = str(tmp_path / "wiki_pages.json")
+    pending_address = str(tmp_path / "wiki_pending.json")
+    pages = {"saved": HEADER, "identified": HEADER}
+    errors = [prawcore.exceptions.Conflict]
+    reddit = MagicMock()
+    buffer = WikiAppendBuffer(
+        reddit,
+        make_subreddit(wiki=lambda name: FakePage(pages, name, errors)),
+        file_address,
+        pending_address=pending_address,
+    )
+
+    buffer.append(
+        "saved", "| 2023-08-01 | [One](https://redd.it/a) | Tagalog |", "New link"
+    )
+    buffer.append(
+        "saved", "| 2023-08-02 | [Two](https://redd.it/b) | Ainu |", "New link"
+    )
+    # One edit for both lines, tried again after the conflict.
+    assert buffer.flush() == 2
+    assert pages["saved"].endswith(
+        "[One](https://redd.it/a) | Tagalog |\n| 2023-08-02 | [Two](https://redd.it/b) | Ainu |"
+    )
+    assert not errors and not buffer.pending
+
+    # A full page is continued on a new one with the same header.
+    errors.append(prawcore.exceptions.TooLarge)
+    buffer.append(
+        "identified",
+        "2023-08-03 | [Three](https://redd.it/c) | Unknown | Ainu | u/x",
+        "New link",
+    )
+    assert buffer.flush() == 1
+    assert pages["identified"] == HEADER
+    assert (
+        pages["identified_2"]
+        == HEADER + "\n2023-08-03 | [Three](https://redd.it/c) | Unknown | Ainu | u/x"
+    )
+    reddit.subreddit.return_value.message.assert_called_once()
+
+    # Other processes write to the continuation page directly.
+    other = WikiAppendBuffer(
+        reddit,
+        make_subreddit(wiki=lambda name: FakePage(pages, name, [])),
+        file_address,
+        pending_address=pending_address,
+    )
+    other.append(
+        "identified",
+        "2023-08-04 | [Four](https://redd.it/d) | Unknown | Ainu | u/x",
+        "New link",
+    )
+    other.flush()
+    assert pages["identified_2"].endswith(
+        "[Four](https://redd.it/d) | Unknown | Ainu | u/x"
+    )
+
+    # Lines are kept for the next flush if the page cannot be edited.
+    errors.extend([prawcore.exceptions.Conflict] * 3)
+    buffer.append(
+        "saved", "| 2023-08-05 | [Five](https://redd.it/e) | Ainu |", "New link"
+    )
+    assert buffer.flush() == 0
+    # They are also saved for the next process, in case this one exits before it flushes again.
+    restarted = WikiAppendBuffer(
+        reddit,
+        make_subreddit(wiki=lambda name: FakePage(pages, name, [])),
+        file_address,
+        pending_address=pending_address,
+    )
+    assert restarted.flush() == 1
+    assert pages["saved"].endswith("[Five](https://redd.it/e) | Ainu |")
+    assert (
+        WikiAppendBuffer(
+            reddit, make_subreddit(), file_address, pending_address=pending_address
+        ).pending
+        == {}
+    )
+
+
+def test_wiki_table_header():
+    assert wiki_table_header(HEADER + "\n| a | b | c |") == HEADER
+    assert wiki_table_header("Just some text.") == ""
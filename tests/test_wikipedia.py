@@ -0,0 +1,56 @@
+import sqlite3
+import threading
+
+import requests
+
+import code._wikipedia
+from code._database import CACHE_MIGRATIONS, database_migrate
+from code._wikipedia import WikipediaResolver
+
+
+def test_wikipedia_resolver(monkeypatch):
+    conn = sqlite3.connect(":memory:")
+    database_migrate(conn, CACHE_MIGRATIONS)
+    fetched = []
+    lock = threading.Lock()
+
+    def fetch(term, language_code):
+        with lock:
+            fetched.append(term)
+        if term == "Timeout":
+            raise requests.exceptions.Timeout()
+        if term == "Nonsense":
+            return None
+        return (
+            f"{term} is a term.",
+            f"https://{language_code}.wikipedia.org/wiki/{term}",
+        )
+
+    monkeypatch.setattr(code._wikipedia, "wikipedia_fetch", fetch)
+    resolver = WikipediaResolver(conn)
+
+    results = resolver.resolve(["Tang dynasty", "Nonsense", "Tang dynasty", "Timeout"])
+    assert sorted(fetched) == ["Nonsense", "Tang dynasty", "Timeout"]
+    assert results == {
+        "Tang dynasty": (
+            "Tang dynasty is a term.",
+            "https://en.wikipedia.org/wiki/Tang dynasty",
+        ),
+        "Nonsense": None,
+        "Timeout": None,
+    }
+
+    # Resolved terms and failures are cached, but errors that may be temporary are not.
+    fetched.clear()
+    assert resolver.resolve(["Tang dynasty", "Nonsense", "Timeout"]) == results
+    assert fetched == ["Timeout"]
+
+    # Expired entries are looked up again and pruned.
+    fetched.clear()
+    conn.execute("UPDATE wikipedia_cache SET expires_utc = 0")
+    assert resolver.cached(["Tang dynasty", "Nonsense"]) == {}
+    resolver.resolve(["Nonsense"])
+    assert fetched == ["Nonsense"]
+    assert conn.execute("SELECT term FROM wikipedia_cache").fetchall() == [
+        ("Nonsense",)
+    ]